@@ -0,0 +1,93 @@
+"""
+=====================
+CORS middleware bench
+=====================
+
+Measure per-request overhead of CORS middleware against no-op handler::
+
+    python3 benchmarks/bench_cors.py
+
+"""
+
+import timeit
+from typing import Any, Coroutine
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import cors_middleware
+from aiohttp_middlewares.annotations import Handler, Middleware
+from aiohttp_middlewares.cors import ACCESS_CONTROL_REQUEST_METHOD
+
+
+NUMBER = 20_000
+ORIGIN = "http://localhost:3000"
+REPEAT = 5
+
+
+async def handler(request: web.Request) -> web.StreamResponse:
+    return web.Response()
+
+
+def bench(
+    name: str, middleware: Middleware, method: str, **headers: str
+) -> None:
+    request = make_mocked_request(method, "/api/", headers=headers)
+
+    def call() -> None:
+        run(middleware(request, handler))
+
+    best = min(timeit.repeat(call, number=NUMBER, repeat=REPEAT))
+    print(f"{name:<32} {best / NUMBER * 1_000_000:8.2f} usec/request")
+
+
+async def no_middleware(
+    request: web.Request, handler: Handler
+) -> web.StreamResponse:
+    return await handler(request)
+
+
+def run(coro: Coroutine[Any, Any, web.StreamResponse]) -> None:
+    """Run coroutine, which is not expected to suspend, without event loop."""
+    try:
+        coro.send(None)
+    except StopIteration:
+        return
+    except web.HTTPException:
+        return
+    raise RuntimeError("Coroutine suspended unexpectedly")
+
+
+def main() -> None:
+    middleware = cors_middleware(
+        origins=[ORIGIN],
+        expose_headers=["X-Request-Id", "X-Total-Count"],
+        allow_credentials=True,
+        max_age=600,
+    )
+    bench("handler only", no_middleware, "GET", Origin=ORIGIN)
+    bench("cors: no origin", middleware, "GET")
+    bench("cors: GET", middleware, "GET", Origin=ORIGIN)
+    bench("cors: OPTIONS", middleware, "OPTIONS", Origin=ORIGIN)
+    bench(
+        "cors: preflight",
+        middleware,
+        "OPTIONS",
+        **{"Origin": ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+    )
+    bench(
+        "cors: preflight (status=204)",
+        cors_middleware(
+            origins=[ORIGIN],
+            expose_headers=["X-Request-Id", "X-Total-Count"],
+            allow_credentials=True,
+            max_age=600,
+            preflight_status=204,
+        ),
+        "OPTIONS",
+        **{"Origin": ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+=================
+Middlewares bench
+=================
+
+Measure per-request overhead of each middleware in isolation against no-op
+handler, with rule sets of 1, 100 & 1,000 URLs, which mix strings and
+regexps::
+
+    python3 benchmarks/bench_middlewares.py
+    python3 benchmarks/bench_middlewares.py cors match_request
+
+Each request is checked against path, which does not match any rule (as all
+rules should be checked to make decision) and against path, which matches the
+last rule.
+
+``stack`` and ``compose`` benchmarks measure chain of all five middlewares
+against one middleware from :func:`aiohttp_middlewares.compose_middlewares`
+with same configuration.
+
+"""
+
+import argparse
+import asyncio
+import re
+import time
+from functools import partial
+from typing import Callable, Dict, List, Tuple, Union
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import (
+    compose_middlewares,
+    cors_middleware,
+    error_middleware,
+    https_middleware,
+    shield_middleware,
+    timeout_middleware,
+)
+from aiohttp_middlewares.annotations import (
+    DictStrAny,
+    Handler,
+    Middleware,
+    Url,
+)
+from aiohttp_middlewares.utils import compile_urls, match_request
+
+
+NUMBER = 5_000
+ORIGIN = "http://localhost:3000"
+REPEAT = 5
+SIZES = (1, 100, 1_000)
+UNMATCHED_PATH = "/unmatched"
+
+MiddlewareFactory = Callable[[List[Url]], Middleware]
+
+
+async def error_handler(request: web.Request) -> web.StreamResponse:
+    return web.Response(status=500)
+
+
+async def handler(request: web.Request) -> web.StreamResponse:
+    return web.Response()
+
+
+async def no_middleware(
+    request: web.Request, handler: Handler
+) -> web.StreamResponse:
+    return await handler(request)
+
+
+async def not_found_handler(request: web.Request) -> web.StreamResponse:
+    raise web.HTTPNotFound()
+
+
+async def measure(
+    middleware: Middleware, request: web.Request, handler: Handler
+) -> float:
+    best = float("inf")
+    for _ in range(REPEAT):
+        started_at = time.perf_counter()
+        for _ in range(NUMBER):
+            try:
+                await middleware(request, handler)
+            except web.HTTPException:
+                pass
+        best = min(best, time.perf_counter() - started_at)
+    return best / NUMBER * 1_000_000
+
+
+def create_rules(size: int) -> List[Url]:
+    """Create rules, where even ones are strings and odd ones are regexps."""
+    return [
+        (
+            f"/api/resource-{index}"
+            if index % 2 == 0
+            else re.compile(rf"^/api/items-{index}/\d+$")
+        )
+        for index in range(size)
+    ]
+
+
+def matched_path(rules: List[Url]) -> str:
+    last = rules[-1]
+    if isinstance(last, str):
+        return last
+    return f"/api/items-{len(rules) - 1}/42"
+
+
+def report(name: str, size: Union[int, None], path: str, usec: float) -> None:
+    print(f"{name:<20} {size or '-':>6} {path:<24} {usec:10.2f} usec/request")
+
+
+async def bench_match_request(size: int) -> None:
+    rules = create_rules(size)
+    matcher = compile_urls(rules)
+    for path in (UNMATCHED_PATH, matched_path(rules)):
+        for name, urls in (("match_request", rules), ("url_matcher", matcher)):
+            started_at = time.perf_counter()
+            for _ in range(NUMBER):
+                match_request(urls, "GET", path)
+            usec = (time.perf_counter() - started_at) / NUMBER * 1_000_000
+            report(name, size, path, usec)
+
+
+async def bench_middleware(
+    name: str,
+    factory: MiddlewareFactory,
+    handler: Handler,
+    size: int,
+    *,
+    method: str = "GET",
+) -> None:
+    rules = create_rules(size)
+    middleware = factory(rules)
+    for path in (UNMATCHED_PATH, matched_path(rules)):
+        request = make_mocked_request(method, path, headers={"Origin": ORIGIN})
+        report(name, size, path, await measure(middleware, request, handler))
+
+
+def create_stack_config(rules: List[Url]) -> Dict[str, DictStrAny]:
+    return {
+        "https": {},
+        "cors": {"allow_all": True, "urls": rules},
+        "error": {"default_handler": error_handler},
+        "timeout": {"seconds": 30, "ignore": rules},
+        "shield": {"urls": rules},
+    }
+
+
+def create_stack(middlewares: List[Middleware]) -> Middleware:
+    """Wrap handler into middlewares on each request, as aiohttp does."""
+
+    async def middleware(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        for item in reversed(middlewares):
+            handler = partial(item, handler=handler)
+        return await handler(request)
+
+    return middleware
+
+
+def create_middlewares() -> Dict[str, Tuple[MiddlewareFactory, Handler, str]]:
+    return {
+        "cors": (
+            lambda rules: cors_middleware(allow_all=True, urls=rules),
+            handler,
+            "GET",
+        ),
+        "error": (
+            lambda rules: error_middleware(
+                default_handler=error_handler,
+                config={rule: error_handler for rule in rules},
+            ),
+            not_found_handler,
+            "GET",
+        ),
+        "shield": (
+            lambda rules: shield_middleware(urls=rules),
+            handler,
+            "POST",
+        ),
+        "timeout": (
+            lambda rules: timeout_middleware(30, ignore=rules),
+            handler,
+            "GET",
+        ),
+        "stack": (
+            lambda rules: create_stack(
+                [
+                    factory(**kwargs)
+                    for factory, kwargs in zip(
+                        (
+                            https_middleware,
+                            cors_middleware,
+                            error_middleware,
+                            timeout_middleware,
+                            shield_middleware,
+                        ),
+                        create_stack_config(rules).values(),
+                    )
+                ]
+            ),
+            handler,
+            "GET",
+        ),
+        "compose": (
+            lambda rules: create_stack(
+                [compose_middlewares(**create_stack_config(rules))]
+            ),
+            handler,
+            "GET",
+        ),
+    }
+
+
+async def main(names: List[str]) -> None:
+    middlewares = create_middlewares()
+
+    if not names or "handler" in names:
+        request = make_mocked_request("GET", "/")
+        report(
+            "handler only",
+            None,
+            "/",
+            await measure(no_middleware, request, handler),
+        )
+
+    if not names or "https" in names:
+        request = make_mocked_request(
+            "GET", "/", headers={"X-Forwarded-Proto": "https"}
+        )
+        report(
+            "https",
+            None,
+            "/",
+            await measure(https_middleware(), request, handler),
+        )
+
+    for size in SIZES:
+        if not names or "match_request" in names:
+            await bench_match_request(size)
+
+        for name, (factory, name_handler, method) in middlewares.items():
+            if names and name not in names:
+                continue
+            await bench_middleware(
+                name, factory, name_handler, size, method=method
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure per-request overhead of middlewares."
+    )
+    parser.add_argument(
+        "names",
+        nargs="*",
+        help=(
+            "Benchmarks to run: handler, https, match_request, cors, error, "
+            "shield, timeout, stack, compose. By default: run all benchmarks"
+        ),
+    )
+    asyncio.run(main(parser.parse_args().names))
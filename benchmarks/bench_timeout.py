@@ -0,0 +1,68 @@
+"""
+========================
+Timeout middleware bench
+========================
+
+Compare event loop timers count and per-request overhead of timeout
+middleware backends for 100k concurrent requests::
+
+    python3 benchmarks/bench_timeout.py
+
+"""
+
+import asyncio
+import sys
+import time
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import timeout_middleware
+from aiohttp_middlewares.timeout import BACKENDS
+
+
+CONCURRENCY = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+SECONDS = 30
+
+
+async def bench(backend: str) -> None:
+    loop = asyncio.get_running_loop()
+    middleware = timeout_middleware(SECONDS, backend=backend)
+    request = make_mocked_request("GET", "/")
+    release = asyncio.Event()
+
+    async def handler(request: web.Request) -> web.StreamResponse:
+        await release.wait()
+        return web.Response()
+
+    started_at = time.perf_counter()
+    tasks = [
+        loop.create_task(middleware(request, handler))
+        for _ in range(CONCURRENCY)
+    ]
+    # Let all tasks enter the timeout context
+    await asyncio.sleep(0)
+    entered_at = time.perf_counter()
+    timers = len(loop._scheduled)  # type: ignore[attr-defined]
+
+    release.set()
+    await asyncio.gather(*tasks)
+    finished_at = time.perf_counter()
+
+    print(
+        f"{backend:<16} {timers:>8} timers "
+        f"{(entered_at - started_at) / CONCURRENCY * 1_000_000:8.2f} "
+        "usec/request to enter "
+        f"{(finished_at - started_at) / CONCURRENCY * 1_000_000:8.2f} "
+        "usec/request total"
+    )
+
+
+def main() -> None:
+    print(f"{CONCURRENCY} concurrent requests")
+    for backend in BACKENDS:
+        asyncio.run(bench(backend))
+
+
+if __name__ == "__main__":
+    main()
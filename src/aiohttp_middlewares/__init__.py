@@ -7,21 +7,26 @@ Collection of useful middlewares for aiohttp applications.
 
 """
 
+from aiohttp_middlewares.compose import compose_middlewares
+from aiohttp_middlewares.concurrency import concurrency_middleware
 from aiohttp_middlewares.constants import (
     IDEMPOTENT_METHODS,
     NON_IDEMPOTENT_METHODS,
 )
-from aiohttp_middlewares.cors import cors_middleware
+from aiohttp_middlewares.cors import cors_middleware, setup_cors
 from aiohttp_middlewares.error import (
+    create_error_handler,
+    create_static_error_handler,
     default_error_handler,
     error_context,
     error_middleware,
     get_error_response,
 )
 from aiohttp_middlewares.https import https_middleware
+from aiohttp_middlewares.proxy import proxy_fix_middleware
 from aiohttp_middlewares.shield import shield_middleware
 from aiohttp_middlewares.timeout import timeout_middleware
-from aiohttp_middlewares.utils import match_path
+from aiohttp_middlewares.utils import compile_urls, match_path
 
 
 __author__ = "Igor Davydenko"
@@ -31,7 +36,12 @@ __version__ = "2.4.0"
 
 # Make flake8 happy
 (  # noqa: B018
+    compile_urls,
+    compose_middlewares,
+    concurrency_middleware,
     cors_middleware,
+    create_error_handler,
+    create_static_error_handler,
     default_error_handler,
     error_context,
     error_middleware,
@@ -40,6 +50,8 @@ __version__ = "2.4.0"
     IDEMPOTENT_METHODS,
     match_path,
     NON_IDEMPOTENT_METHODS,
+    proxy_fix_middleware,
+    setup_cors,
     shield_middleware,
     timeout_middleware,
 )
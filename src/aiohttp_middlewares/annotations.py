@@ -15,6 +15,7 @@ from typing import (
     Collection,
     Dict,
     Pattern,
+    Tuple,
     Type,
     Union,
 )
@@ -36,15 +37,18 @@ except AttributeError:
 DictStrAny = Dict[str, Any]
 DictStrStr = Dict[str, str]
 
+EventHook = Callable[[str, Tuple[Any, ...]], None]
 ExceptionType = Type[Exception]
 # FIXME: Drop Handler type definition after `aiohttp-middlewares` will require
 # only `aiohttp>=3.8.0`
 Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
 
 IntCollection = Collection[int]
+
+JSONDumps = Callable[[Any], Union[bytes, str]]
 StrCollection = Collection[str]
 
-Url = Union[str, Pattern[str], URL]
+Url = Union[str, Pattern[str], URL, web.AbstractResource]
 UrlCollection = Collection[Url]
 UrlDict = Dict[Url, StrCollection]
 Urls = Union[UrlCollection, UrlDict]
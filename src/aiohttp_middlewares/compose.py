@@ -0,0 +1,202 @@
+r"""
+===================
+Composed Middleware
+===================
+
+.. versionadded:: 2.5.0
+
+Fuse HTTPS, CORS, error, timeout & shield middlewares into one middleware.
+
+Each middleware in aiohttp application costs one extra coroutine call per
+request, and each middleware from this library reads request path and matches
+it against own URLs. Composed middleware reads request path once and applies
+all configured steps in one coroutine, in given order:
+
+1. HTTPS, substitute request URL scheme
+2. CORS, respond to preflight request or supply CORS headers to response
+3. Error, handle errors raised by next steps and request handler
+4. Timeout, limit request handling by X seconds
+5. Shield, shield request handler execution
+
+Which results in same responses as for chain of separate middlewares:
+
+.. code-block:: python
+
+    app = web.Application(
+        middlewares=[
+            https_middleware(),
+            cors_middleware(origins=CORS_ALLOW_ORIGINS),
+            error_middleware(),
+            timeout_middleware(29.5),
+            shield_middleware(methods=NON_IDEMPOTENT_METHODS),
+        ]
+    )
+
+Usage
+=====
+
+.. code-block:: python
+
+    from aiohttp import web
+    from aiohttp_middlewares import (
+        compose_middlewares,
+        NON_IDEMPOTENT_METHODS,
+    )
+
+    app = web.Application(
+        middlewares=[
+            compose_middlewares(
+                https={"match_headers": {"X-Forwarded-Proto": "https"}},
+                cors={"origins": CORS_ALLOW_ORIGINS},
+                error={"default_handler": error_handler},
+                timeout={"seconds": 29.5},
+                shield={"methods": NON_IDEMPOTENT_METHODS},
+            )
+        ]
+    )
+
+Each step is configured by dict of keyword arguments for the middleware
+factory, so ``cors={"origins": CORS_ALLOW_ORIGINS}`` is a same configuration as
+``cors_middleware(origins=CORS_ALLOW_ORIGINS)``. Pass empty dict to enable
+step with default arguments. Step is not applied when its configuration is
+omitted.
+
+Composed middleware does not emit events and debug log records of separate
+middlewares, so ``on_event`` argument is not supported in step
+configurations.
+
+"""
+
+from typing import Awaitable, Union
+
+from aiohttp import web
+
+from aiohttp_middlewares.annotations import DictStrAny, Handler, Middleware
+from aiohttp_middlewares.cors import (
+    ACCESS_CONTROL_REQUEST_METHOD,
+    CorsPolicy,
+    create_exception_response,
+)
+from aiohttp_middlewares.error import ErrorPolicy
+from aiohttp_middlewares.https import HttpsPolicy
+from aiohttp_middlewares.shield import ShieldPolicy
+from aiohttp_middlewares.timeout import TimeoutPolicy
+
+
+def call_handler(
+    request: web.Request,
+    handler: Handler,
+    shield_policy: Union[ShieldPolicy, None],
+) -> Awaitable[web.StreamResponse]:
+    """Call request handler, shielding its execution if policy supplied."""
+    if shield_policy is not None:
+        return shield_policy.shield(request, handler)
+    return handler(request)
+
+
+def compose_middlewares(
+    *,
+    https: Union[DictStrAny, None] = None,
+    cors: Union[DictStrAny, None] = None,
+    error: Union[DictStrAny, None] = None,
+    timeout: Union[DictStrAny, None] = None,
+    shield: Union[DictStrAny, None] = None,
+) -> Middleware:
+    """Fuse configured middlewares into one middleware.
+
+    :param https:
+        Keyword arguments for
+        :func:`aiohttp_middlewares.https.https_middleware`.
+    :param cors:
+        Keyword arguments for :func:`aiohttp_middlewares.cors.cors_middleware`.
+    :param error:
+        Keyword arguments for
+        :func:`aiohttp_middlewares.error.error_middleware`.
+    :param timeout:
+        Keyword arguments for
+        :func:`aiohttp_middlewares.timeout.timeout_middleware`.
+    :param shield:
+        Keyword arguments for
+        :func:`aiohttp_middlewares.shield.shield_middleware`.
+    """
+    https_policy = HttpsPolicy.create(**https) if https is not None else None
+    cors_policy = CorsPolicy.create(**cors) if cors is not None else None
+    error_policy = ErrorPolicy.create(**error) if error is not None else None
+    timeout_policy = (
+        TimeoutPolicy.create(**timeout) if timeout is not None else None
+    )
+    shield_policy = (
+        ShieldPolicy.create(**shield) if shield is not None else None
+    )
+
+    @web.middleware
+    async def middleware(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        request_method = request.method
+        request_path = request.rel_url.path
+
+        if https_policy is not None and https_policy.match(request):
+            request = request.clone(scheme="https")
+
+        # CORS policy to apply for current request (if any)
+        cors = (
+            cors_policy
+            if cors_policy is not None
+            and cors_policy.match_path(request_path, request)
+            else None
+        )
+        is_options_request = request_method == "OPTIONS"
+        if (
+            cors is not None
+            and is_options_request
+            and ACCESS_CONTROL_REQUEST_METHOD in request.headers
+        ):
+            return cors.respond_to_preflight(request)
+
+        request_shield_policy = (
+            shield_policy
+            if shield_policy is not None
+            and shield_policy.match(request_method, request_path, request)
+            else None
+        )
+        request_seconds = (
+            timeout_policy.get_seconds(request_method, request_path, request)
+            if timeout_policy is not None
+            else None
+        )
+
+        try:
+            try:
+                if timeout_policy is None or request_seconds is None:
+                    response = await call_handler(
+                        request, handler, request_shield_policy
+                    )
+                else:
+                    async with timeout_policy.timeout(
+                        request, request_seconds
+                    ):
+                        response = await call_handler(
+                            request, handler, request_shield_policy
+                        )
+            except Exception as err:
+                if error_policy is None or error_policy.is_ignored(type(err)):
+                    raise
+                response = await error_policy.handle(
+                    request, err, request_path
+                )
+        except web.HTTPException as exc:
+            if cors is None:
+                raise
+            response = create_exception_response(exc)
+
+        if cors is not None:
+            cors.apply(
+                response,
+                request.headers.get("Origin"),
+                is_options_request=is_options_request,
+                is_public=cors.is_public(request_path, request),
+            )
+        return response
+
+    return middleware
@@ -0,0 +1,381 @@
+r"""
+======================
+Concurrency Middleware
+======================
+
+.. versionadded:: 2.5.0
+
+Middleware to limit amount of requests handled concurrently per route.
+
+When slow dependency degrades, requests pile up in aiohttp application until
+timeout middleware cancels them, consuming memory and CPU for the whole
+timeout. Concurrency middleware sheds such load early: each route handles up
+to given amount of requests concurrently, next requests wait in bounded queue
+for up to ``queue_timeout`` seconds, and when queue is full (or waiting took
+too long) request is rejected with ``503 Service Unavailable`` response
+immediately.
+
+Usage
+=====
+
+.. code-block:: python
+
+    import re
+
+    from aiohttp import web
+    from aiohttp_middlewares import concurrency_middleware
+    from aiohttp_middlewares.concurrency import ConcurrencyLimits
+
+    # Basic usage, handle up to 64 requests concurrently per route
+    app = web.Application(middlewares=[concurrency_middleware(64)])
+
+    # Custom limits for slow routes, with queue for up to 16 requests,
+    # waiting for up to 1 second
+    limits = ConcurrencyLimits(
+        64,
+        routes={"/reports": 4, re.compile(r"^/api/search"): 16},
+        queue_size=16,
+        queue_timeout=1.0,
+    )
+    app = web.Application(
+        middlewares=[
+            concurrency_middleware(limits, ignore={"/health": "GET"})
+        ]
+    )
+
+    # Later on, check queue depth & rejections per route
+    limits.stats()
+
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Dict, Hashable, NamedTuple, Tuple, Union
+
+from aiohttp import web
+
+from aiohttp_middlewares.annotations import (
+    EventHook,
+    Handler,
+    Middleware,
+    Url,
+    Urls,
+)
+from aiohttp_middlewares.utils import compile_urls, emit_event, UrlMatcher
+
+
+EVENT_CONCURRENCY_REJECTED = "concurrency.rejected"
+SERVICE_UNAVAILABLE_BODY = b"503: Service Unavailable"
+UNMATCHED_ROUTE = "*"
+
+logger = logging.getLogger(__name__)
+
+
+class ConcurrencyStats(NamedTuple):
+    """Counters of concurrency limiter.
+
+    .. versionadded:: 2.5.0
+    """
+
+    in_flight: int
+    queued: int
+    admitted: int
+    rejected: int
+    timed_out: int
+
+
+class ConcurrencyLimiter:
+    """Limit amount of concurrently handled requests with bounded queue.
+
+    Unlike :class:`asyncio.Semaphore`, limiter never waits, when its queue is
+    full, so caller may reject request immediately.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = (
+        "admitted",
+        "in_flight",
+        "limit",
+        "queue_size",
+        "queue_timeout",
+        "rejected",
+        "timed_out",
+        "waiters",
+    )
+
+    def __init__(
+        self,
+        limit: int,
+        *,
+        queue_size: int = 0,
+        queue_timeout: Union[float, None] = None,
+    ) -> None:
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.waiters: Deque["asyncio.Future[None]"] = deque()
+
+        self.admitted = 0
+        self.in_flight = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    async def acquire(self) -> bool:
+        """Acquire the slot, waiting in queue if necessary.
+
+        Return ``False`` if queue is full or waiting for the slot timed out.
+        """
+        if self.in_flight < self.limit and not self.waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+        waiters = self.waiters
+        if len(waiters) >= self.queue_size:
+            self.rejected += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as err:
+            # Slot has been passed to the waiter right before it has been
+            # cancelled or timed out, pass it further
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            if isinstance(err, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            return False
+        finally:
+            # Cancelled waiter might be already popped by release
+            if waiter in waiters:
+                waiters.remove(waiter)
+
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        """Release the slot, passing it to the first waiter in queue if any."""
+        waiters = self.waiters
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> ConcurrencyStats:
+        """Return limiter counters."""
+        return ConcurrencyStats(
+            in_flight=self.in_flight,
+            queued=len(self.waiters),
+            admitted=self.admitted,
+            rejected=self.rejected,
+            timed_out=self.timed_out,
+        )
+
+
+class ConcurrencyLimits:
+    """Per route concurrency limits.
+
+    Each URL from ``routes`` dict has its own limiter with given limit, and
+    first URL matching request path decides request limiter, same way as for
+    ``Urls`` dict in :func:`aiohttp_middlewares.utils.match_request`. Each
+    aiohttp route, which does not match any of ``routes``, has own limiter
+    with ``limit``. All requests, which do not match any aiohttp route, share
+    one limiter.
+
+    When ``limit`` is ``None`` only ``routes`` are limited.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = (
+        "_limiters",
+        "limit",
+        "queue_size",
+        "queue_timeout",
+        "route_limits",
+        "route_names",
+        "urls",
+    )
+
+    def __init__(
+        self,
+        limit: Union[int, None] = None,
+        *,
+        routes: Union[Dict[Url, int], None] = None,
+        queue_size: int = 0,
+        queue_timeout: Union[float, None] = None,
+    ) -> None:
+        route_limits = tuple(routes.values()) if routes else ()
+        all_limits = route_limits if limit is None else (limit, *route_limits)
+        if any(item < 1 for item in all_limits):
+            raise ValueError("Limit should be a positive integer.")
+        if queue_size < 0:
+            raise ValueError("Queue size should not be negative.")
+        if queue_timeout is not None and queue_timeout <= 0:
+            raise ValueError("Queue timeout should be positive.")
+
+        self._limiters: Dict[Hashable, ConcurrencyLimiter] = {}
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.route_limits = route_limits
+        self.route_names = tuple(get_url_name(url) for url in routes or ())
+        self.urls: Union[UrlMatcher, None] = (
+            compile_urls(tuple(routes)) if routes else None
+        )
+
+    def get_limiter(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> Union[ConcurrencyLimiter, None]:
+        """Get limiter for given request path.
+
+        Return ``None`` if request should not be limited. Supply request to
+        match route resources and names, and to limit aiohttp routes.
+        """
+        urls = self.urls
+        index = urls.find(path, request) if urls is not None else None
+
+        key: Hashable
+        if index is not None:
+            key, limit = index, self.route_limits[index]
+        elif self.limit is None:
+            return None
+        else:
+            key = (
+                request.match_info.route.resource
+                if request is not None
+                else None
+            )
+            limit = self.limit
+
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = ConcurrencyLimiter(
+                limit,
+                queue_size=self.queue_size,
+                queue_timeout=self.queue_timeout,
+            )
+        return limiter
+
+    def stats(self) -> Dict[str, ConcurrencyStats]:
+        """Return counters of each used limiter.
+
+        Keys are URLs from ``routes`` and canonical paths of aiohttp route
+        resources. Limiter of requests, which do not match any route, has
+        ``"*"`` key.
+        """
+        return {
+            get_limiter_name(key, self.route_names): limiter.stats()
+            for key, limiter in self._limiters.items()
+        }
+
+
+def concurrency_middleware(
+    limits: Union[int, ConcurrencyLimits],
+    *,
+    ignore: Union[Urls, UrlMatcher, None] = None,
+    on_event: Union[EventHook, None] = None,
+) -> Middleware:
+    """Limit amount of requests handled concurrently per route.
+
+    Request, which exceeds the limit, waits in route queue, if any. When
+    route queue is full or waiting timed out request is rejected with
+    ``503 Service Unavailable`` response without calling request handler.
+
+    .. code-block:: python
+
+        app = web.Application(
+            middlewares=[concurrency_middleware(64, ignore=["/health"])]
+        )
+
+    :param limits:
+        Max amount of concurrently handled requests per route or
+        :class:`ConcurrencyLimits` instance with per route limits and queue
+        settings.
+    :param ignore:
+        Do not limit requests for any of given URLs. Same as for ``ignore``
+        argument of :func:`aiohttp_middlewares.timeout.timeout_middleware`, it
+        might be a dict, where key is URL and value is list of methods to
+        ignore.
+    :param on_event:
+        Optional callable to receive ``("concurrency.rejected", (method,
+        path))`` event on each rejected request. By default: ``None``
+    """
+    if not isinstance(limits, ConcurrencyLimits):
+        limits = ConcurrencyLimits(limits)
+    ignore_urls = compile_urls(ignore) if ignore else None
+
+    @web.middleware
+    async def middleware(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        """Wrap request handler into concurrency limiter."""
+        request_path = request.rel_url.path
+        limiter = (
+            None
+            if ignore_urls is not None
+            and ignore_urls.match(request.method, request_path, request)
+            else limits.get_limiter(request_path, request)
+        )
+        if limiter is None:
+            return await handler(request)
+
+        if not await limiter.acquire():
+            emit_event(
+                logger,
+                on_event,
+                EVENT_CONCURRENCY_REJECTED,
+                "Reject request due to concurrency limit",
+                request.method,
+                request_path,
+            )
+            return create_service_unavailable_response()
+
+        try:
+            return await handler(request)
+        finally:
+            limiter.release()
+
+    return middleware
+
+
+def create_service_unavailable_response() -> web.Response:
+    """Create ``503 Service Unavailable`` response from precomputed body.
+
+    .. versionadded:: 2.5.0
+    """
+    return web.Response(
+        status=503, body=SERVICE_UNAVAILABLE_BODY, content_type="text/plain"
+    )
+
+
+def get_limiter_name(key: Hashable, route_names: Tuple[str, ...]) -> str:
+    """Get limiter name for :meth:`ConcurrencyLimits.stats`.
+
+    .. versionadded:: 2.5.0
+    """
+    if isinstance(key, int):
+        return route_names[key]
+    if isinstance(key, web.AbstractResource):
+        return key.canonical
+    return UNMATCHED_ROUTE
+
+
+def get_url_name(url: Url) -> str:
+    """Get human readable name of given URL.
+
+    .. versionadded:: 2.5.0
+    """
+    if isinstance(url, web.AbstractResource):
+        return url.canonical
+    pattern = getattr(url, "pattern", None)
+    if isinstance(pattern, str):
+        return pattern
+    return str(url)
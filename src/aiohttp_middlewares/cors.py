@@ -37,6 +37,15 @@ URL, the response will still contain all necessary CORS headers.
    <https://github.com/playpauseandstop/aiohttp-middlewares/pull/98>`_ and
    `Jonathan Heathcote <https://github.com/mossblaser>`_ for the review.
 
+.. versionchanged:: 2.5.0
+
+CORS headers might be supplied via :func:`setup_cors` instead of the
+middleware. It adds CORS headers to any response of aiohttp application right
+before sending it, using ``on_response_prepare`` signal, which means no
+per-request middleware call, no copying of raised
+:class:`aiohttp.web.HTTPException` into new response, and CORS headers for
+stream responses and for errors raised by outer middlewares as well.
+
 Configuration
 =============
 
@@ -111,21 +120,66 @@ Usage
         ]
     )
 
+    # Respond to preflight requests with 204 No Content response
+    # instead of raising web.HTTPOk exception
+    app = web.Application(
+        middlewares=[
+            cors_middleware(
+                origins=CORS_ALLOW_ORIGINS,
+                preflight_status=204,
+            )
+        ]
+    )
+
+    # Let browsers cache preflight responses for 10 minutes only, instead
+    # of default 2 hours
+    app = web.Application(
+        middlewares=[
+            cors_middleware(origins=CORS_ALLOW_ORIGINS, max_age=600)
+        ]
+    )
+
+    # Supply CORS headers via application signals instead of middleware,
+    # must be called after all routes added to the application
+    app = web.Application()
+    app.router.add_get("/api/", api_handler)
+    setup_cors(app, origins=CORS_ALLOW_ORIGINS)
+
+    # Respond with cacheable `Access-Control-Allow-Origin: *` header for
+    # public API urls, while echoing allowed origins for the rest urls
+    app = web.Application(
+        middlewares=[
+            cors_middleware(
+                origins=CORS_ALLOW_ORIGINS,
+                public_urls=[re.compile(r"^\/api\/public")],
+            )
+        ]
+    )
+
 """
 
 import logging
 import re
-from typing import Pattern, Tuple, Union
+from functools import lru_cache, partial
+from typing import Any, Callable, FrozenSet, Pattern, Tuple, Union
 
-from aiohttp import web
+import attr
+from aiohttp import hdrs, web
+from multidict import CIMultiDict, CIMultiDictProxy
 
 from aiohttp_middlewares.annotations import (
+    EventHook,
     Handler,
     Middleware,
     StrCollection,
     UrlCollection,
 )
-from aiohttp_middlewares.utils import match_path
+from aiohttp_middlewares.utils import (
+    compile_urls,
+    emit_event,
+    match_path,
+    UrlMatcher,
+)
 
 
 ACCESS_CONTROL = "Access-Control"
@@ -136,7 +190,9 @@ ACCESS_CONTROL_ALLOW_METHODS = f"{ACCESS_CONTROL_ALLOW}-Methods"
 ACCESS_CONTROL_ALLOW_ORIGIN = f"{ACCESS_CONTROL_ALLOW}-Origin"
 ACCESS_CONTROL_EXPOSE_HEADERS = f"{ACCESS_CONTROL}-Expose-Headers"
 ACCESS_CONTROL_MAX_AGE = f"{ACCESS_CONTROL}-Max-Age"
+ACCESS_CONTROL_REQUEST_HEADERS = f"{ACCESS_CONTROL}-Request-Headers"
 ACCESS_CONTROL_REQUEST_METHOD = f"{ACCESS_CONTROL}-Request-Method"
+VARY = "Vary"
 
 DEFAULT_ALLOW_HEADERS = (
     "accept",
@@ -150,21 +206,336 @@ DEFAULT_ALLOW_HEADERS = (
     "x-requested-with",
 )
 DEFAULT_ALLOW_METHODS = ("DELETE", "GET", "OPTIONS", "PATCH", "POST", "PUT")
+# Chromium caps preflight cache lifetime with 2 hours
+DEFAULT_MAX_AGE = 7200
 DEFAULT_URLS: Tuple[Pattern[str]] = (re.compile(r".*"),)
 
+EVENT_CORS_ALLOWED = "cors.allowed"
+EVENT_CORS_NO_ORIGIN = "cors.no_origin"
+EVENT_CORS_NOT_ALLOWED = "cors.not_allowed"
+EVENT_CORS_PREFLIGHT = "cors.preflight"
+EVENT_CORS_PREFLIGHT_REJECTED = "cors.preflight_rejected"
+EVENT_CORS_SKIPPED = "cors.skipped"
+
+CORS_MESSAGES = {
+    EVENT_CORS_NO_ORIGIN: (
+        "Request does not have Origin header. CORS headers not available for "
+        "given requests"
+    ),
+    EVENT_CORS_ALLOWED: "Provide CORS headers for request",
+    EVENT_CORS_NOT_ALLOWED: "CORS headers not allowed for given Origin",
+    EVENT_CORS_PREFLIGHT: (
+        "Provide CORS headers with empty response for preflight request"
+    ),
+    EVENT_CORS_PREFLIGHT_REJECTED: (
+        "Reject preflight request for not allowed method or headers"
+    ),
+}
+
+PREFLIGHT_CACHE_SIZE = 1024
+PREFLIGHT_STATUSES = (None, 200, 204)
+# Methods, which browsers allow regardless of Access-Control-Allow-Methods
+SAFELISTED_METHODS = frozenset(("GET", "HEAD", "POST"))
+
+PreflightHeaders = Union["CIMultiDictProxy[str]", None]
+
 logger = logging.getLogger(__name__)
 
 
+@attr.dataclass(frozen=True, slots=True)
+class CorsPolicy:
+    """CORS settings compiled on CORS middleware initialization.
+
+    Policy keeps compiled URLs and origins, as well as rendered blocks of CORS
+    headers, so CORS headers merged into response with one update call on
+    each request. Use :meth:`create` to compile policy from
+    :func:`cors_middleware` arguments.
+
+    When ``Access-Control-Allow-Origin`` header echoes request origin,
+    ``Origin`` is merged into ``Vary`` header of the response, so shared
+    caches do not serve response for one origin to another.
+
+    Preflight requests are validated against ``allowed_methods`` &
+    ``allowed_headers`` sets, and complete preflight response headers are
+    kept in bounded cache keyed by origin, requested method and normalized
+    requested headers.
+
+    .. versionadded:: 2.5.0
+    """
+
+    urls: UrlMatcher
+    origins: Union[UrlMatcher, None]
+    allow_all: bool
+    allow_credentials: bool
+    allow_origin_all: bool
+    cors_headers: "CIMultiDictProxy[str]"
+    options_headers: "CIMultiDictProxy[str]"
+    preflight_status: Union[int, None]
+    allowed_headers: FrozenSet[str]
+    allowed_methods: FrozenSet[str]
+    vary_headers: "CIMultiDictProxy[str]"
+    get_preflight_headers: Callable[
+        [str, str, Tuple[str, ...]], PreflightHeaders
+    ]
+    public_urls: Union[UrlMatcher, None] = None
+    public_headers: Union["CIMultiDictProxy[str]", None] = None
+    public_options_headers: Union["CIMultiDictProxy[str]", None] = None
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        allow_all: bool = False,
+        origins: Union[UrlCollection, UrlMatcher, None] = None,
+        urls: Union[UrlCollection, UrlMatcher, None] = None,
+        expose_headers: Union[StrCollection, None] = None,
+        allow_headers: StrCollection = DEFAULT_ALLOW_HEADERS,
+        allow_methods: StrCollection = DEFAULT_ALLOW_METHODS,
+        allow_credentials: bool = False,
+        max_age: Union[int, None] = DEFAULT_MAX_AGE,
+        preflight_status: Union[int, None] = None,
+        public_urls: Union[UrlCollection, UrlMatcher, None] = None,
+    ) -> "CorsPolicy":
+        """Compile CORS policy from :func:`cors_middleware` arguments."""
+        if preflight_status not in PREFLIGHT_STATUSES:
+            raise ValueError(
+                "Preflight status should be one of: "
+                f"{', '.join(str(item) for item in PREFLIGHT_STATUSES[1:])}"
+            )
+        if public_urls and allow_credentials:
+            raise ValueError(
+                "Public URLs respond with `Access-Control-Allow-Origin: *` "
+                "header, which is not compatible with allowed credentials."
+            )
+
+        allowed_origins = compile_urls(origins) if origins else None
+
+        # When all origins allowed without credentials,
+        # Access-Control-Allow-Origin header is a constant as well
+        allow_origin_all = allow_all and not allow_credentials
+        credentials_headers = create_headers_block(
+            allow_credentials=allow_credentials
+        )
+        options_headers = create_headers_block(
+            allow_origin="*" if allow_origin_all else None,
+            expose_headers=expose_headers,
+            allow_headers=allow_headers,
+            allow_methods=allow_methods,
+            max_age=max_age,
+        )
+        allowed_headers = frozenset(item.lower() for item in allow_headers)
+        allowed_methods = SAFELISTED_METHODS.union(
+            item.upper() for item in allow_methods
+        )
+
+        return cls(
+            urls=compile_urls(DEFAULT_URLS if urls is None else urls),
+            origins=allowed_origins,
+            allow_all=allow_all,
+            allow_credentials=allow_credentials,
+            allow_origin_all=allow_origin_all,
+            cors_headers=create_headers_block(
+                allow_origin="*" if allow_origin_all else None,
+                expose_headers=expose_headers,
+            ),
+            options_headers=options_headers,
+            preflight_status=preflight_status,
+            allowed_headers=allowed_headers,
+            allowed_methods=allowed_methods,
+            vary_headers=create_headers_block(
+                vary_origin=not allow_origin_all
+            ),
+            # Preflight headers for given origin, requested method & headers,
+            # including credentials header
+            get_preflight_headers=lru_cache(maxsize=PREFLIGHT_CACHE_SIZE)(
+                partial(
+                    create_preflight_headers,
+                    allow_all=allow_all,
+                    origins=allowed_origins,
+                    allowed_headers=allowed_headers,
+                    allowed_methods=allowed_methods,
+                    credentials_headers=credentials_headers,
+                    options_headers=options_headers,
+                )
+            ),
+            public_urls=compile_urls(public_urls) if public_urls else None,
+            public_headers=create_headers_block(
+                allow_origin="*", expose_headers=expose_headers
+            ),
+            public_options_headers=create_headers_block(
+                allow_origin="*",
+                expose_headers=expose_headers,
+                allow_headers=allow_headers,
+                allow_methods=allow_methods,
+                max_age=max_age,
+            ),
+        )
+
+    def apply(
+        self,
+        response: web.StreamResponse,
+        origin: Union[str, None],
+        *,
+        is_options_request: bool,
+        is_public: bool = False,
+    ) -> bool:
+        """Merge CORS headers for given origin into response.
+
+        Return ``False`` if origin is empty or not allowed. Allow credentials
+        header is set for any non-empty origin, when credentials allowed.
+
+        For public URLs, constant ``Access-Control-Allow-Origin: *`` headers
+        block is merged into response regardless of origin, so response can
+        be cached and served for any origin.
+        """
+        headers = response.headers
+        if is_public:
+            block = (
+                self.public_options_headers
+                if is_options_request
+                else self.public_headers
+            )
+            if block:
+                headers.update(block)
+            return bool(origin)
+
+        if not self.allow_origin_all:
+            add_vary_header(headers, "Origin")
+        if not origin:
+            return False
+
+        if self.allow_credentials:
+            headers[ACCESS_CONTROL_ALLOW_CREDENTIALS] = "true"
+
+        if not self.is_allowed_origin(origin):
+            return False
+
+        # Access-Control-Allow-Origin is a part of headers block when all
+        # origins allowed
+        if not self.allow_origin_all:
+            headers[ACCESS_CONTROL_ALLOW_ORIGIN] = origin
+
+        # Then Access-Control-Expose-Headers and, if this is an options
+        # request, extra Allow headers
+        block = (
+            self.options_headers if is_options_request else self.cors_headers
+        )
+        if block:
+            headers.update(block)
+        return True
+
+    def create_preflight_response(
+        self, headers: PreflightHeaders
+    ) -> web.StreamResponse:
+        """Create empty response to preflight request with given headers.
+
+        Rejected preflight request (``None`` headers) results in
+        ``403 Forbidden`` response. When preflight status is not set, raise
+        :class:`aiohttp.web.HTTPOk` for allowed origin, same as
+        :func:`cors_middleware` does.
+        """
+        if headers is None:
+            return web.Response(status=403, text="", headers=self.vary_headers)
+        if self.preflight_status is not None:
+            return web.Response(status=self.preflight_status, headers=headers)
+        if ACCESS_CONTROL_ALLOW_ORIGIN in headers:
+            raise web.HTTPOk(text="", headers=headers)
+        return web.StreamResponse(headers=headers)
+
+    def get_preflight_answer(
+        self,
+        request: web.Request,
+        origin: Union[str, None],
+        *,
+        is_public: bool = False,
+    ) -> PreflightHeaders:
+        """Get headers of response to given preflight request.
+
+        Return ``None`` if origin is allowed, but requested method or headers
+        are not.
+        """
+        request_headers = request.headers
+        method = request_headers[ACCESS_CONTROL_REQUEST_METHOD]
+        headers = normalize_request_headers(
+            request_headers.get(ACCESS_CONTROL_REQUEST_HEADERS)
+        )
+        if is_public:
+            return (
+                self.public_options_headers
+                if self.is_allowed_preflight(method, headers)
+                else None
+            )
+        if not origin:
+            return self.vary_headers
+        return self.get_preflight_headers(origin, method, headers)
+
+    def is_allowed_preflight(
+        self, method: str, headers: Tuple[str, ...]
+    ) -> bool:
+        """Check whether requested method & headers satisfy CORS policy.
+
+        Requested headers should be lower cased.
+        """
+        return is_allowed_preflight(
+            method,
+            headers,
+            allowed_headers=self.allowed_headers,
+            allowed_methods=self.allowed_methods,
+        )
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        """Check whether given origin satisfies CORS policy."""
+        return self.allow_all or (
+            self.origins is not None and self.origins.match_path(origin)
+        )
+
+    def is_public(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> bool:
+        """Check whether given path responds with ``*`` allowed origin."""
+        public_urls = self.public_urls
+        return public_urls is not None and public_urls.match_path(
+            path, request
+        )
+
+    def match_path(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> bool:
+        """Check whether CORS headers should be supplied for given path.
+
+        Supply request to match route resources and names as well.
+        """
+        return self.urls.match_path(path, request)
+
+    def respond_to_preflight(self, request: web.Request) -> web.StreamResponse:
+        """Respond to preflight request without calling request handler.
+
+        When preflight status is not set, raise :class:`aiohttp.web.HTTPOk`
+        with CORS headers for allowed origin, same as :func:`cors_middleware`
+        does.
+        """
+        return self.create_preflight_response(
+            self.get_preflight_answer(
+                request,
+                request.headers.get("Origin"),
+                is_public=self.is_public(request.rel_url.path, request),
+            )
+        )
+
+
 def cors_middleware(
     *,
     allow_all: bool = False,
-    origins: Union[UrlCollection, None] = None,
-    urls: Union[UrlCollection, None] = None,
+    origins: Union[UrlCollection, UrlMatcher, None] = None,
+    urls: Union[UrlCollection, UrlMatcher, None] = None,
     expose_headers: Union[StrCollection, None] = None,
     allow_headers: StrCollection = DEFAULT_ALLOW_HEADERS,
     allow_methods: StrCollection = DEFAULT_ALLOW_METHODS,
     allow_credentials: bool = False,
-    max_age: Union[int, None] = None,
+    max_age: Union[int, None] = DEFAULT_MAX_AGE,
+    preflight_status: Union[int, None] = None,
+    on_event: Union[EventHook, None] = None,
+    public_urls: Union[UrlCollection, UrlMatcher, None] = None,
 ) -> Middleware:
     """Middleware to provide CORS headers for aiohttp applications.
 
@@ -174,10 +545,24 @@ def cors_middleware(
         result in security issues for your application.** By default: ``False``
     :param origins:
         Allow content access for given list of origins. Support supplying
-        strings for exact origin match or regex instances. By default: ``None``
+        strings for exact origin match or regex instances. By default:
+        ``None``. To memoize allowed / denied decisions for most recent
+        origins pass origins compiled via
+        :func:`aiohttp_middlewares.utils.compile_urls` with ``cache_size``:
+
+        .. code-block:: python
+
+            origins = compile_urls(CORS_ALLOW_ORIGINS, cache_size=1024)
+            cors_middleware(origins=origins)
+
+            # Later on, check cache statistics
+            origins.cache_info()
+
     :param urls:
         Allow content access for given list of URLs in aiohttp application.
-        By default: *apply CORS headers for all URLs*
+        By default: *apply CORS headers for all URLs*. Pass URLs compiled via
+        :func:`aiohttp_middlewares.utils.compile_urls` with ``cache_size`` to
+        memoize matching results for most requested paths.
     :param expose_headers:
         List of headers to be exposed with every CORS request. By default:
         ``None``
@@ -209,9 +594,63 @@ def cors_middleware(
         When enabled apply allow credentials header in response, which results
         in sharing cookies on shared resources. **Please be careful with
         allowing credentials for CORS requests.** By default: ``False``
-    :param max_age: Access control max age in seconds. By default: ``None``
+    :param max_age:
+        Access control max age in seconds, for how long browsers may cache
+        preflight response. Pass ``None`` to omit the header, so browsers
+        fall back to their own default of 5 seconds. By default: ``7200``
+    :param preflight_status:
+        When supplied (``200`` or ``204``), respond to preflight requests with
+        empty response of given status instead of raising
+        :class:`aiohttp.web.HTTPOk`. Which means outer middlewares will get
+        preflight response as a normal return value, and CORS headers for each
+        allowed origin will be rendered only once. By default: ``None``
+    :param on_event:
+        Optional callable to receive event name (``"cors.skipped"``,
+        ``"cors.preflight"``, ``"cors.preflight_rejected"``,
+        ``"cors.no_origin"``, ``"cors.not_allowed"`` or ``"cors.allowed"``)
+        and ``(method, path)`` tuple on each request. By default: ``None``
+    :param public_urls:
+        URLs of public endpoints, which respond with constant
+        ``Access-Control-Allow-Origin: *`` header for any request, instead of
+        echoing allowed origin. Such responses do not vary by ``Origin``, so
+        they can be cached by CDN or other shared caches. Not compatible with
+        ``allow_credentials``. By default: ``None``
+
+    .. versionchanged:: 2.5.0
+
+    ``urls`` compiled with :func:`aiohttp_middlewares.utils.compile_urls` on
+    middleware initialization. Added ``preflight_status`` & ``on_event``
+    arguments. Debug log records are created only when debug logging enabled.
+
+    ``origins`` compiled with :func:`aiohttp_middlewares.utils.compile_urls` on
+    middleware initialization as well, so exact origins are looked up in hash
+    table and all origin regexps are checked with one ``match`` call.
+
+    ``urls`` may refer to aiohttp route names or resources, as
+    ``urls=["api.documents"]``.
+
+    ``Origin`` is merged into ``Vary`` response header, when
+    ``Access-Control-Allow-Origin`` header echoes request origin. Added
+    ``public_urls`` argument.
+
+    Preflight requests for not allowed method
+    (``Access-Control-Request-Method`` header) or headers
+    (``Access-Control-Request-Headers`` header) from allowed origin are
+    rejected with ``403 Forbidden`` response. ``max_age`` is ``7200`` by
+    default.
     """
-    check_urls: UrlCollection = DEFAULT_URLS if urls is None else urls
+    policy = CorsPolicy.create(
+        allow_all=allow_all,
+        origins=origins,
+        urls=urls,
+        expose_headers=expose_headers,
+        allow_headers=allow_headers,
+        allow_methods=allow_methods,
+        allow_credentials=allow_credentials,
+        max_age=max_age,
+        preflight_status=preflight_status,
+        public_urls=public_urls,
+    )
 
     @web.middleware
     async def middleware(
@@ -230,102 +669,350 @@ def cors_middleware(
             and ACCESS_CONTROL_REQUEST_METHOD in request.headers
         )
 
-        # Log extra data
-        log_extra = {
-            "is_preflight_request": is_preflight_request,
-            "method": request_method.lower(),
-            "path": request_path,
-        }
-
         # Check whether CORS should be enabled for given URL or not. By default
         # CORS enabled for all URLs
-        if not match_items(check_urls, request_path):
-            logger.debug(
+        if not policy.match_path(request_path, request):
+            emit_event(
+                logger,
+                on_event,
+                EVENT_CORS_SKIPPED,
                 "Request should not be processed via CORS middleware",
-                extra=log_extra,
+                request_method,
+                request_path,
             )
             return await handler(request)
 
-        # If this is a preflight request - generate empty response
+        origin = request.headers.get("Origin")
+        is_public = policy.is_public(request_path, request)
+
+        # If this is a preflight request - respond with empty response and
+        # do not allow other middlewares to process this request
         if is_preflight_request:
-            response = web.StreamResponse()
-        # Otherwise - call actual handler
-        else:
-            try:
-                response = await handler(request)
-            # In case of ``HTTPException`` - use it as handler response
-            except web.HTTPException as exc:
-                response = web.Response(
-                    headers=exc.headers,
-                    status=exc.status,
-                    reason=exc.reason,
-                    text=exc.text,
-                )
+            headers = policy.get_preflight_answer(
+                request, origin, is_public=is_public
+            )
+            event = get_preflight_event(origin, headers)
+            emit_event(
+                logger,
+                on_event,
+                event,
+                CORS_MESSAGES[event],
+                request_method,
+                request_path,
+            )
+            return policy.create_preflight_response(headers)
 
-        # Now check origin heaer
-        origin = request.headers.get("Origin")
-        # Empty origin - do nothing
-        if not origin:
-            logger.debug(
-                "Request does not have Origin header. CORS headers not "
-                "available for given requests",
-                extra=log_extra,
+        # Otherwise - call actual handler
+        try:
+            response = await handler(request)
+        # In case of ``HTTPException`` - use it as handler response
+        except web.HTTPException as exc:
+            response = create_exception_response(exc)
+
+        # Supply CORS headers if current origin satisfies CORS policy. Empty
+        # or not allowed origin - do nothing, besides of Vary header
+        if not policy.apply(
+            response,
+            origin,
+            is_options_request=is_options_request,
+            is_public=is_public,
+        ):
+            event = EVENT_CORS_NOT_ALLOWED if origin else EVENT_CORS_NO_ORIGIN
+            emit_event(
+                logger,
+                on_event,
+                event,
+                CORS_MESSAGES[event],
+                request_method,
+                request_path,
             )
             return response
 
-        # Set allow credentials header if necessary
-        if allow_credentials:
-            response.headers[ACCESS_CONTROL_ALLOW_CREDENTIALS] = "true"
+        # Otherwise return normal response
+        emit_event(
+            logger,
+            on_event,
+            EVENT_CORS_ALLOWED,
+            CORS_MESSAGES[EVENT_CORS_ALLOWED],
+            request_method,
+            request_path,
+        )
+        return response
 
-        # Check whether current origin satisfies CORS policy
-        if not allow_all and not (origins and match_items(origins, origin)):
-            logger.debug(
-                "CORS headers not allowed for given Origin", extra=log_extra
-            )
-            return response
+    return middleware
 
-        # Now start supplying CORS headers
-        # First one is Access-Control-Allow-Origin
-        if allow_all and not allow_credentials:
-            cors_origin = "*"
-        else:
-            cors_origin = origin
-        response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] = cors_origin
 
-        # Then Access-Control-Expose-Headers
-        if expose_headers:
-            response.headers[ACCESS_CONTROL_EXPOSE_HEADERS] = ", ".join(
-                expose_headers
-            )
+def setup_cors(
+    app: web.Application,
+    *,
+    on_event: Union[EventHook, None] = None,
+    **kwargs: Any,
+) -> CorsPolicy:
+    """Supply CORS headers for aiohttp application via signals.
 
-        # Now, if this is an options request, respond with extra Allow headers
-        if is_options_request:
-            response.headers[ACCESS_CONTROL_ALLOW_HEADERS] = ", ".join(
-                allow_headers
-            )
-            response.headers[ACCESS_CONTROL_ALLOW_METHODS] = ", ".join(
-                allow_methods
+    Alternative to :func:`cors_middleware`, which does not wrap request
+    handlers. CORS headers are merged into each response in
+    ``on_response_prepare`` signal handler, so they are supplied to stream
+    responses, to responses of :class:`aiohttp.web.HTTPException` raised by
+    handlers, as well as to responses of outer middlewares.
+
+    Preflight requests are handled by ``OPTIONS`` routes, added to each
+    application resource, so ``setup_cors`` should be called after all
+    routes added to the application. Resources with own ``OPTIONS`` (or
+    ``*``) handlers are left as is and get CORS headers from the signal
+    handler. ``OPTIONS`` requests, which are not preflight requests or not
+    match CORS ``urls``, result in ``405 Method Not Allowed`` response, same
+    as without ``setup_cors`` call.
+
+    .. code-block:: python
+
+        app = web.Application()
+        app.router.add_get("/api/", api_handler)
+        setup_cors(app, origins=CORS_ALLOW_ORIGINS)
+
+    Other keyword arguments are same as for :func:`cors_middleware`, but
+    ``preflight_status`` is ``200`` by default.
+
+    Return compiled :class:`CorsPolicy`.
+
+    .. versionadded:: 2.5.0
+    """
+    kwargs.setdefault("preflight_status", 200)
+    policy = CorsPolicy.create(**kwargs)
+
+    async def preflight_handler(request: web.Request) -> web.StreamResponse:
+        """Respond to preflight request for any URL."""
+        request_method = request.method
+        request_path = request.rel_url.path
+        if (
+            ACCESS_CONTROL_REQUEST_METHOD not in request.headers
+            or not policy.match_path(request_path, request)
+        ):
+            resource = request.match_info.route.resource
+            raise web.HTTPMethodNotAllowed(
+                request_method,
+                {route.method for route in resource or ()} - {"OPTIONS"},
             )
-            if max_age is not None:
-                response.headers[ACCESS_CONTROL_MAX_AGE] = str(max_age)
 
-        # If this is preflight request - do not allow other middlewares to
-        # process this request
-        if is_preflight_request:
-            logger.debug(
-                "Provide CORS headers with empty response for preflight "
-                "request",
-                extra=log_extra,
+        origin = request.headers.get("Origin")
+        headers = policy.get_preflight_answer(
+            request,
+            origin,
+            is_public=policy.is_public(request_path, request),
+        )
+        event = get_preflight_event(origin, headers)
+        emit_event(
+            logger,
+            on_event,
+            event,
+            CORS_MESSAGES[event],
+            request_method,
+            request_path,
+        )
+        return policy.create_preflight_response(headers)
+
+    async def on_response_prepare(
+        request: web.Request, response: web.StreamResponse
+    ) -> None:
+        """Merge CORS headers into response right before sending it."""
+        # Preflight response already contains all necessary headers
+        if request.match_info.handler is preflight_handler:
+            return
+
+        request_method = request.method
+        request_path = request.rel_url.path
+        if not policy.match_path(request_path, request):
+            emit_event(
+                logger,
+                on_event,
+                EVENT_CORS_SKIPPED,
+                "Request should not be processed via CORS signal",
+                request_method,
+                request_path,
             )
-            raise web.HTTPOk(text="", headers=response.headers)
+            return
 
-        # Otherwise return normal response
-        logger.debug("Provide CORS headers for request", extra=log_extra)
-        return response
+        origin = request.headers.get("Origin")
+        if policy.apply(
+            response,
+            origin,
+            is_options_request=request_method == "OPTIONS",
+            is_public=policy.is_public(request_path, request),
+        ):
+            event = EVENT_CORS_ALLOWED
+        else:
+            event = EVENT_CORS_NOT_ALLOWED if origin else EVENT_CORS_NO_ORIGIN
+        emit_event(
+            logger,
+            on_event,
+            event,
+            CORS_MESSAGES[event],
+            request_method,
+            request_path,
+        )
+
+    for resource in app.router.resources():
+        methods = {route.method for route in resource}
+        if isinstance(resource, web.Resource) and not (
+            methods & {"OPTIONS", hdrs.METH_ANY}
+        ):
+            resource.add_route("OPTIONS", preflight_handler)
+    app.on_response_prepare.append(on_response_prepare)
+    return policy
+
+
+def add_vary_header(headers: "CIMultiDict[str]", value: str) -> None:
+    """Merge given value into ``Vary`` header, keeping existing values.
+
+    .. versionadded:: 2.5.0
+    """
+    current = headers.get(VARY)
+    if not current:
+        headers[VARY] = value
+        return
+
+    items = {item.strip().lower() for item in current.split(",")}
+    if "*" not in items and value.lower() not in items:
+        headers[VARY] = f"{current}, {value}"
+
+
+def create_exception_response(exc: web.HTTPException) -> web.Response:
+    """Create response from HTTP exception to supply CORS headers into it.
+
+    .. versionadded:: 2.5.0
+    """
+    return web.Response(
+        headers=exc.headers,
+        status=exc.status,
+        reason=exc.reason,
+        text=exc.text,
+    )
+
+
+def create_headers_block(
+    *,
+    allow_credentials: bool = False,
+    allow_origin: Union[str, None] = None,
+    expose_headers: Union[StrCollection, None] = None,
+    allow_headers: Union[StrCollection, None] = None,
+    allow_methods: Union[StrCollection, None] = None,
+    max_age: Union[int, None] = None,
+    vary_origin: bool = False,
+) -> "CIMultiDictProxy[str]":
+    """Render immutable block of CORS headers to merge into response.
+
+    .. versionadded:: 2.5.0
+    """
+    headers: "CIMultiDict[str]" = CIMultiDict()
+    if allow_credentials:
+        headers[ACCESS_CONTROL_ALLOW_CREDENTIALS] = "true"
+    if allow_origin is not None:
+        headers[ACCESS_CONTROL_ALLOW_ORIGIN] = allow_origin
+    if expose_headers:
+        headers[ACCESS_CONTROL_EXPOSE_HEADERS] = ", ".join(expose_headers)
+    if allow_headers is not None:
+        headers[ACCESS_CONTROL_ALLOW_HEADERS] = ", ".join(allow_headers)
+    if allow_methods is not None:
+        headers[ACCESS_CONTROL_ALLOW_METHODS] = ", ".join(allow_methods)
+    if max_age is not None:
+        headers[ACCESS_CONTROL_MAX_AGE] = str(max_age)
+    if vary_origin:
+        headers[VARY] = "Origin"
+    return CIMultiDictProxy(headers)
+
+
+def create_preflight_headers(
+    origin: str,
+    method: str,
+    request_headers: Tuple[str, ...],
+    *,
+    allow_all: bool,
+    origins: Union[UrlMatcher, None],
+    allowed_headers: FrozenSet[str],
+    allowed_methods: FrozenSet[str],
+    credentials_headers: "CIMultiDictProxy[str]",
+    options_headers: "CIMultiDictProxy[str]",
+) -> PreflightHeaders:
+    """Render immutable block of preflight response headers for given origin.
+
+    Return ``None`` if origin is allowed, but requested method or headers
+    are not.
+
+    .. versionadded:: 2.5.0
+    """
+    headers = CIMultiDict(credentials_headers)
+    if ACCESS_CONTROL_ALLOW_ORIGIN not in options_headers:
+        headers[VARY] = "Origin"
+    if not allow_all and not (
+        origins is not None and origins.match_path(origin)
+    ):
+        return CIMultiDictProxy(headers)
+    if not is_allowed_preflight(
+        method,
+        request_headers,
+        allowed_headers=allowed_headers,
+        allowed_methods=allowed_methods,
+    ):
+        return None
+
+    if ACCESS_CONTROL_ALLOW_ORIGIN not in options_headers:
+        headers[ACCESS_CONTROL_ALLOW_ORIGIN] = origin
+    headers.update(options_headers)
+    return CIMultiDictProxy(headers)
+
+
+def get_preflight_event(
+    origin: Union[str, None], headers: PreflightHeaders
+) -> str:
+    """Get event name for preflight response with given headers.
+
+    .. versionadded:: 2.5.0
+    """
+    if headers is None:
+        return EVENT_CORS_PREFLIGHT_REJECTED
+    if ACCESS_CONTROL_ALLOW_ORIGIN in headers:
+        return EVENT_CORS_PREFLIGHT
+    return EVENT_CORS_NOT_ALLOWED if origin else EVENT_CORS_NO_ORIGIN
 
-    return middleware
+
+def is_allowed_preflight(
+    method: str,
+    request_headers: Tuple[str, ...],
+    *,
+    allowed_headers: FrozenSet[str],
+    allowed_methods: FrozenSet[str],
+) -> bool:
+    """Check whether requested method & headers are allowed.
+
+    ``"*"`` in allowed methods or headers allows any method or header.
+    Methods are compared case-insensitively, allowed methods should be upper
+    cased.
+
+    .. versionadded:: 2.5.0
+    """
+    if method.upper() not in allowed_methods and "*" not in allowed_methods:
+        return False
+    return "*" in allowed_headers or allowed_headers.issuperset(
+        request_headers
+    )
 
 
 def match_items(items: UrlCollection, value: str) -> bool:
     """Go through all items and try to match item with given value."""
     return any(match_path(item, value) for item in items)
+
+
+@lru_cache(maxsize=PREFLIGHT_CACHE_SIZE)
+def normalize_request_headers(value: Union[str, None]) -> Tuple[str, ...]:
+    """Normalize ``Access-Control-Request-Headers`` header value.
+
+    Return sorted tuple of unique lower cased header names. Results are
+    cached per header value.
+
+    .. versionadded:: 2.5.0
+    """
+    if not value:
+        return ()
+    return tuple(
+        sorted({item.strip().lower() for item in value.split(",")} - {""})
+    )
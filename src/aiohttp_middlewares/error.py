@@ -42,10 +42,12 @@ Usage
 
 .. code-block:: python
 
+    import asyncio
     import re
 
     from aiohttp import web
     from aiohttp_middlewares import (
+        create_static_error_handler,
         default_error_handler,
         error_context,
         error_middleware,
@@ -81,33 +83,321 @@ Usage
         ]
     )
 
+    # Respond with precomputed responses for timeout & not found errors
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                exception_handlers={
+                    asyncio.TimeoutError: create_static_error_handler(504),
+                    web.HTTPNotFound: create_static_error_handler(404),
+                }
+            )
+        ]
+    )
+
 """
 
+import json
 import logging
+import time
 from contextlib import contextmanager
-from functools import partial
-from typing import Dict, Iterator, Tuple, Union
+from functools import lru_cache, partial
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, Iterator, Tuple, Type, Union
 
 import attr
 from aiohttp import web
 
 from aiohttp_middlewares.annotations import (
     DictStrAny,
+    EventHook,
     ExceptionType,
     Handler,
+    JSONDumps,
     Middleware,
     Url,
 )
-from aiohttp_middlewares.utils import match_path
+from aiohttp_middlewares.utils import (
+    compile_urls,
+    emit_event,
+    match_path,
+    UrlMatcher,
+)
 
 
+DEFAULT_BODY_CACHE_SIZE = 128
+DEFAULT_SAMPLER_LIMIT = 10
+DEFAULT_SAMPLER_MAX_KEYS = 1024
+DEFAULT_SAMPLER_WINDOW = 60.0
 DEFAULT_EXCEPTION = Exception("Unhandled aiohttp-middlewares exception.")
+EVENT_ERROR_HANDLED = "error.handled"
 REQUEST_ERROR_KEY = "error"
 
 Config = Dict[Url, Handler]
+ExceptionHandlers = Dict[Type[Exception], Handler]
+ErrorKey = Tuple[Type[BaseException], Union[str, None], Union[int, None]]
+IgnoreExceptions = Union[ExceptionType, Tuple[ExceptionType, ...], None]
 logger = logging.getLogger(__name__)
 
 
+@attr.dataclass(frozen=True, slots=True)
+class CompiledConfig:
+    """Error handlers config compiled on error middleware initialization.
+
+    URLs from config are compiled with
+    :func:`aiohttp_middlewares.utils.compile_urls`, so lookup of error handler
+    does not walk through whole config on each error, while handlers are still
+    resolved in the order of config dict keys.
+
+    .. versionadded:: 2.5.0
+    """
+
+    urls: UrlMatcher
+    handlers: Tuple[Handler, ...]
+
+    @classmethod
+    def from_config(cls, config: Config) -> "CompiledConfig":
+        """Compile error handlers config."""
+        return cls(
+            urls=compile_urls(tuple(config)), handlers=tuple(config.values())
+        )
+
+    def get_handler(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> Union[Handler, None]:
+        """Find error handler matching given path if any.
+
+        Supply request to match route resources and names as well.
+        """
+        index = self.urls.find(path, request)
+        if index is None:
+            return None
+        return self.handlers[index]
+
+
+@attr.dataclass(frozen=True, slots=True)
+class ErrorPolicy:
+    """Error middleware settings compiled on middleware initialization.
+
+    Decision whether to ignore exception or not, as well as exception handler
+    resolved via exception class MRO, are cached per exception class, so
+    repeat exceptions of same class skip the checks. Use :meth:`create` to
+    compile policy from :func:`error_middleware` arguments.
+
+    .. versionadded:: 2.5.0
+    """
+
+    default_handler: Handler
+    config: Union[CompiledConfig, None]
+    ignore_exceptions: IgnoreExceptions
+    exception_handlers: Union[ExceptionHandlers, None] = None
+    ignored_classes: Dict[Type[Exception], bool] = attr.ib(factory=dict)
+    handler_classes: Dict[Type[Exception], Union[Handler, None]] = attr.ib(
+        factory=dict
+    )
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        default_handler: Union[Handler, None] = None,
+        config: Union[Config, CompiledConfig, None] = None,
+        ignore_exceptions: IgnoreExceptions = None,
+        exception_handlers: Union[ExceptionHandlers, None] = None,
+    ) -> "ErrorPolicy":
+        """Compile error policy from :func:`error_middleware` arguments.
+
+        When ``default_handler`` is omitted, :func:`default_error_handler` is
+        used.
+        """
+        return cls(
+            default_handler=default_handler or default_error_handler,
+            config=compile_config(config),
+            ignore_exceptions=ignore_exceptions,
+            exception_handlers=exception_handlers or None,
+        )
+
+    def get_exception_handler(
+        self, err_class: Type[Exception]
+    ) -> Union[Handler, None]:
+        """Get handler for exceptions of given class if any.
+
+        Handler is resolved via exception class MRO, so handler of closest
+        base class is used.
+        """
+        handler_classes = self.handler_classes
+        if err_class in handler_classes:
+            return handler_classes[err_class]
+
+        handler = handler_classes[err_class] = find_exception_handler(
+            err_class, self.exception_handlers or {}
+        )
+        return handler
+
+    def is_ignored(self, err_class: Type[Exception]) -> bool:
+        """Check whether exceptions of given class should be ignored."""
+        ignored = self.ignored_classes.get(err_class)
+        if ignored is None:
+            ignored = self.ignored_classes[err_class] = is_ignored_exception(
+                err_class, self.ignore_exceptions
+            )
+        return ignored
+
+    def get_handler(
+        self,
+        path: str,
+        request: Union[web.Request, None] = None,
+        err_class: Union[Type[Exception], None] = None,
+    ) -> Handler:
+        """Get error handler for given path, fallback to default handler.
+
+        When exception class supplied, handler for the exception class takes
+        precedence over handler for the path.
+        """
+        if err_class is not None and self.exception_handlers:
+            handler = self.get_exception_handler(err_class)
+            if handler is not None:
+                return handler
+
+        config = self.config
+        error_handler = config.get_handler(path, request) if config else None
+        return error_handler or self.default_handler
+
+    def handle(
+        self, request: web.Request, err: Exception, path: str
+    ) -> Awaitable[web.StreamResponse]:
+        """Store error in request and call error handler for given path."""
+        set_error_to_request(request, err)
+        return self.get_handler(path, request, type(err))(request)
+
+
+class SamplerWindow:
+    """State of sampling window for one kind of errors.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("logged", "started_at", "suppressed")
+
+    def __init__(self, started_at: float) -> None:
+        self.logged = 0
+        self.started_at = started_at
+        self.suppressed = 0
+
+
+class TracebackSampler:
+    """Sample and deduplicate error tracebacks in logs.
+
+    Errors are grouped by exception class and the frame, which raised the
+    exception. Within each ``window`` seconds only first ``limit`` errors of
+    the group are logged with full traceback. Rest of errors are counted and
+    reported in one summary line without traceback, after the window of the
+    group expired: on the next error of any group, or on application
+    shutdown, when :meth:`on_shutdown` is connected to the application:
+
+    .. code-block:: python
+
+        sampler = TracebackSampler(limit=5, window=60)
+        app.on_shutdown.append(sampler.on_shutdown)
+
+    At most ``max_keys`` groups are tracked, when limit reached, the group
+    with the oldest window is flushed and forgotten.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_windows", "clock", "limit", "max_keys", "window")
+
+    def __init__(
+        self,
+        *,
+        limit: int = DEFAULT_SAMPLER_LIMIT,
+        window: float = DEFAULT_SAMPLER_WINDOW,
+        max_keys: int = DEFAULT_SAMPLER_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if limit < 1 or max_keys < 1:
+            raise ValueError("Limit & max keys should be positive integers.")
+        if window <= 0:
+            raise ValueError("Window should be positive.")
+
+        self._windows: Dict[ErrorKey, SamplerWindow] = {}
+        self.clock = clock
+        self.limit = limit
+        self.max_keys = max_keys
+        self.window = window
+
+    def __len__(self) -> int:
+        return len(self._windows)
+
+    def flush(self, logger: logging.Logger) -> int:
+        """Log summary lines for all groups and forget them.
+
+        Return total amount of suppressed errors.
+        """
+        suppressed = 0
+        for key, state in self._windows.items():
+            suppressed += log_suppressed_errors(logger, key, state)
+        self._windows.clear()
+        return suppressed
+
+    async def on_shutdown(self, app: web.Application) -> None:
+        """Log summary lines for all groups on application shutdown."""
+        self.flush(logger)
+
+    def flush_expired(
+        self, logger: logging.Logger, now: Union[float, None] = None
+    ) -> int:
+        """Log summary lines for groups with expired windows and forget them.
+
+        Return total amount of suppressed errors.
+        """
+        if now is None:
+            now = self.clock()
+
+        # Windows are ordered by start time, so stop on the first window,
+        # which is not expired yet
+        suppressed = 0
+        windows = self._windows
+        while windows:
+            oldest = next(iter(windows))
+            if now - windows[oldest].started_at < self.window:
+                break
+            suppressed += log_suppressed_errors(
+                logger, oldest, windows.pop(oldest)
+            )
+        return suppressed
+
+    def log(
+        self, logger: logging.Logger, err: BaseException, message: str
+    ) -> bool:
+        """Log error with traceback if it is sampled.
+
+        Return ``True`` if traceback has been logged.
+        """
+        key = get_error_key(err)
+        now = self.clock()
+        windows = self._windows
+
+        self.flush_expired(logger, now)
+        state = windows.get(key)
+        if state is None:
+            if len(windows) >= self.max_keys:
+                oldest = next(iter(windows))
+                log_suppressed_errors(logger, oldest, windows.pop(oldest))
+            # Group with new window is (re)inserted to the end, so windows
+            # are ordered by start time and the first one is the oldest
+            state = windows[key] = SamplerWindow(now)
+
+        if state.logged >= self.limit:
+            state.suppressed += 1
+            return False
+
+        state.logged += 1
+        logger.error(message, exc_info=err)
+        return True
+
+
 @attr.dataclass(frozen=True, slots=True)
 class ErrorContext:
     """Context with all necessary data about the error."""
@@ -118,6 +408,30 @@ class ErrorContext:
     data: DictStrAny
 
 
+@attr.dataclass(frozen=True, slots=True)
+class StaticErrorHandler:
+    """Error handler to respond with precomputed JSON response.
+
+    Use :func:`create_static_error_handler` to create the handler. Handler
+    representation contains response status, so handlers for different
+    statuses are distinguished in metrics & logs.
+
+    .. versionadded:: 2.5.0
+    """
+
+    status: int
+    body: bytes = attr.ib(repr=False)
+
+    async def __call__(self, request: web.Request) -> web.StreamResponse:
+        """Respond with precomputed JSON response."""
+        return web.Response(
+            body=self.body,
+            status=self.status,
+            content_type="application/json",
+            charset="utf-8",
+        )
+
+
 async def default_error_handler(request: web.Request) -> web.Response:
     """Default error handler to respond with JSON error details.
 
@@ -135,10 +449,154 @@ async def default_error_handler(request: web.Request) -> web.Response:
     ``aiohttp_middlewares`` in logging config.
 
     .. versionadded:: 1.0.0
+
+    .. versionchanged:: 2.5.0
+
+    Response body for errors with default ``{"detail": str(err)}`` data is
+    rendered once per error message, and reused from bounded cache for repeat
+    errors. Use :func:`create_error_handler` to supply faster JSON
+    encoder or to configure the cache size.
     """
     with error_context(request) as context:
         logger.error(context.message, exc_info=True)  # noqa: LOG014
-        return web.json_response(context.data, status=context.status)
+        return render_default_json_error(context)
+
+
+def create_error_handler(
+    *,
+    dumps: Union[JSONDumps, None] = None,
+    cache_size: Union[int, None] = DEFAULT_BODY_CACHE_SIZE,
+    sampler: Union[TracebackSampler, None] = None,
+) -> Handler:
+    """Create error handler to respond with JSON error details.
+
+    Created handler behaves same way as :func:`default_error_handler`, but
+    allows to supply custom JSON encoder, such as ``orjson.dumps``, which is
+    used instead of :func:`json.dumps`. If custom encoder unable to render
+    error data, standard library encoder is used as a fallback.
+
+    .. code-block:: python
+
+        import orjson
+        from aiohttp import web
+        from aiohttp_middlewares import create_error_handler, error_middleware
+
+        app = web.Application(
+            middlewares=[
+                error_middleware(
+                    default_handler=create_error_handler(
+                        dumps=orjson.dumps
+                    )
+                )
+            ]
+        )
+
+    :param dumps:
+        JSON encoder, which returns ``str`` or ``bytes``. By default:
+        :func:`json.dumps`
+    :param cache_size:
+        Max amount of rendered response bodies for errors with default data
+        to keep in LRU cache, keyed by error message. Pass ``None`` to disable
+        the cache. By default: ``128``
+    :param sampler:
+        :class:`TracebackSampler` to log full tracebacks only for first
+        errors of same class and raising frame within time window, instead of
+        logging traceback for each error. By default: ``None``
+
+    To avoid formatting thousands of identical tracebacks, when dependency is
+    down, sample tracebacks as:
+
+    .. code-block:: python
+
+        sampler = TracebackSampler(limit=5, window=60)
+        error_handler = create_error_handler(sampler=sampler)
+
+        # Log summary lines of suppressed tracebacks on shutdown as well
+        app.on_shutdown.append(sampler.on_shutdown)
+
+    .. versionadded:: 2.5.0
+    """
+    render_error = create_json_error_renderer(
+        dumps=dumps, cache_size=cache_size
+    )
+
+    async def error_handler(request: web.Request) -> web.StreamResponse:
+        with error_context(request) as context:
+            if sampler is None:
+                logger.error(context.message, exc_info=True)  # noqa: LOG014
+            else:
+                sampler.log(logger, context.err, context.message)
+            return render_error(context)
+
+    return error_handler
+
+
+def create_static_error_handler(
+    status: int,
+    detail: Union[str, None] = None,
+    *,
+    dumps: Union[JSONDumps, None] = None,
+) -> Handler:
+    """Create error handler to respond with precomputed JSON response.
+
+    Response body ``{"detail": detail}`` is rendered once on handler creation
+    (by default, detail is a status phrase, like ``"Gateway Timeout"``), and
+    handler neither inspects the error nor logs it. Which makes the handler
+    cheap enough to handle error storms, like timeouts of dead dependency.
+
+    .. code-block:: python
+
+        app = web.Application(
+            middlewares=[
+                error_middleware(
+                    exception_handlers={
+                        asyncio.TimeoutError: create_static_error_handler(504)
+                    }
+                )
+            ]
+        )
+
+    .. versionadded:: 2.5.0
+    """
+    return StaticErrorHandler(
+        status=status,
+        body=render_json_detail(
+            detail or HTTPStatus(status).phrase, dumps=dumps
+        ),
+    )
+
+
+def create_json_error_renderer(
+    *,
+    dumps: Union[JSONDumps, None] = None,
+    cache_size: Union[int, None] = DEFAULT_BODY_CACHE_SIZE,
+) -> Callable[[ErrorContext], web.Response]:
+    """Create function to render JSON response for given error context.
+
+    Body does not depend on error status, so when ``cache_size`` set, bodies
+    for up to ``cache_size`` error messages are cached by message only.
+
+    .. versionadded:: 2.5.0
+    """
+    render_detail: Callable[[str], bytes] = partial(
+        render_json_detail, dumps=dumps
+    )
+    if cache_size:
+        render_detail = lru_cache(maxsize=cache_size)(render_detail)
+
+    def render_error(context: ErrorContext) -> web.Response:
+        if getattr(context.err, "data", None):
+            body = render_json(context.data, dumps=dumps)
+        else:
+            body = render_detail(context.message)
+        return web.Response(
+            body=body,
+            status=context.status,
+            content_type="application/json",
+            charset="utf-8",
+        )
+
+    return render_error
 
 
 @contextmanager
@@ -164,10 +622,10 @@ def error_context(request: web.Request) -> Iterator[ErrorContext]:
 def error_middleware(
     *,
     default_handler: Handler = default_error_handler,
-    config: Union[Config, None] = None,
-    ignore_exceptions: Union[
-        ExceptionType, Tuple[ExceptionType, ...], None
-    ] = None,
+    config: Union[Config, CompiledConfig, None] = None,
+    ignore_exceptions: IgnoreExceptions = None,
+    on_event: Union[EventHook, None] = None,
+    exception_handlers: Union[ExceptionHandlers, None] = None,
 ) -> Middleware:
     """Middleware to handle exceptions in aiohttp applications.
 
@@ -195,12 +653,30 @@ def error_middleware(
         ``Url`` matches current request path if any.
     :param ignore_exceptions:
         Do not process given exceptions via error middleware.
+    :param on_event:
+        Optional callable to receive ``("error.handled", (method, path,
+        error_handler))`` event on each error processed by error middleware.
+        By default: ``None``
+    :param exception_handlers:
+        Mapping of exception class to error handler. Handler for the closest
+        exception class in MRO of raised exception is used, and it takes
+        precedence over ``config`` handlers. Use
+        :func:`create_static_error_handler` to respond with precomputed
+        response. By default: ``None``
+
+    .. versionchanged:: 2.5.0
+
+    ``config`` compiled into :class:`CompiledConfig` on middleware
+    initialization. Decision whether to ignore exception or not is cached per
+    exception class, so repeat exceptions of same class skip the check.
+    ``config`` keys may refer to aiohttp route names or resources. Added
+    ``on_event`` & ``exception_handlers`` arguments.
     """
-    get_response = partial(
-        get_error_response,
+    policy = ErrorPolicy.create(
         default_handler=default_handler,
         config=config,
         ignore_exceptions=ignore_exceptions,
+        exception_handlers=exception_handlers,
     )
 
     @web.middleware
@@ -210,11 +686,70 @@ def error_middleware(
         try:
             return await handler(request)
         except Exception as err:
-            return await get_response(request, err)
+            if policy.is_ignored(type(err)):
+                raise
+
+            request_path = request.rel_url.path
+            error_handler = policy.get_handler(
+                request_path, request, type(err)
+            )
+            emit_event(
+                logger,
+                on_event,
+                EVENT_ERROR_HANDLED,
+                "Handle error by error handler",
+                request.method,
+                request_path,
+                error_handler,
+            )
+
+            set_error_to_request(request, err)
+            return await error_handler(request)
 
     return middleware
 
 
+def compile_config(
+    config: Union[Config, CompiledConfig, None]
+) -> Union[CompiledConfig, None]:
+    """Compile error handlers config if any.
+
+    .. versionadded:: 2.5.0
+    """
+    if not config:
+        return None
+    if isinstance(config, CompiledConfig):
+        return config
+    return CompiledConfig.from_config(config)
+
+
+def find_exception_handler(
+    err_class: Type[Exception], exception_handlers: ExceptionHandlers
+) -> Union[Handler, None]:
+    """Find handler for closest class in MRO of given exception class.
+
+    .. versionadded:: 2.5.0
+    """
+    for item in err_class.__mro__:
+        handler = exception_handlers.get(item)
+        if handler is not None:
+            return handler
+    return None
+
+
+def get_error_key(err: BaseException) -> ErrorKey:
+    """Get key of exception class and the frame, which raised exception.
+
+    .. versionadded:: 2.5.0
+    """
+    tb = err.__traceback__
+    if tb is None:
+        return (type(err), None, None)
+    while tb.tb_next is not None:
+        tb = tb.tb_next
+    return (type(err), tb.tb_frame.f_code.co_filename, tb.tb_lineno)
+
+
 def get_error_from_request(request: web.Request) -> Exception:
     """Get previously stored error from request dict.
 
@@ -224,13 +759,16 @@ def get_error_from_request(request: web.Request) -> Exception:
 
 
 def get_error_handler(
-    request: web.Request, config: Union[Config, None]
+    request: web.Request, config: Union[Config, CompiledConfig, None]
 ) -> Union[Handler, None]:
     """Find error handler matching current request path if any."""
     if not config:
         return None
 
     path = request.rel_url.path
+    if isinstance(config, CompiledConfig):
+        return config.get_handler(path, request)
+
     for item, handler in config.items():
         if match_path(item, path):
             return handler
@@ -243,10 +781,8 @@ async def get_error_response(
     err: Exception,
     *,
     default_handler: Handler = default_error_handler,
-    config: Union[Config, None] = None,
-    ignore_exceptions: Union[
-        ExceptionType, Tuple[ExceptionType, ...], None
-    ] = None,
+    config: Union[Config, CompiledConfig, None] = None,
+    ignore_exceptions: IgnoreExceptions = None,
 ) -> web.StreamResponse:
     """Actual coroutine to get response for given request & error.
 
@@ -284,7 +820,71 @@ async def get_error_response(
     return await error_handler(request)
 
 
+def is_ignored_exception(
+    err_class: Type[Exception], ignore_exceptions: IgnoreExceptions
+) -> bool:
+    """Check whether exceptions of given class should be ignored or not.
+
+    .. versionadded:: 2.5.0
+    """
+    if not ignore_exceptions:
+        return False
+    return issubclass(err_class, ignore_exceptions)
+
+
+def log_suppressed_errors(
+    logger: logging.Logger, key: ErrorKey, state: SamplerWindow
+) -> int:
+    """Log summary line for suppressed errors of sampler window if any.
+
+    .. versionadded:: 2.5.0
+    """
+    suppressed = state.suppressed
+    if suppressed:
+        err_class, filename, lineno = key
+        logger.error(
+            "Suppressed %d tracebacks of %s raised at %s:%s",
+            suppressed,
+            err_class.__qualname__,
+            filename,
+            lineno,
+            extra={"suppressed": suppressed},
+        )
+    return suppressed
+
+
+def render_json(data: Any, *, dumps: Union[JSONDumps, None] = None) -> bytes:
+    """Render data into JSON bytes.
+
+    When custom encoder unable to render the data, fallback to
+    :func:`json.dumps`.
+
+    .. versionadded:: 2.5.0
+    """
+    rendered: Union[bytes, str]
+    try:
+        rendered = (dumps or json.dumps)(data)
+    except (TypeError, ValueError):
+        if dumps is None:
+            raise
+        rendered = json.dumps(data)
+    return rendered.encode("utf-8") if isinstance(rendered, str) else rendered
+
+
+def render_json_detail(
+    detail: str, *, dumps: Union[JSONDumps, None] = None
+) -> bytes:
+    """Render default error data into JSON bytes.
+
+    .. versionadded:: 2.5.0
+    """
+    return render_json({"detail": detail}, dumps=dumps)
+
+
 def set_error_to_request(request: web.Request, err: Exception) -> Exception:
     """Store catched error to request dict."""
     request[REQUEST_ERROR_KEY] = err
     return err
+
+
+render_default_json_error = create_json_error_renderer()
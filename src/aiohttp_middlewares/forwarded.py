@@ -0,0 +1,396 @@
+r"""
+=================
+Forwarded Headers
+=================
+
+.. versionadded:: 2.5.0
+
+Parse ``Forwarded`` (`RFC 7239 <https://tools.ietf.org/html/rfc7239>`_) and
+``X-Forwarded-For``, ``X-Forwarded-Proto`` & ``X-Forwarded-Host`` headers,
+set by reverse proxies.
+
+Forwarded headers can be trusted only when they are set by known reverse
+proxy, as any client is able to send them. So headers are used only when
+request peer address belongs to one of trusted networks. When request passed
+through chain of proxies, hops are walked from the closest one, while the hop
+address is trusted as well.
+
+Trusted proxy passes through any headers it does not set (or overwrite)
+itself, so only headers, which are managed by trusted proxies, should be
+used. Like, when nginx sets ``X-Forwarded-For`` & ``X-Forwarded-Proto``
+headers, ``Forwarded`` or ``X-Forwarded-Host`` header is sent by the client
+and should be ignored.
+
+Load balancers send small set of distinct header values, so parsed headers
+are kept in bounded cache keyed by raw header value.
+
+Usage
+=====
+
+.. code-block:: python
+
+    from aiohttp import web
+    from aiohttp_middlewares.forwarded import (
+        compile_forwarded_headers,
+        compile_trusted_networks,
+        get_forwarded,
+    )
+
+    networks = compile_trusted_networks(["10.0.0.0/8", "127.0.0.1"])
+    headers = compile_forwarded_headers(
+        ["X-Forwarded-For", "X-Forwarded-Proto"]
+    )
+
+    async def handler(request: web.Request) -> web.Response:
+        forwarded = get_forwarded(request, networks, headers)
+        if forwarded is not None:
+            print(forwarded.for_, forwarded.proto, forwarded.host)
+        ...
+
+"""
+
+import ipaddress
+import re
+from functools import lru_cache
+from typing import Collection, Dict, FrozenSet, Tuple, Union
+
+import attr
+from aiohttp import web
+from multidict import CIMultiDictProxy
+
+
+DEFAULT_PARSE_CACHE_SIZE = 256
+DEFAULT_TRUSTED_CACHE_SIZE = 1024
+
+FORWARDED = "Forwarded"
+X_FORWARDED_FOR = "X-Forwarded-For"
+X_FORWARDED_HOST = "X-Forwarded-Host"
+X_FORWARDED_PROTO = "X-Forwarded-Proto"
+FORWARDED_HEADERS = (
+    FORWARDED,
+    X_FORWARDED_FOR,
+    X_FORWARDED_HOST,
+    X_FORWARDED_PROTO,
+)
+DEFAULT_FORWARDED_HEADERS = frozenset((X_FORWARDED_FOR, X_FORWARDED_PROTO))
+
+TOKEN = r"[!#$%&'*+.^_`|~0-9A-Za-z-]+"
+QUOTED_STRING = r'"(?:\\[\t !-~]|[\t !#-\[\]-~])*"'
+FORWARDED_PAIR_RE = re.compile(
+    rf"[ \t]*({TOKEN})=({TOKEN}|{QUOTED_STRING})[ \t]*"
+)
+QUOTED_PAIR_RE = re.compile(r"\\([\t !-~])")
+
+ForwardedHeaders = FrozenSet[str]
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+@attr.dataclass(frozen=True, slots=True)
+class ForwardedElement:
+    """Parameters of one proxy hop from forwarded headers.
+
+    ``for_`` is a node (address with optional port) of the client, which
+    sent request to the proxy, ``by`` is a node of the proxy itself,
+    ``proto`` & ``host`` are URL scheme & ``Host`` header of original
+    request.
+
+    .. versionadded:: 2.5.0
+    """
+
+    by: Union[str, None] = None
+    for_: Union[str, None] = None
+    host: Union[str, None] = None
+    proto: Union[str, None] = None
+
+    @property
+    def address(self) -> Union[str, None]:
+        """IP address from ``for_`` node without port.
+
+        Return ``None`` for unknown or obfuscated nodes.
+        """
+        return get_node_address(self.for_)
+
+
+ForwardedElements = Tuple[ForwardedElement, ...]
+
+
+class TrustedNetworks:
+    """Networks of trusted reverse proxies.
+
+    Check results are cached per address in bounded dict, as requests come
+    from small set of proxy addresses.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_cache", "cache_size", "networks")
+
+    def __init__(
+        self,
+        networks: Collection[str],
+        *,
+        cache_size: int = DEFAULT_TRUSTED_CACHE_SIZE,
+    ) -> None:
+        self._cache: Dict[str, bool] = {}
+        self.cache_size = cache_size
+        self.networks: Tuple[Network, ...] = tuple(
+            ipaddress.ip_network(item, strict=False) for item in networks
+        )
+
+    def __contains__(self, address: object) -> bool:
+        if not isinstance(address, str):
+            return False
+
+        cache = self._cache
+        trusted = cache.get(address)
+        if trusted is None:
+            trusted = is_trusted_address(address, self.networks)
+            if len(cache) >= self.cache_size:
+                cache.clear()
+            cache[address] = trusted
+        return trusted
+
+
+def compile_forwarded_headers(
+    headers: Collection[str],
+) -> ForwardedHeaders:
+    """Compile collection of forwarded headers, set by trusted proxies.
+
+    Header names are case insensitive. Raise ``ValueError`` for unknown
+    headers, or when ``Forwarded`` header is mixed with ``X-Forwarded-*``
+    headers, as proxies set one of them.
+
+    .. versionadded:: 2.5.0
+    """
+    names = {item.lower(): item for item in FORWARDED_HEADERS}
+    try:
+        compiled = frozenset(names[item.lower()] for item in headers)
+    except KeyError as err:
+        raise ValueError(
+            f"Unknown forwarded header: {err.args[0]}. Supported headers: "
+            f"{', '.join(FORWARDED_HEADERS)}"
+        ) from err
+
+    if not compiled:
+        raise ValueError("Forwarded headers should not be empty.")
+    if FORWARDED in compiled and len(compiled) > 1:
+        raise ValueError(
+            "Forwarded header should not be mixed with X-Forwarded-* headers."
+        )
+    return compiled
+
+
+def compile_trusted_networks(
+    networks: Union[Collection[str], TrustedNetworks],
+) -> TrustedNetworks:
+    """Compile collection of trusted networks (CIDRs or addresses).
+
+    .. versionadded:: 2.5.0
+    """
+    if isinstance(networks, TrustedNetworks):
+        return networks
+    return TrustedNetworks(networks)
+
+
+def get_forwarded(
+    request: web.Request,
+    networks: TrustedNetworks,
+    headers: ForwardedHeaders = DEFAULT_FORWARDED_HEADERS,
+) -> Union[ForwardedElement, None]:
+    """Get forwarded parameters of the hop, which received original request.
+
+    Return ``None`` if request peer is not trusted or request does not have
+    any forwarded headers. Only given ``headers``, compiled with
+    :func:`compile_forwarded_headers`, are used, as trusted proxy passes
+    through the rest headers sent by the client. By default:
+    ``X-Forwarded-For`` & ``X-Forwarded-Proto`` headers.
+
+    Hops are walked from the closest one, while hop ``for`` address is
+    trusted proxy, so client is not able to spoof parameters of the hops
+    behind trusted proxies.
+    """
+    if request.remote not in networks:
+        return None
+
+    request_headers = request.headers
+    if FORWARDED in headers:
+        forwarded = request_headers.get(FORWARDED)
+        elements = parse_forwarded(forwarded) if forwarded else ()
+    else:
+        elements = parse_x_forwarded(
+            get_header_value(request_headers, X_FORWARDED_FOR, headers),
+            get_header_value(request_headers, X_FORWARDED_PROTO, headers),
+            get_header_value(request_headers, X_FORWARDED_HOST, headers),
+        )
+
+    if not elements:
+        return None
+
+    for element in reversed(elements):
+        if element.address not in networks:
+            return element
+    return elements[0]
+
+
+def get_node_address(node: Union[str, None]) -> Union[str, None]:
+    """Get IP address from node (address with optional port).
+
+    Return ``None`` for unknown or obfuscated nodes.
+
+    .. versionadded:: 2.5.0
+    """
+    if not node or node == "unknown" or node.startswith("_"):
+        return None
+    if node.startswith("["):
+        return node[1:].split("]", 1)[0] or None
+    if node.count(":") == 1:
+        return node.split(":", 1)[0]
+    return node
+
+
+def has_forwarded_headers(
+    request: web.Request, headers: Collection[str] = FORWARDED_HEADERS
+) -> bool:
+    """Check whether request has any of given forwarded headers.
+
+    .. versionadded:: 2.5.0
+    """
+    request_headers = request.headers
+    return any(header in request_headers for header in headers)
+
+
+def is_trusted_address(address: str, networks: Tuple[Network, ...]) -> bool:
+    """Check whether address belongs to any of given networks.
+
+    .. versionadded:: 2.5.0
+    """
+    try:
+        ip_address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip_address in network for network in networks)
+
+
+@lru_cache(maxsize=DEFAULT_PARSE_CACHE_SIZE)
+def parse_forwarded(value: str) -> ForwardedElements:
+    """Parse ``Forwarded`` header value into elements (one per proxy hop).
+
+    Unknown parameters & malformed pairs are skipped. When parameter repeated
+    within one element, first value is used. Results are cached per header
+    value.
+
+    .. versionadded:: 2.5.0
+    """
+    elements = []
+    params: Dict[str, str] = {}
+    length = len(value)
+    pos = 0
+
+    while pos < length:
+        match = FORWARDED_PAIR_RE.match(value, pos)
+        if match is not None:
+            name, param = match.group(1).lower(), match.group(2)
+            if param.startswith('"'):
+                param = QUOTED_PAIR_RE.sub(r"\1", param[1:-1])
+            params.setdefault(name, param)
+            pos = match.end()
+        else:
+            # Skip malformed pair up to the next separator
+            separators = [
+                idx
+                for idx in (value.find(",", pos), value.find(";", pos))
+                if idx != -1
+            ]
+            pos = min(separators) if separators else length
+
+        if pos < length and value[pos] == ",":
+            elements.append(create_forwarded_element(params))
+            params = {}
+        pos += 1
+
+    elements.append(create_forwarded_element(params))
+    return tuple(element for element in elements if element is not None)
+
+
+@lru_cache(maxsize=DEFAULT_PARSE_CACHE_SIZE)
+def parse_x_forwarded(
+    forwarded_for: Union[str, None],
+    forwarded_proto: Union[str, None],
+    forwarded_host: Union[str, None],
+) -> ForwardedElements:
+    """Parse ``X-Forwarded-*`` header values into elements.
+
+    ``X-Forwarded-For`` contains one address per proxy hop, while
+    ``X-Forwarded-Proto`` & ``X-Forwarded-Host`` might contain one value
+    (set by the edge proxy) or one value per hop. Values are aligned by hop,
+    and single value applies to all hops. Results are cached per header
+    values.
+
+    .. versionadded:: 2.5.0
+    """
+    nodes = split_header_list(forwarded_for)
+    protos = tuple(item.lower() for item in split_header_list(forwarded_proto))
+    hosts = split_header_list(forwarded_host)
+
+    total = max(len(nodes), len(protos), len(hosts))
+    return tuple(
+        ForwardedElement(
+            for_=get_hop_value(nodes, index, total),
+            host=get_hop_value(hosts, index, total),
+            proto=get_hop_value(protos, index, total),
+        )
+        for index in range(total)
+    )
+
+
+def create_forwarded_element(
+    params: Dict[str, str]
+) -> Union[ForwardedElement, None]:
+    """Create forwarded element from parsed parameters if any.
+
+    .. versionadded:: 2.5.0
+    """
+    if not params:
+        return None
+    proto = params.get("proto")
+    return ForwardedElement(
+        by=params.get("by"),
+        for_=params.get("for"),
+        host=params.get("host"),
+        proto=proto.lower() if proto else None,
+    )
+
+
+def get_header_value(
+    request_headers: "CIMultiDictProxy[str]",
+    header: str,
+    headers: ForwardedHeaders,
+) -> Union[str, None]:
+    """Get value of request header, only if it is one of given headers.
+
+    .. versionadded:: 2.5.0
+    """
+    return request_headers.get(header) if header in headers else None
+
+
+def get_hop_value(
+    values: Tuple[str, ...], index: int, total: int
+) -> Union[str, None]:
+    """Get value for given hop, aligning values from the closest hop.
+
+    .. versionadded:: 2.5.0
+    """
+    if len(values) == 1:
+        return values[0]
+    offset = index - (total - len(values))
+    return values[offset] if offset >= 0 else None
+
+
+def split_header_list(value: Union[str, None]) -> Tuple[str, ...]:
+    """Split comma separated header value into stripped items.
+
+    .. versionadded:: 2.5.0
+    """
+    if not value:
+        return ()
+    return tuple(item.strip() for item in value.split(",") if item.strip())
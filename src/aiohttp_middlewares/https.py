@@ -22,23 +22,62 @@ Usage
         middlewares=https_middleware({"Forwarded": "https"})
     )
 
+    # Parse `X-Forwarded-For` & `X-Forwarded-Proto` headers only from
+    # trusted reverse proxies
+    app = web.Application(
+        middlewares=[https_middleware(trusted_proxies=["10.0.0.0/8"])]
+    )
+
+    # Parse `Forwarded` header only from trusted reverse proxies
+    app = web.Application(
+        middlewares=[
+            https_middleware(
+                trusted_proxies=["10.0.0.0/8"],
+                forwarded_headers=["Forwarded"],
+            )
+        ]
+    )
+
 """
 
 import logging
-from typing import Union
+from typing import Collection, Tuple, Union
 
+import attr
 from aiohttp import web
 
-from aiohttp_middlewares.annotations import DictStrStr, Handler, Middleware
+from aiohttp_middlewares.annotations import (
+    DictStrStr,
+    EventHook,
+    Handler,
+    Middleware,
+)
+from aiohttp_middlewares.forwarded import (
+    compile_forwarded_headers,
+    compile_trusted_networks,
+    DEFAULT_FORWARDED_HEADERS,
+    ForwardedHeaders,
+    get_forwarded,
+    TrustedNetworks,
+)
+from aiohttp_middlewares.utils import emit_event
 
 
 DEFAULT_MATCH_HEADERS = {"X-Forwarded-Proto": "https"}
 
+EVENT_HTTPS = "https.substituted"
+
+MatchHeaders = Tuple[Tuple[str, str], ...]
+
 logger = logging.getLogger(__name__)
 
 
 def https_middleware(
-    match_headers: Union[DictStrStr, None] = None
+    match_headers: Union[DictStrStr, None] = None,
+    *,
+    on_event: Union[EventHook, None] = None,
+    trusted_proxies: Union[Collection[str], TrustedNetworks, None] = None,
+    forwarded_headers: Collection[str] = DEFAULT_FORWARDED_HEADERS,
 ) -> Middleware:
     """
     Change scheme for current request when aiohttp application deployed behind
@@ -57,31 +96,130 @@ def https_middleware(
 
             {"X-Forwarded-Proto": "https"}
 
+    :param on_event:
+        Optional callable to receive ``("https.substituted", (method, path))``
+        event on each request with substituted scheme. By default: ``None``
+    :param trusted_proxies:
+        Networks (CIDRs or addresses) of trusted reverse proxies. When
+        supplied, ``match_headers`` are not used. Instead,
+        ``forwarded_headers`` are parsed, when request peer address belongs
+        to trusted networks, and request scheme is substituted, if original
+        request has been sent via HTTPS. See
+        :func:`aiohttp_middlewares.forwarded.get_forwarded` for details. By
+        default: ``None``
+    :param forwarded_headers:
+        Headers, which are set by trusted reverse proxies: ``["Forwarded"]``
+        (RFC 7239) or any of ``X-Forwarded-For``, ``X-Forwarded-Proto`` &
+        ``X-Forwarded-Host``. Other forwarded headers are ignored, as trusted
+        proxies pass them from the client as is. By default:
+        ``X-Forwarded-For`` & ``X-Forwarded-Proto``
+
+    .. versionchanged:: 2.5.0
+
+    Debug log record for substituted scheme does not contain copy of request
+    headers anymore and is created only when debug logging enabled. Added
+    ``on_event``, ``trusted_proxies`` & ``forwarded_headers`` arguments.
     """
+    policy = HttpsPolicy.create(
+        match_headers,
+        trusted_proxies=trusted_proxies,
+        forwarded_headers=forwarded_headers,
+    )
 
     @web.middleware
     async def middleware(
         request: web.Request, handler: Handler
     ) -> web.StreamResponse:
         """Change scheme of current request when HTTPS headers matched."""
-        headers = DEFAULT_MATCH_HEADERS
-        if match_headers is not None:
-            headers = match_headers
-
-        matched = any(
-            request.headers.get(key) == value for key, value in headers.items()
-        )
-
-        if matched:
-            logger.debug(
+        if policy.match(request):
+            emit_event(
+                logger,
+                on_event,
+                EVENT_HTTPS,
                 "Substitute request URL scheme to https",
-                extra={
-                    "headers": headers,
-                    "request_headers": dict(request.headers),
-                },
+                request.method,
+                request.rel_url.path,
             )
             request = request.clone(scheme="https")
 
         return await handler(request)
 
     return middleware
+
+
+@attr.dataclass(frozen=True, slots=True)
+class HttpsPolicy:
+    """HTTPS middleware settings compiled on middleware initialization.
+
+    Use :meth:`create` to compile policy from :func:`https_middleware`
+    arguments.
+
+    .. versionadded:: 2.5.0
+    """
+
+    match_headers: MatchHeaders
+    networks: Union[TrustedNetworks, None] = None
+    forwarded_headers: ForwardedHeaders = DEFAULT_FORWARDED_HEADERS
+
+    @classmethod
+    def create(
+        cls,
+        match_headers: Union[DictStrStr, None] = None,
+        *,
+        trusted_proxies: Union[Collection[str], TrustedNetworks, None] = None,
+        forwarded_headers: Collection[str] = DEFAULT_FORWARDED_HEADERS,
+    ) -> "HttpsPolicy":
+        """Compile HTTPS policy from :func:`https_middleware` arguments."""
+        return cls(
+            match_headers=compile_match_headers(match_headers),
+            networks=(
+                compile_trusted_networks(trusted_proxies)
+                if trusted_proxies is not None
+                else None
+            ),
+            forwarded_headers=compile_forwarded_headers(forwarded_headers),
+        )
+
+    def match(self, request: web.Request) -> bool:
+        """Check whether request scheme should be substituted to https."""
+        if self.networks is None:
+            return is_https_request(request, self.match_headers)
+        return is_forwarded_https_request(
+            request, self.networks, self.forwarded_headers
+        )
+
+
+def compile_match_headers(
+    match_headers: Union[DictStrStr, None] = None
+) -> MatchHeaders:
+    """Convert dict of headers to match into tuple of header pairs.
+
+    .. versionadded:: 2.5.0
+    """
+    return tuple(
+        (
+            DEFAULT_MATCH_HEADERS if match_headers is None else match_headers
+        ).items()
+    )
+
+
+def is_forwarded_https_request(
+    request: web.Request,
+    networks: TrustedNetworks,
+    headers: ForwardedHeaders = DEFAULT_FORWARDED_HEADERS,
+) -> bool:
+    """Check whether request has been forwarded via HTTPS by trusted proxy.
+
+    .. versionadded:: 2.5.0
+    """
+    forwarded = get_forwarded(request, networks, headers)
+    return forwarded is not None and forwarded.proto == "https"
+
+
+def is_https_request(request: web.Request, headers: MatchHeaders) -> bool:
+    """Check whether request headers match any of HTTPS headers pairs.
+
+    .. versionadded:: 2.5.0
+    """
+    request_headers = request.headers
+    return any(request_headers.get(key) == value for key, value in headers)
@@ -0,0 +1,213 @@
+r"""
+=======
+Metrics
+=======
+
+.. versionadded:: 2.5.0
+
+Count events of middlewares and export counters in Prometheus text format.
+
+Each middleware, which accepts ``on_event`` hook, emits events about what it
+did with the request: substituted URL scheme, allowed or rejected CORS origin,
+handled error, shielded handler, exceeded timeout, or rejected request due to
+concurrency limit. :class:`Metrics` instance is a hook, which counts these
+events in preallocated slots.
+
+Without ``on_event`` hook, middlewares do not create any event payloads, so
+metrics cost nothing when not configured.
+
+Usage
+=====
+
+.. code-block:: python
+
+    from aiohttp import web
+    from aiohttp_middlewares import (
+        cors_middleware,
+        error_middleware,
+        NON_IDEMPOTENT_METHODS,
+        shield_middleware,
+        timeout_middleware,
+    )
+    from aiohttp_middlewares.metrics import Metrics
+
+    metrics = Metrics()
+    app = web.Application(
+        middlewares=[
+            cors_middleware(origins=CORS_ALLOW_ORIGINS, on_event=metrics),
+            error_middleware(on_event=metrics),
+            timeout_middleware(29.5, on_event=metrics),
+            shield_middleware(
+                methods=NON_IDEMPOTENT_METHODS, on_event=metrics
+            ),
+        ]
+    )
+
+    # Render counters in Prometheus text format
+    app.router.add_get("/metrics", metrics.handler)
+
+    # Or check counters directly
+    metrics.counters()
+
+"""
+
+from typing import Any, Collection, Dict, List, Tuple
+
+from aiohttp import web
+
+from aiohttp_middlewares.concurrency import EVENT_CONCURRENCY_REJECTED
+from aiohttp_middlewares.cors import (
+    EVENT_CORS_ALLOWED,
+    EVENT_CORS_NO_ORIGIN,
+    EVENT_CORS_NOT_ALLOWED,
+    EVENT_CORS_PREFLIGHT,
+    EVENT_CORS_PREFLIGHT_REJECTED,
+    EVENT_CORS_SKIPPED,
+)
+from aiohttp_middlewares.error import EVENT_ERROR_HANDLED
+from aiohttp_middlewares.https import EVENT_HTTPS
+from aiohttp_middlewares.proxy import EVENT_PROXY_FIXED
+from aiohttp_middlewares.shield import (
+    EVENT_SHIELD_IGNORED,
+    EVENT_SHIELD_METHOD,
+    EVENT_SHIELD_PATH,
+)
+from aiohttp_middlewares.timeout import (
+    EVENT_TIMEOUT_EXCEEDED,
+    EVENT_TIMEOUT_IGNORED,
+)
+
+
+EVENTS = (
+    EVENT_CONCURRENCY_REJECTED,
+    EVENT_CORS_ALLOWED,
+    EVENT_CORS_NO_ORIGIN,
+    EVENT_CORS_NOT_ALLOWED,
+    EVENT_CORS_PREFLIGHT,
+    EVENT_CORS_PREFLIGHT_REJECTED,
+    EVENT_CORS_SKIPPED,
+    EVENT_ERROR_HANDLED,
+    EVENT_HTTPS,
+    EVENT_PROXY_FIXED,
+    EVENT_SHIELD_IGNORED,
+    EVENT_SHIELD_METHOD,
+    EVENT_SHIELD_PATH,
+    EVENT_TIMEOUT_EXCEEDED,
+    EVENT_TIMEOUT_IGNORED,
+)
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PROMETHEUS_PREFIX = "aiohttp_middlewares"
+
+
+class Metrics:
+    """Count middleware events in preallocated slots.
+
+    Instance is callable with same signature as ``on_event`` hook of
+    middlewares. Each known event has its own preallocated counter slot, so
+    counting event does not allocate new objects. Slots for unknown events are
+    added on first occurrence.
+
+    Events with extra payload, such as ``"error.handled"`` event with error
+    handler, are counted per payload target as well.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_counters", "_slots", "_targets", "prefix")
+
+    def __init__(
+        self,
+        events: Collection[str] = EVENTS,
+        *,
+        prefix: str = PROMETHEUS_PREFIX,
+    ) -> None:
+        self._counters: List[int] = [0] * len(events)
+        self._slots: Dict[str, int] = {
+            event: index for index, event in enumerate(events)
+        }
+        self._targets: Dict[Tuple[str, Any], int] = {}
+        self.prefix = prefix
+
+    def __call__(self, event: str, payload: Tuple[Any, ...]) -> None:
+        slot = self._slots.get(event)
+        if slot is None:
+            slot = self._slots[event] = len(self._counters)
+            self._counters.append(0)
+        self._counters[slot] += 1
+
+        if len(payload) > 2:
+            key = (event, payload[2])
+            self._targets[key] = self._targets.get(key, 0) + 1
+
+    def counters(self) -> Dict[str, int]:
+        """Return counters of all events, including not occurred ones."""
+        counters = self._counters
+        return {event: counters[slot] for event, slot in self._slots.items()}
+
+    async def handler(self, request: web.Request) -> web.Response:
+        """Respond with counters in Prometheus text format."""
+        return web.Response(
+            body=self.render().encode("utf-8"),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+        )
+
+    def render(self) -> str:
+        """Render counters in Prometheus text format."""
+        events_metric = f"{self.prefix}_events_total"
+        lines = [
+            f"# HELP {events_metric} Total amount of middleware events.",
+            f"# TYPE {events_metric} counter",
+        ]
+        lines.extend(
+            f'{events_metric}{{event="{escape_label(event)}"}} {value}'
+            for event, value in self.counters().items()
+        )
+
+        # Different targets (like closures of same error handler factory)
+        # might have same name, so sum their counters to avoid duplicate
+        # series
+        targets: Dict[Tuple[str, str], int] = {}
+        for (event, target), value in self._targets.items():
+            key = (event, get_target_name(target))
+            targets[key] = targets.get(key, 0) + value
+
+        if targets:
+            targets_metric = f"{self.prefix}_event_targets_total"
+            lines.extend(
+                (
+                    f"# HELP {targets_metric} Total amount of middleware "
+                    "events per target.",
+                    f"# TYPE {targets_metric} counter",
+                )
+            )
+            lines.extend(
+                f"{targets_metric}{{"
+                f'event="{escape_label(event)}",'
+                f'target="{escape_label(target)}"'
+                f"}} {value}"
+                for (event, target), value in targets.items()
+            )
+
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    """Escape label value for Prometheus text format.
+
+    .. versionadded:: 2.5.0
+    """
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def get_target_name(target: Any) -> str:
+    """Get name of event target, such as error handler.
+
+    .. versionadded:: 2.5.0
+    """
+    if isinstance(target, str):
+        return target
+    module = getattr(target, "__module__", None)
+    name = getattr(target, "__qualname__", None)
+    if module is None or name is None:
+        return repr(target)
+    return f"{module}.{name}"
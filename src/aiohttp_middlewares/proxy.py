@@ -0,0 +1,166 @@
+r"""
+====================
+Proxy Fix Middleware
+====================
+
+.. versionadded:: 2.5.0
+
+Fix URL scheme, host and client address of current request, when aiohttp
+application deployed behind trusted reverse proxies.
+
+Unlike stacking :func:`aiohttp_middlewares.https.https_middleware` with other
+middlewares, which fix host or client address, proxy fix middleware reads
+forwarded headers once and clones request at most once per request. Requests
+without forwarded headers are not cloned at all.
+
+Usage
+=====
+
+.. code-block:: python
+
+    from aiohttp import web
+    from aiohttp_middlewares import proxy_fix_middleware
+
+    # Fix scheme & remote from `X-Forwarded-Proto` & `X-Forwarded-For`
+    # headers, set by proxies from 10.0.0.0/8 network
+    app = web.Application(
+        middlewares=[proxy_fix_middleware(["10.0.0.0/8"])]
+    )
+
+    # Fix scheme, host & remote from `Forwarded` header, set by proxies
+    app = web.Application(
+        middlewares=[
+            proxy_fix_middleware(
+                ["10.0.0.0/8"], forwarded_headers=["Forwarded"]
+            )
+        ]
+    )
+
+    # Fix only scheme & remote
+    app = web.Application(
+        middlewares=[proxy_fix_middleware(["10.0.0.0/8"], host=False)]
+    )
+
+"""
+
+import logging
+from typing import Collection, Union
+
+from aiohttp import web
+
+from aiohttp_middlewares.annotations import (
+    DictStrAny,
+    EventHook,
+    Handler,
+    Middleware,
+)
+from aiohttp_middlewares.forwarded import (
+    compile_forwarded_headers,
+    compile_trusted_networks,
+    DEFAULT_FORWARDED_HEADERS,
+    ForwardedElement,
+    get_forwarded,
+    has_forwarded_headers,
+    TrustedNetworks,
+)
+from aiohttp_middlewares.utils import emit_event
+
+
+EVENT_PROXY_FIXED = "proxy.fixed"
+
+logger = logging.getLogger(__name__)
+
+
+def proxy_fix_middleware(
+    trusted_proxies: Union[Collection[str], TrustedNetworks],
+    *,
+    scheme: bool = True,
+    host: bool = True,
+    remote: bool = True,
+    on_event: Union[EventHook, None] = None,
+    forwarded_headers: Collection[str] = DEFAULT_FORWARDED_HEADERS,
+) -> Middleware:
+    """Fix request scheme, host & remote from headers of trusted proxies.
+
+    Given ``forwarded_headers`` are used only when request peer address
+    belongs to trusted networks. See
+    :func:`aiohttp_middlewares.forwarded.get_forwarded` for details.
+
+    Request is cloned only when any of fixed values differs from the current
+    one, and only once for all of them.
+
+    :param trusted_proxies:
+        Networks (CIDRs or addresses) of trusted reverse proxies.
+    :param scheme: Fix request URL scheme. By default: ``True``
+    :param host: Fix request host. By default: ``True``
+    :param remote: Fix request client address. By default: ``True``
+    :param on_event:
+        Optional callable to receive ``("proxy.fixed", (method, path))`` event
+        on each fixed request. By default: ``None``
+    :param forwarded_headers:
+        Headers, which are set by trusted reverse proxies: ``["Forwarded"]``
+        (RFC 7239) or any of ``X-Forwarded-For``, ``X-Forwarded-Proto`` &
+        ``X-Forwarded-Host``. Other forwarded headers are ignored, as trusted
+        proxies pass them from the client as is, so client is not able to
+        spoof request host or address. By default: ``X-Forwarded-For`` &
+        ``X-Forwarded-Proto``
+    """
+    networks = compile_trusted_networks(trusted_proxies)
+    headers = compile_forwarded_headers(forwarded_headers)
+
+    @web.middleware
+    async def middleware(
+        request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        """Clone request with values from forwarded headers if necessary."""
+        if not has_forwarded_headers(request, headers):
+            return await handler(request)
+
+        forwarded = get_forwarded(request, networks, headers)
+        changes = (
+            get_request_changes(
+                request, forwarded, scheme=scheme, host=host, remote=remote
+            )
+            if forwarded is not None
+            else None
+        )
+        if changes:
+            emit_event(
+                logger,
+                on_event,
+                EVENT_PROXY_FIXED,
+                "Fix request from forwarded headers",
+                request.method,
+                request.rel_url.path,
+            )
+            request = request.clone(**changes)
+
+        return await handler(request)
+
+    return middleware
+
+
+def get_request_changes(
+    request: web.Request,
+    forwarded: ForwardedElement,
+    *,
+    scheme: bool = True,
+    host: bool = True,
+    remote: bool = True,
+) -> DictStrAny:
+    """Get keyword arguments to clone request with forwarded values.
+
+    Only values, which differ from the current request values, are included.
+
+    .. versionadded:: 2.5.0
+    """
+    changes: DictStrAny = {}
+    if scheme and forwarded.proto and forwarded.proto != request.scheme:
+        changes["scheme"] = forwarded.proto
+    if host and forwarded.host and forwarded.host != request.host:
+        changes["host"] = forwarded.host
+
+    address = forwarded.address if remote else None
+    if address and address != request.remote:
+        changes["remote"] = address
+    return changes
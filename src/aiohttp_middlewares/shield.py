@@ -53,27 +53,348 @@ Usage
 
 import asyncio
 import logging
-from typing import Union
+from typing import (
+    Any,
+    Awaitable,
+    Dict,
+    FrozenSet,
+    NamedTuple,
+    Set,
+    Tuple,
+    Union,
+)
 
+import attr
 from aiohttp import web
 
 from aiohttp_middlewares.annotations import (
+    EventHook,
     Handler,
     Middleware,
     StrCollection,
     Urls,
 )
-from aiohttp_middlewares.utils import match_request
+from aiohttp_middlewares.utils import compile_urls, emit_event, UrlMatcher
+
+
+DEFAULT_ROUTE_CACHE_SIZE = 4096
+DEFAULT_SHUTDOWN_TIMEOUT = 30.0
+
+EVENT_SHIELD_IGNORED = "shield.ignored"
+EVENT_SHIELD_METHOD = "shield.method"
+EVENT_SHIELD_PATH = "shield.path"
+
+SHIELD_MESSAGES = {
+    EVENT_SHIELD_IGNORED: "Ignore path from handler shielding.",
+    EVENT_SHIELD_METHOD: "Activate shield middleware by matched method",
+    EVENT_SHIELD_PATH: "Activate shield middleware by matched path",
+}
 
+OVERFLOW_REJECT = "reject"
+OVERFLOW_UNSHIELDED = "unshielded"
+OVERFLOWS = (OVERFLOW_REJECT, OVERFLOW_UNSHIELDED)
 
 logger = logging.getLogger(__name__)
 
 
+class ShieldStats(NamedTuple):
+    """Counters of shielded tasks registry.
+
+    .. versionadded:: 2.5.0
+    """
+
+    in_flight: int
+    shielded: int
+    orphaned: int
+    completed: int
+    rejected: int
+    unshielded: int
+
+
+class ShieldRegistry:
+    """Registry of shielded in-flight request handler tasks.
+
+    Shielded handler keeps running after client disconnects, so registry
+    tracks shielded tasks to limit amount of them and to wait for them on
+    application shutdown:
+
+    .. code-block:: python
+
+        registry = ShieldRegistry(limit=1024, shutdown_timeout=10)
+        app = web.Application(
+            middlewares=[
+                shield_middleware(
+                    methods=NON_IDEMPOTENT_METHODS, registry=registry
+                )
+            ]
+        )
+        app.on_shutdown.append(registry.on_shutdown)
+
+        # Later on, check registry counters
+        registry.stats()
+
+    When ``limit`` of in-flight shielded tasks reached, new requests to
+    shield are rejected with :class:`aiohttp.web.HTTPServiceUnavailable`
+    (``overflow="reject"``) or handled without shielding
+    (``overflow="unshielded"``).
+
+    Shielded task becomes orphaned when request handling cancelled (as
+    client disconnected), while the task still runs. Failures of orphaned
+    tasks are logged into ``aiohttp_middlewares.shield`` logger, as nobody
+    awaits them.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = (
+        "completed",
+        "limit",
+        "orphaned",
+        "overflow",
+        "rejected",
+        "shielded",
+        "shutdown_timeout",
+        "tasks",
+        "unshielded",
+    )
+
+    def __init__(
+        self,
+        *,
+        limit: Union[int, None] = None,
+        overflow: str = OVERFLOW_REJECT,
+        shutdown_timeout: float = DEFAULT_SHUTDOWN_TIMEOUT,
+    ) -> None:
+        if limit is not None and limit < 1:
+            raise ValueError("Limit should be a positive integer.")
+        if overflow not in OVERFLOWS:
+            raise ValueError(
+                f"Overflow should be one of: {', '.join(OVERFLOWS)}"
+            )
+
+        self.limit = limit
+        self.overflow = overflow
+        self.shutdown_timeout = shutdown_timeout
+        self.tasks: Set["asyncio.Task[web.StreamResponse]"] = set()
+
+        self.completed = 0
+        self.orphaned = 0
+        self.rejected = 0
+        self.shielded = 0
+        self.unshielded = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks)
+
+    async def drain(self, timeout: Union[float, None] = None) -> int:
+        """Wait for in-flight shielded tasks up to ``timeout`` seconds.
+
+        Tasks, which are not done after the timeout, are cancelled. Return
+        amount of cancelled tasks.
+        """
+        if not self.tasks:
+            return 0
+
+        _, pending = await asyncio.wait(set(self.tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        return len(pending)
+
+    def forget(self, task: "asyncio.Task[web.StreamResponse]") -> None:
+        """Remove done task from registry."""
+        self.tasks.discard(task)
+        self.completed += 1
+
+    async def on_shutdown(self, app: web.Application) -> None:
+        """Wait for in-flight shielded tasks on application shutdown."""
+        cancelled = await self.drain(self.shutdown_timeout)
+        if cancelled:
+            logger.warning(
+                "Cancel shielded tasks, which are not done on shutdown",
+                extra={"cancelled": cancelled},
+            )
+
+    async def shield(
+        self, request: web.Request, handler: Handler
+    ) -> web.StreamResponse:
+        """Shield request handler execution, if limit is not reached."""
+        limit = self.limit
+        if limit is not None and len(self.tasks) >= limit:
+            if self.overflow == OVERFLOW_REJECT:
+                self.rejected += 1
+                raise web.HTTPServiceUnavailable()
+            self.unshielded += 1
+            return await handler(request)
+
+        task = asyncio.ensure_future(handler(request))
+        self.tasks.add(task)
+        self.shielded += 1
+        task.add_done_callback(self.forget)
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done():
+                self.orphaned += 1
+                task.add_done_callback(log_orphan_failure)
+            raise
+
+    def stats(self) -> ShieldStats:
+        """Return registry counters."""
+        return ShieldStats(
+            in_flight=len(self.tasks),
+            shielded=self.shielded,
+            orphaned=self.orphaned,
+            completed=self.completed,
+            rejected=self.rejected,
+            unshielded=self.unshielded,
+        )
+
+
+@attr.dataclass(frozen=True, slots=True)
+class ShieldPolicy:
+    """Shield middleware settings compiled on middleware initialization.
+
+    Use :meth:`create` to compile policy from :func:`shield_middleware`
+    arguments.
+
+    When ``per_route`` enabled, decision for request resolved by aiohttp
+    router is stored per route resource and request method, so requests to
+    ``/api/documents/123`` and ``/api/documents/456`` handled by same route
+    share one decision. Decisions for up to ``route_cache_size`` resource &
+    method pairs are stored. Requests, which do not match any route, are
+    always checked by path.
+
+    .. versionadded:: 2.5.0
+    """
+
+    methods: FrozenSet[str]
+    urls: Union[UrlMatcher, None]
+    ignore: Union[UrlMatcher, None]
+    per_route: bool = False
+    route_cache_size: int = DEFAULT_ROUTE_CACHE_SIZE
+    registry: Union[ShieldRegistry, None] = None
+    route_decisions: Dict[Tuple[Any, str], Union[str, None]] = attr.ib(
+        factory=dict
+    )
+
+    @classmethod
+    def create(
+        cls,
+        *,
+        methods: Union[StrCollection, None] = None,
+        urls: Union[Urls, UrlMatcher, None] = None,
+        ignore: Union[Urls, UrlMatcher, None] = None,
+        per_route: bool = False,
+        route_cache_size: int = DEFAULT_ROUTE_CACHE_SIZE,
+        registry: Union[ShieldRegistry, None] = None,
+    ) -> "ShieldPolicy":
+        """Compile shield policy from :func:`shield_middleware` arguments."""
+        if not methods and not urls:
+            raise ValueError("None of methods or urls argument passed.")
+        if methods and urls:
+            raise ValueError(
+                "Both methods and urls arguments passed, while only one "
+                "expected."
+            )
+        if urls and ignore:
+            raise ValueError("Unable to mix urls and ignore arguments.")
+
+        return cls(
+            # Lower case methods to shield (if any)
+            methods=frozenset(item.lower() for item in methods or []),
+            # Compile URLs to shield or to ignore from shielding (if any)
+            urls=compile_urls(urls) if urls else None,
+            ignore=compile_urls(ignore) if ignore else None,
+            per_route=per_route,
+            route_cache_size=route_cache_size,
+            registry=registry,
+        )
+
+    def get_event(
+        self, method: str, path: str, request: Union[web.Request, None] = None
+    ) -> Union[str, None]:
+        """Decide whether request with given method and path is shielded.
+
+        Return ``"shield.method"`` or ``"shield.path"`` event for shielded
+        request, ``"shield.ignored"`` event for request ignored from
+        shielding and ``None`` otherwise.
+
+        Supply request to reuse decision for its route resource, when
+        ``per_route`` enabled.
+        """
+        if not self.per_route or request is None:
+            return self.get_path_event(method, path, request)
+
+        resource = request.match_info.route.resource
+        if resource is None:
+            return self.get_path_event(method, path, request)
+
+        key = (resource, method)
+        decisions = self.route_decisions
+        try:
+            return decisions[key]
+        except KeyError:
+            pass
+
+        event = self.get_path_event(method, path, request)
+        if len(decisions) < self.route_cache_size:
+            decisions[key] = event
+        return event
+
+    def get_path_event(
+        self, method: str, path: str, request: Union[web.Request, None] = None
+    ) -> Union[str, None]:
+        """Decide whether request with given method and path is shielded.
+
+        Same as :meth:`get_event`, but never reuse decision for route
+        resource. Supply request to match route resources and names in URLs.
+        """
+        request_method = method.lower()
+
+        # First attempt to process methods to shield
+        if self.methods:
+            if request_method not in self.methods:
+                return None
+            if self.ignore is not None and self.ignore.match(
+                request_method, path, request
+            ):
+                return EVENT_SHIELD_IGNORED
+            return EVENT_SHIELD_METHOD
+
+        # Then attempt to shield handler by URLs collection / mapping
+        if self.urls is not None and self.urls.match(
+            request_method, path, request
+        ):
+            return EVENT_SHIELD_PATH
+        return None
+
+    def match(
+        self, method: str, path: str, request: Union[web.Request, None] = None
+    ) -> bool:
+        """Check whether request with given method and path is shielded."""
+        event = self.get_event(method, path, request)
+        return event is not None and event != EVENT_SHIELD_IGNORED
+
+    def shield(
+        self, request: web.Request, handler: Handler
+    ) -> Awaitable[web.StreamResponse]:
+        """Shield request handler execution via registry if any."""
+        registry = self.registry
+        if registry is None:
+            return asyncio.shield(handler(request))
+        return registry.shield(request, handler)
+
+
 def shield_middleware(
     *,
     methods: Union[StrCollection, None] = None,
-    urls: Union[Urls, None] = None,
-    ignore: Union[Urls, None] = None,
+    urls: Union[Urls, UrlMatcher, None] = None,
+    ignore: Union[Urls, UrlMatcher, None] = None,
+    on_event: Union[EventHook, None] = None,
+    per_route: bool = False,
+    route_cache_size: int = DEFAULT_ROUTE_CACHE_SIZE,
+    registry: Union[ShieldRegistry, None] = None,
 ) -> Middleware:
     """
     Ensure that handler execution would not break on
@@ -131,54 +452,88 @@ def shield_middleware(
     :param urls:
         URLs to shield. Supports passing collection of strings or regexps or
         dict where key is a string or regexp and value is a method or
-        collection of methods to shield. Do not mix with ``methods``.
+        collection of methods to shield. Do not mix with ``methods``. Pass
+        URLs compiled via :func:`aiohttp_middlewares.utils.compile_urls` with
+        ``cache_size`` to memoize matching results for most requested paths.
     :param ignore:
         When ``methods`` specified ignore next collection of URL strings or
         regexps from shielding. Do not mix with ``urls``.
+    :param on_event:
+        Optional callable to receive event name (``"shield.ignored"``,
+        ``"shield.method"`` or ``"shield.path"``) and ``(method, path)`` tuple
+        on each ignored or shielded request. By default: ``None``
+    :param per_route:
+        Decide whether to shield request once per route resource and method,
+        instead of matching each request path. Requests to
+        ``/api/documents/123`` and ``/api/documents/456`` handled by
+        ``/api/documents/{document_id}`` route will share one decision, so
+        enable only when ``urls`` and ``ignore`` do not distinguish paths
+        handled by same route. Requests, which do not match any route, are
+        still checked by path. By default: ``False``
+    :param route_cache_size:
+        Max amount of route resource & method pairs to store decisions for,
+        when ``per_route`` enabled. Decisions for other pairs are not cached.
+        By default: ``4096``
+    :param registry:
+        :class:`ShieldRegistry` to track shielded in-flight tasks, limit
+        amount of them and wait for them on application shutdown. By default:
+        ``None``
+
+    .. versionchanged:: 2.5.0
+
+    ``urls`` and ``ignore`` compiled with
+    :func:`aiohttp_middlewares.utils.compile_urls` on middleware
+    initialization. Debug log records are created only when debug logging
+    enabled. Added ``on_event``, ``per_route``, ``route_cache_size`` &
+    ``registry`` arguments. ``urls`` and ``ignore`` may refer to aiohttp
+    route names or resources.
     """
-    if not methods and not urls:
-        raise ValueError("None of methods or urls argument passed.")
-    if methods and urls:
-        raise ValueError(
-            "Both methods and urls arguments passed, while only one expected."
-        )
-    if urls and ignore:
-        raise ValueError("Unable to mix urls and ignore arguments.")
-
-    # Lower case methods to shield (if any)
-    methods_to_shield = {item.lower() for item in methods or []}
+    policy = ShieldPolicy.create(
+        methods=methods,
+        urls=urls,
+        ignore=ignore,
+        per_route=per_route,
+        route_cache_size=route_cache_size,
+        registry=registry,
+    )
 
     @web.middleware
     async def middleware(
         request: web.Request, handler: Handler
     ) -> web.StreamResponse:
         """Shield handler execution if necessary."""
-        request_method = request.method.lower()
+        request_method = request.method
         request_path = request.rel_url.path
-        log_extra = {"method": request.method, "path": request_path}
 
-        # First attempt to process methods to shield
-        if methods_to_shield:
-            if request_method not in methods_to_shield:
-                return await handler(request)
+        event = policy.get_event(request_method, request_path, request)
+        if event is None:
+            return await handler(request)
+
+        emit_event(
+            logger,
+            on_event,
+            event,
+            SHIELD_MESSAGES[event],
+            request_method,
+            request_path,
+        )
+        if event == EVENT_SHIELD_IGNORED:
+            return await handler(request)
+        return await policy.shield(request, handler)
 
-            if ignore and match_request(ignore, request_method, request_path):
-                logger.debug(
-                    "Ignore path from handler shielding.", extra=log_extra
-                )
-                return await handler(request)
+    return middleware
 
-            logger.debug(
-                "Activate shield middleware by matched method", extra=log_extra
-            )
-            return await asyncio.shield(handler(request))
 
-        # Then attempt to shield handler by URLs collection / mapping
-        if urls and match_request(urls, request_method, request_path):
-            logger.debug(
-                "Activate shield middleware by matched path", extra=log_extra
-            )
-            return await asyncio.shield(handler(request))
-        return await handler(request)
+def log_orphan_failure(task: "asyncio.Task[web.StreamResponse]") -> None:
+    """Log failure of orphaned shielded task, which nobody awaits.
 
-    return middleware
+    .. versionadded:: 2.5.0
+    """
+    if task.cancelled():
+        return
+    err = task.exception()
+    if err is not None:
+        logger.error(
+            "Orphaned shielded task failed",
+            exc_info=(type(err), err, err.__traceback__),
+        )
@@ -10,11 +10,17 @@ Usage
 
 .. code-block:: python
 
+    import re
+
     from aiohttp import web
     from aiohttp_middlewares import (
         error_middleware,
         timeout_middleware,
     )
+    from aiohttp_middlewares.timeout import (
+        AdaptiveTimeouts,
+        get_remaining_time,
+    )
 
     # Basic usage
     app = web.Application(middlewares=[timeout_middleware(29.5)])
@@ -45,23 +51,667 @@ Usage
         middlewares=[error_middleware(), timeout_middleware(14.5)]
     )
 
+    # Per route budgets: allow 60 seconds for reports, 5 seconds for
+    # API calls, 120 seconds for POST uploads, and 14.5 seconds for the
+    # rest of requests
+    budgets = {
+        "/reports": 60,
+        re.compile(r"^/api"): 5,
+        "/upload": {"POST": 120},
+    }
+    app = web.Application(
+        middlewares=[timeout_middleware(14.5, budgets=budgets)]
+    )
+
+    # Skip optional work in handler, when little time left
+    async def handler(request: web.Request) -> web.Response:
+        data = await fetch_data()
+        remaining = get_remaining_time(request)
+        if remaining is None or remaining > 1:
+            data = await enrich_data(data)
+        return web.json_response(data)
+
+    # Batch request deadlines into shared timer ticks of 0.25 seconds
+    app = web.Application(
+        middlewares=[
+            timeout_middleware(29.5, backend="wheel", resolution=0.25)
+        ]
+    )
+
+    # Limit each route by doubled p99 of its observed latency, but not less
+    # than 2 seconds and not more than 29.5 seconds
+    adaptive = AdaptiveTimeouts(percentile=0.99, multiplier=2, floor=2)
+    app = web.Application(
+        middlewares=[timeout_middleware(29.5, adaptive=adaptive)]
+    )
+
+    # Later on, check computed budgets
+    adaptive.budgets()
+
 """
 
+import asyncio
 import logging
-from typing import Union
-
+import math
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncContextManager,
+    Callable,
+    cast,
+    Dict,
+    Mapping,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+import attr
 from aiohttp import web
 from async_timeout import timeout
 
-from aiohttp_middlewares.annotations import Handler, Middleware, Urls
-from aiohttp_middlewares.utils import match_request
-
+from aiohttp_middlewares.annotations import (
+    EventHook,
+    Handler,
+    Middleware,
+    Url,
+    Urls,
+)
+from aiohttp_middlewares.utils import compile_urls, emit_event, UrlMatcher
+
+
+BACKEND_ASYNC_TIMEOUT = "async_timeout"
+BACKEND_ASYNCIO = "asyncio"
+BACKEND_WHEEL = "wheel"
+BACKENDS = (BACKEND_ASYNC_TIMEOUT, BACKEND_ASYNCIO, BACKEND_WHEEL)
+
+DEFAULT_ADAPTIVE_FLOOR = 1.0
+DEFAULT_ADAPTIVE_MIN_SAMPLES = 100
+DEFAULT_ADAPTIVE_MULTIPLIER = 2.0
+DEFAULT_ADAPTIVE_PERCENTILE = 0.99
+DEFAULT_ADAPTIVE_WINDOW = 10_000
+DEFAULT_RESOLUTION = 0.1
+EVENT_TIMEOUT_EXCEEDED = "timeout.exceeded"
+EVENT_TIMEOUT_IGNORED = "timeout.ignored"
+REQUEST_DEADLINE_KEY = "timeout_deadline"
+
+Seconds = Union[int, float]
+Budget = Union[Seconds, Mapping[str, Seconds]]
+Budgets = Dict[Url, Budget]
+TimeoutFactory = Callable[[float], AsyncContextManager[Any]]
+RouteKey = Tuple[str, web.AbstractResource]
+
+# Latency histogram buckets grow geometrically from 1ms, so 64 buckets cover
+# latencies up to ~25 minutes with ~25% relative error
+HISTOGRAM_BASE = 0.001
+HISTOGRAM_BUCKETS = 64
+HISTOGRAM_FACTOR = 1.25
+HISTOGRAM_BOUNDS = tuple(
+    HISTOGRAM_BASE * HISTOGRAM_FACTOR**index
+    for index in range(HISTOGRAM_BUCKETS)
+)
 
 logger = logging.getLogger(__name__)
 
 
+class LatencyHistogram:
+    """Compact rolling histogram of request handling latencies.
+
+    Latencies are counted into geometrically growing buckets. When amount of
+    observed latencies reaches ``window``, all bucket counters are halved, so
+    recent latencies outweigh older ones.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("counts", "total", "window")
+
+    def __init__(self, *, window: int = DEFAULT_ADAPTIVE_WINDOW) -> None:
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.total = 0
+        self.window = window
+
+    def __len__(self) -> int:
+        return self.total
+
+    def observe(self, seconds: float) -> None:
+        """Count latency into its bucket."""
+        if seconds <= HISTOGRAM_BASE:
+            index = 0
+        else:
+            index = min(
+                math.ceil(
+                    math.log(seconds / HISTOGRAM_BASE)
+                    / math.log(HISTOGRAM_FACTOR)
+                ),
+                HISTOGRAM_BUCKETS - 1,
+            )
+
+        counts = self.counts
+        counts[index] += 1
+        self.total += 1
+
+        if self.total >= self.window:
+            self.counts = [count // 2 for count in counts]
+            self.total = sum(self.counts)
+
+    def percentile(self, value: float) -> Union[float, None]:
+        """Get upper bound of bucket, which contains given percentile.
+
+        Return ``None`` if no latencies observed yet.
+        """
+        if not self.total:
+            return None
+
+        rank = value * self.total
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= rank:
+                return HISTOGRAM_BOUNDS[index]
+        return HISTOGRAM_BOUNDS[-1]
+
+
+class AdaptiveTimeouts:
+    """Derive per route timeouts from observed request handling latency.
+
+    Keep :class:`LatencyHistogram` per route and method, and limit request
+    handling by given ``percentile`` of observed latencies times
+    ``multiplier``, clamped between ``floor`` and static timeout of the
+    request as a ceiling. Until route has ``min_samples`` observed latencies,
+    static timeout is used.
+
+    Routes are identified by aiohttp route resources, so requests, which do
+    not match any route, are always limited by static timeout.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = (
+        "_budgets",
+        "_histograms",
+        "floor",
+        "min_samples",
+        "multiplier",
+        "percentile",
+        "window",
+    )
+
+    def __init__(
+        self,
+        *,
+        percentile: float = DEFAULT_ADAPTIVE_PERCENTILE,
+        multiplier: float = DEFAULT_ADAPTIVE_MULTIPLIER,
+        floor: float = DEFAULT_ADAPTIVE_FLOOR,
+        min_samples: int = DEFAULT_ADAPTIVE_MIN_SAMPLES,
+        window: int = DEFAULT_ADAPTIVE_WINDOW,
+    ) -> None:
+        if not 0 < percentile <= 1:
+            raise ValueError("Percentile should be in (0, 1] range.")
+        if multiplier <= 0:
+            raise ValueError("Multiplier should be positive.")
+        if floor < 0:
+            raise ValueError("Floor should not be negative.")
+        if window < 2 or not 0 < min_samples < window:
+            raise ValueError(
+                "Window should be greater than min samples, which should be "
+                "positive."
+            )
+
+        self._budgets: Dict[RouteKey, float] = {}
+        self._histograms: Dict[RouteKey, LatencyHistogram] = {}
+        self.floor = floor
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.percentile = percentile
+        self.window = window
+
+    def budgets(self) -> Dict[Tuple[str, str], float]:
+        """Get computed budgets (before clamping by static timeout).
+
+        Keys are tuples of request method and canonical route resource path.
+        """
+        return {
+            (method, resource.canonical): budget
+            for (method, resource), budget in self._budgets.items()
+        }
+
+    def get_seconds(self, key: RouteKey, ceiling: Seconds) -> Seconds:
+        """Get timeout for given route, clamped by static timeout."""
+        budget = self._budgets.get(key)
+        if budget is None:
+            return ceiling
+        return min(budget, ceiling)
+
+    def observe(self, key: RouteKey, seconds: float) -> None:
+        """Count request handling latency and update route budget."""
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram(
+                window=self.window
+            )
+        histogram.observe(seconds)
+
+        if len(histogram) < self.min_samples:
+            return
+
+        latency = histogram.percentile(self.percentile)
+        if latency is not None:
+            self._budgets[key] = max(latency * self.multiplier, self.floor)
+
+    def timeout(
+        self,
+        key: RouteKey,
+        timeout: AsyncContextManager[Any],
+        started_at: float,
+    ) -> "ObservedTimeout":
+        """Wrap timeout context manager to observe request latency."""
+        return ObservedTimeout(self, key, timeout, started_at)
+
+
+class ObservedTimeout:
+    """Timeout context manager, which observes latency on exit.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_adaptive", "_key", "_started_at", "_timeout")
+
+    def __init__(
+        self,
+        adaptive: AdaptiveTimeouts,
+        key: RouteKey,
+        timeout: AsyncContextManager[Any],
+        started_at: float,
+    ) -> None:
+        self._adaptive = adaptive
+        self._key = key
+        self._started_at = started_at
+        self._timeout = timeout
+
+    async def __aenter__(self) -> Any:
+        return await self._timeout.__aenter__()
+
+    @property
+    def expired(self) -> bool:
+        """Whether deadline of wrapped timeout exceeded or not."""
+        return is_timeout_expired(self._timeout)
+
+    async def __aexit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc: Union[BaseException, None],
+        tb: Union[TracebackType, None],
+    ) -> Union[bool, None]:
+        self._adaptive.observe(
+            self._key, asyncio.get_running_loop().time() - self._started_at
+        )
+        return await self._timeout.__aexit__(exc_type, exc, tb)
+
+
+@attr.dataclass(frozen=True, slots=True)
+class TimeoutBudgets:
+    """Per route timeout budgets compiled on timeout middleware initialization.
+
+    Budget is either amount of seconds for all request methods, or mapping of
+    request method to amount of seconds. First URL matching request path
+    decides request budget, same way as for ``Urls`` dict in
+    :func:`aiohttp_middlewares.utils.match_request`.
+
+    .. versionadded:: 2.5.0
+    """
+
+    urls: UrlMatcher
+    budgets: Tuple[Union[Seconds, Dict[str, Seconds]], ...]
+
+    @classmethod
+    def from_dict(cls, budgets: Budgets) -> "TimeoutBudgets":
+        """Compile timeout budgets."""
+        return cls(
+            urls=compile_urls(tuple(budgets)),
+            budgets=tuple(
+                (
+                    {key.lower(): value for key, value in budget.items()}
+                    if isinstance(budget, Mapping)
+                    else budget
+                )
+                for budget in budgets.values()
+            ),
+        )
+
+    def get_seconds(
+        self,
+        method: str,
+        path: str,
+        default: Seconds,
+        request: Union[web.Request, None] = None,
+    ) -> Seconds:
+        """Get timeout budget for given request method and path.
+
+        Return default budget if request does not match any URL, or request
+        method is missed in mapping of matched URL. Supply request to match
+        route resources and names as well.
+        """
+        index = self.urls.find(path, request)
+        if index is None:
+            return default
+
+        budget = self.budgets[index]
+        if isinstance(budget, dict):
+            return budget.get(method.lower(), default)
+        return budget
+
+
+@attr.dataclass(frozen=True, slots=True)
+class TimeoutPolicy:
+    """Timeout middleware settings compiled on middleware initialization.
+
+    Use :meth:`create` to compile policy from :func:`timeout_middleware`
+    arguments.
+
+    .. versionadded:: 2.5.0
+    """
+
+    seconds: Seconds
+    ignore: Union[UrlMatcher, None]
+    budgets: Union[TimeoutBudgets, None]
+    create_timeout: TimeoutFactory
+    adaptive: Union[AdaptiveTimeouts, None] = None
+
+    @classmethod
+    def create(
+        cls,
+        seconds: Seconds,
+        *,
+        ignore: Union[Urls, UrlMatcher, None] = None,
+        budgets: Union[Budgets, TimeoutBudgets, None] = None,
+        backend: str = BACKEND_ASYNC_TIMEOUT,
+        resolution: float = DEFAULT_RESOLUTION,
+        adaptive: Union[AdaptiveTimeouts, None] = None,
+    ) -> "TimeoutPolicy":
+        """Compile timeout policy from :func:`timeout_middleware` arguments."""
+        return cls(
+            seconds=seconds,
+            ignore=compile_urls(ignore) if ignore else None,
+            budgets=compile_budgets(budgets),
+            create_timeout=create_timeout_factory(
+                backend, resolution=resolution
+            ),
+            adaptive=adaptive,
+        )
+
+    def get_seconds(
+        self, method: str, path: str, request: Union[web.Request, None] = None
+    ) -> Union[Seconds, None]:
+        """Get timeout budget for given request method and path.
+
+        Return ``None`` if request ignored from timeout handling. Supply
+        request to match route resources and names as well, and to apply
+        adaptive timeout.
+        """
+        ignore = self.ignore
+        if ignore is not None and ignore.match(method, path, request):
+            return None
+
+        budgets = self.budgets
+        seconds = (
+            self.seconds
+            if budgets is None
+            else budgets.get_seconds(method, path, self.seconds, request)
+        )
+
+        adaptive = self.adaptive
+        key = get_route_key(method, request) if adaptive is not None else None
+        if adaptive is None or key is None:
+            return seconds
+        return adaptive.get_seconds(key, seconds)
+
+    def timeout(
+        self, request: web.Request, seconds: Seconds
+    ) -> AsyncContextManager[Any]:
+        """Store request deadline and create timeout context manager."""
+        now = asyncio.get_running_loop().time()
+        request[REQUEST_DEADLINE_KEY] = now + seconds
+
+        adaptive = self.adaptive
+        key = (
+            get_route_key(request.method, request)
+            if adaptive is not None
+            else None
+        )
+        if adaptive is None or key is None:
+            return self.create_timeout(seconds)
+        return adaptive.timeout(key, self.create_timeout(seconds), now)
+
+
+class TimerWheel:
+    """Coarse-grained timer, which batches deadlines into shared ticks.
+
+    Instead of scheduling event loop timer for each request, deadlines are
+    rounded up to the next tick of given resolution, and only one event loop
+    timer is scheduled per tick. Which means timeout error may be raised up to
+    ``resolution`` seconds later than requested, but never earlier.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_buckets", "loop", "resolution")
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        *,
+        resolution: float = DEFAULT_RESOLUTION,
+    ) -> None:
+        self._buckets: Dict[int, Set["WheelTimeout"]] = {}
+        self.loop = loop
+        self.resolution = resolution
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def cancel(self, item: "WheelTimeout", tick: int) -> None:
+        """Remove timeout from the tick bucket."""
+        bucket = self._buckets.get(tick)
+        if bucket is not None:
+            bucket.discard(item)
+
+    def expire(self, tick: int) -> None:
+        """Expire all timeouts from the tick bucket."""
+        for item in self._buckets.pop(tick, ()):
+            item.expire()
+
+    def schedule(self, item: "WheelTimeout", deadline: float) -> int:
+        """Add timeout into bucket of the tick next to given deadline."""
+        tick = math.ceil(deadline / self.resolution)
+        bucket = self._buckets.get(tick)
+        if bucket is None:
+            bucket = self._buckets[tick] = set()
+            self.loop.call_at(tick * self.resolution, self.expire, tick)
+        bucket.add(item)
+        return tick
+
+    def timeout(self, seconds: float) -> "WheelTimeout":
+        """Create timeout context manager, scheduled on given wheel."""
+        return WheelTimeout(self, seconds)
+
+
+class WheelTimeout:
+    """Timeout context manager scheduled on :class:`TimerWheel`.
+
+    Raise :class:`asyncio.TimeoutError` same way as ``async_timeout`` does,
+    when deadline exceeded.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = ("_expired", "_seconds", "_task", "_tick", "_wheel")
+
+    def __init__(self, wheel: TimerWheel, seconds: float) -> None:
+        self._expired = False
+        self._seconds = seconds
+        self._task: Union["asyncio.Task[Any]", None] = None
+        self._tick = 0
+        self._wheel = wheel
+
+    async def __aenter__(self) -> "WheelTimeout":
+        wheel = self._wheel
+        self._task = asyncio.current_task()
+        self._tick = wheel.schedule(self, wheel.loop.time() + self._seconds)
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Union[Type[BaseException], None],
+        exc: Union[BaseException, None],
+        tb: Union[TracebackType, None],
+    ) -> None:
+        self._wheel.cancel(self, self._tick)
+        if exc_type is asyncio.CancelledError and self._expired:
+            uncancel = getattr(self._task, "uncancel", None)
+            if uncancel is not None:
+                uncancel()
+            raise asyncio.TimeoutError from exc
+
+    @property
+    def expired(self) -> bool:
+        """Whether deadline exceeded or not."""
+        return self._expired
+
+    def expire(self) -> None:
+        """Cancel wrapped task as its deadline exceeded."""
+        self._expired = True
+        if self._task is not None:
+            self._task.cancel()
+
+
+def compile_budgets(
+    budgets: Union[Budgets, TimeoutBudgets, None]
+) -> Union[TimeoutBudgets, None]:
+    """Compile timeout budgets if any.
+
+    .. versionadded:: 2.5.0
+    """
+    if not budgets:
+        return None
+    if isinstance(budgets, TimeoutBudgets):
+        return budgets
+    return TimeoutBudgets.from_dict(budgets)
+
+
+def create_timeout_factory(
+    backend: str = BACKEND_ASYNC_TIMEOUT,
+    *,
+    resolution: float = DEFAULT_RESOLUTION,
+) -> TimeoutFactory:
+    """Create function, which creates timeout context for given seconds.
+
+    .. versionadded:: 2.5.0
+    """
+    if backend not in BACKENDS:
+        raise ValueError(
+            f"Unsupported timeout backend. Expected one of: {BACKENDS}"
+        )
+
+    if backend == BACKEND_WHEEL:
+        return create_wheel_timeout_factory(resolution=resolution)
+
+    if backend == BACKEND_ASYNCIO:
+        # Native timeout context manager available only since Python 3.11
+        native_timeout: Union[TimeoutFactory, None] = getattr(
+            asyncio, "timeout", None
+        )
+        if native_timeout is not None:
+            return native_timeout
+
+    return timeout
+
+
+def create_wheel_timeout_factory(
+    *, resolution: float = DEFAULT_RESOLUTION
+) -> TimeoutFactory:
+    """Create function to schedule timeouts on timer wheel of running loop.
+
+    .. versionadded:: 2.5.0
+    """
+    if resolution <= 0:
+        raise ValueError("Timer wheel resolution should be positive.")
+
+    wheel: Union[TimerWheel, None] = None
+
+    def create_timeout(seconds: float) -> WheelTimeout:
+        nonlocal wheel
+
+        loop = asyncio.get_running_loop()
+        if wheel is None or wheel.loop is not loop:
+            wheel = TimerWheel(loop, resolution=resolution)
+        return wheel.timeout(seconds)
+
+    return create_timeout
+
+
+def is_timeout_expired(timeout: Any) -> bool:
+    """Check whether deadline of timeout context manager exceeded.
+
+    Support ``expired`` property of ``async_timeout`` & :class:`WheelTimeout`,
+    as well as ``expired()`` method of :class:`asyncio.Timeout`.
+
+    .. versionadded:: 2.5.0
+    """
+    expired = getattr(timeout, "expired", False)
+    return bool(expired() if callable(expired) else expired)
+
+
+def get_route_key(
+    method: str, request: Union[web.Request, None]
+) -> Union[RouteKey, None]:
+    """Get key of request route to keep adaptive timeout for.
+
+    Return ``None`` if request does not match any route.
+
+    .. versionadded:: 2.5.0
+    """
+    if request is None:
+        return None
+    resource = request.match_info.route.resource
+    if resource is None:
+        return None
+    return (method, resource)
+
+
+def get_deadline(request: web.Request) -> Union[float, None]:
+    """Get absolute deadline (in event loop time) of request handling.
+
+    Return ``None`` if request is not wrapped into timeout context.
+
+    .. versionadded:: 2.5.0
+    """
+    return cast(Union[float, None], request.get(REQUEST_DEADLINE_KEY))
+
+
+def get_remaining_time(request: web.Request) -> Union[float, None]:
+    """Get remaining amount of seconds to handle given request.
+
+    Return ``None`` if request is not wrapped into timeout context.
+
+    .. versionadded:: 2.5.0
+    """
+    deadline = get_deadline(request)
+    if deadline is None:
+        return None
+    return max(deadline - asyncio.get_running_loop().time(), 0.0)
+
+
 def timeout_middleware(
-    seconds: Union[int, float], *, ignore: Union[Urls, None] = None
+    seconds: Seconds,
+    *,
+    ignore: Union[Urls, UrlMatcher, None] = None,
+    budgets: Union[Budgets, TimeoutBudgets, None] = None,
+    backend: str = BACKEND_ASYNC_TIMEOUT,
+    resolution: float = DEFAULT_RESOLUTION,
+    on_event: Union[EventHook, None] = None,
+    adaptive: Union[AdaptiveTimeouts, None] = None,
 ) -> Middleware:
     """Ensure that request handling does not exceed X seconds.
 
@@ -112,6 +762,33 @@ def timeout_middleware(
     collection or dict timeout context manager will be configured to avoid
     break the execution after X seconds.
 
+    To limit request handling by different amount of seconds for different
+    routes, pass ``budgets`` dict, where key is an URL and value is amount of
+    seconds or mapping of HTTP method to amount of seconds. Request, which does
+    not match any of budget URLs, limited by ``seconds``.
+
+    .. code-block:: python
+
+        budgets = {"/reports": 60, "/upload": {"POST": 120}}
+        app = web.Application(
+            middlewares=[timeout_middleware(14.5, budgets=budgets)]
+        )
+
+    To derive route timeouts from observed latency, pass
+    :class:`AdaptiveTimeouts` instance as ``adaptive``. In that case
+    ``seconds`` (or matched budget) becomes a ceiling of adaptive timeout.
+
+    .. code-block:: python
+
+        adaptive = AdaptiveTimeouts(percentile=0.99, multiplier=2, floor=2)
+        app = web.Application(
+            middlewares=[timeout_middleware(29.5, adaptive=adaptive)]
+        )
+
+    Absolute deadline of request handling (in event loop time) is stored in
+    request under ``"timeout_deadline"`` key. Use :func:`get_remaining_time`
+    to check how much time is left to handle the request.
+
     :param seconds: Max amount of seconds for each handler call.
     :param ignore:
         Do not limit execution for any of given URLs (paths). This is useful
@@ -120,8 +797,57 @@ def timeout_middleware(
         ignore from wrapping into timeout context and value is list of methods
         to ignore. This is helpful when you need ignore only POST requests of
         slow API endpoint, but still need to have GET requests to same endpoint
-        to not exceed X seconds.
+        to not exceed X seconds. Pass URLs compiled via
+        :func:`aiohttp_middlewares.utils.compile_urls` with ``cache_size`` to
+        memoize matching results for most requested paths.
+    :param budgets:
+        Max amount of seconds for handler call for given URLs (paths). Value
+        is either amount of seconds or mapping of HTTP method to amount of
+        seconds. First URL matching request path decides handler budget.
+    :param backend:
+        How to schedule request deadlines. By default: ``"async_timeout"``.
+        Supported backends:
+
+        - ``"async_timeout"``, use ``async_timeout.timeout`` context manager,
+          which schedules event loop timer for each request
+        - ``"asyncio"``, use native :func:`asyncio.timeout` context manager
+          (fallback to ``async_timeout`` for Python < 3.11)
+        - ``"wheel"``, use :class:`TimerWheel`, which batches request
+          deadlines into shared ticks of ``resolution`` seconds, scheduling
+          one event loop timer per tick instead of one timer per request
+
+    :param resolution:
+        Tick size in seconds for ``"wheel"`` backend. Timeout error may be
+        raised up to ``resolution`` seconds later than ``seconds``, but never
+        earlier. By default: ``0.1``
+    :param on_event:
+        Optional callable to receive ``("timeout.ignored", (method, path))``
+        event on each request ignored from timeout handling and
+        ``("timeout.exceeded", (method, path))`` event on each request, which
+        exceeded its timeout. By default: ``None``
+    :param adaptive:
+        :class:`AdaptiveTimeouts` to limit request handling by percentile of
+        observed route latency, using ``seconds`` or matched budget as a
+        ceiling. By default: ``None``
+
+    .. versionchanged:: 2.5.0
+
+    ``ignore`` URLs compiled with
+    :func:`aiohttp_middlewares.utils.compile_urls` on middleware
+    initialization. Added ``budgets``, ``backend``, ``resolution``,
+    ``on_event`` & ``adaptive`` arguments. Request deadline stored in
+    request. Debug log records are created only when debug logging enabled.
+    ``ignore`` and ``budgets`` URLs may refer to aiohttp route names or
+    resources, as ``ignore={"reports.export": "POST"}``.
     """
+    policy = TimeoutPolicy.create(
+        seconds,
+        ignore=ignore,
+        budgets=budgets,
+        backend=backend,
+        resolution=resolution,
+        adaptive=adaptive,
+    )
 
     @web.middleware
     async def middleware(
@@ -131,14 +857,36 @@ def timeout_middleware(
         request_method = request.method
         request_path = request.rel_url.path
 
-        if ignore and match_request(ignore, request_method, request_path):
-            logger.debug(
+        request_seconds = policy.get_seconds(
+            request_method, request_path, request
+        )
+        if request_seconds is None:
+            emit_event(
+                logger,
+                on_event,
+                EVENT_TIMEOUT_IGNORED,
                 "Ignore path from timeout handling",
-                extra={"method": request_method, "path": request_path},
+                request_method,
+                request_path,
             )
             return await handler(request)
 
-        async with timeout(seconds):
-            return await handler(request)
+        timeout = policy.timeout(request, request_seconds)
+        try:
+            async with timeout:
+                return await handler(request)
+        except asyncio.TimeoutError:
+            # Handler might raise its own timeout error, like timeout of
+            # upstream request, which is not a request timeout
+            if is_timeout_expired(timeout):
+                emit_event(
+                    logger,
+                    on_event,
+                    EVENT_TIMEOUT_EXCEEDED,
+                    "Request handling exceeded timeout",
+                    request_method,
+                    request_path,
+                )
+            raise
 
     return middleware
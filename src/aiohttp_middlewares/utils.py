@@ -7,9 +7,381 @@ Various utility functions for ``aiohttp_middlewares`` library.
 
 """
 
+import logging
+import re
+import warnings
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    NamedTuple,
+    Pattern,
+    Set,
+    Tuple,
+    Union,
+)
+
+from aiohttp import web
 from yarl import URL
 
-from aiohttp_middlewares.annotations import Url, Urls
+from aiohttp_middlewares.annotations import EventHook, Url, Urls
+
+
+# Patterns, which could not be safely combined into one alternation regex:
+# numbered backreferences & conditionals would point to wrong groups and
+# global inline flags are not allowed in the middle of the regex
+UNSAFE_TO_COMBINE = re.compile(r"\\[0-9]|\(\?\(|\(\?[aiLmsux]+\)")
+
+
+class CacheInfo(NamedTuple):
+    """Statistics of matcher lookups cache.
+
+    .. versionadded:: 2.5.0
+    """
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+class UrlMatcher:
+    """Compiled ``Urls`` collection or dict to match request method and path.
+
+    Exact string and :class:`yarl.URL` paths are stored in a hash table, regex
+    instances are combined into one alternation regex and methods from
+    ``Urls`` dict are converted into frozensets of lower cased methods. Which
+    means lookup time does not depend on amount of exact paths, and all regexps
+    are checked with one ``match`` call.
+
+    Matcher keeps first-match semantics of :func:`match_request`. For ``Urls``
+    dict the first matching key (in insertion order) decides whether request
+    method matches or not.
+
+    Besides paths, URLs may refer to aiohttp route resources: either by
+    resource instance itself or by route name (any string, which does not
+    start with ``/``, as ``"reports.export"``). Route names are resolved into
+    resources via :meth:`resolve` or on first lookup for request handled by
+    application with given router. Then check of the request is a hash table
+    lookup of ``request.match_info.route.resource``. Resources are considered
+    only by lookups, which receive the request.
+
+    Use :func:`compile_urls` to create the matcher.
+
+    When ``cache_size`` is given, matcher memoizes lookup results for up to
+    ``cache_size`` most recently used paths. As methods from ``Urls`` dict are
+    checked against precomputed frozensets, one cached lookup serves requests
+    to given path with any method.
+
+    .. versionadded:: 2.5.0
+    """
+
+    __slots__ = (
+        "_cache_size",
+        "_exact",
+        "_fallback",
+        "_find",
+        "_methods",
+        "_names",
+        "_patterns",
+        "_patterns_start",
+        "_resources",
+        "_routers",
+        "_size",
+    )
+
+    def __init__(
+        self, urls: Urls, *, cache_size: Union[int, None] = None
+    ) -> None:
+        if cache_size is not None and cache_size < 1:
+            raise ValueError("Cache size should be a positive integer.")
+
+        exact: Dict[str, int] = {}
+        fallback: List[Tuple[int, Any]] = []
+        grouped: Dict[int, List[Tuple[int, Pattern[str]]]] = {}
+        names: Dict[str, int] = {}
+        resources: Dict[web.AbstractResource, int] = {}
+
+        size = 0
+        for index, item in enumerate(urls):
+            size += 1
+            if isinstance(item, web.AbstractResource):
+                resources.setdefault(item, index)
+            elif isinstance(item, (str, URL)):
+                exact.setdefault(str(item), index)
+                if isinstance(item, str) and not item.startswith("/"):
+                    names.setdefault(item, index)
+            elif isinstance(item, Pattern) and is_combinable_pattern(item):
+                grouped.setdefault(item.flags, []).append((index, item))
+            else:
+                fallback.append((index, item))
+
+        patterns: List[Tuple[Pattern[str], Dict[str, int]]] = []
+        for flags, items in grouped.items():
+            combined = combine_patterns(flags, items)
+            if combined is None:
+                fallback.extend(items)
+            else:
+                patterns.append(combined)
+
+        fallback.sort(key=lambda pair: pair[0])
+        starts = [min(groups.values()) for _, groups in patterns]
+        if fallback:
+            starts.append(fallback[0][0])
+
+        self._exact = exact
+        self._fallback: Tuple[Tuple[int, Any], ...] = tuple(fallback)
+        self._patterns: Tuple[Tuple[Pattern[str], Dict[str, int]], ...] = (
+            tuple(patterns)
+        )
+        self._patterns_start = min(starts) if starts else size
+        self._methods: Union[Tuple[FrozenSet[str], ...], None] = (
+            tuple(to_methods(value) for value in urls.values())
+            if isinstance(urls, dict)
+            else None
+        )
+        self._size = size
+
+        self._names = names
+        self._resources = resources
+        self._routers: Set[int] = set()
+
+        self._cache_size = cache_size
+        self._find: Callable[[str], Union[int, None]] = (
+            lru_cache(maxsize=cache_size)(self.find_uncached)
+            if cache_size
+            else self.find_uncached
+        )
+
+    def __bool__(self) -> bool:
+        return self._size > 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def cache_clear(self) -> None:
+        """Clear lookups cache if it is enabled."""
+        cache_clear = getattr(self._find, "cache_clear", None)
+        if cache_clear is not None:
+            cache_clear()
+
+    def cache_info(self) -> Union[CacheInfo, None]:
+        """Return lookups cache statistics or ``None`` if cache disabled."""
+        cache_info = getattr(self._find, "cache_info", None)
+        if cache_info is None:
+            return None
+
+        hits, misses, _, currsize = cache_info()
+        return CacheInfo(
+            hits=hits,
+            misses=misses,
+            maxsize=self._cache_size or 0,
+            currsize=currsize,
+        )
+
+    def find(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> Union[int, None]:
+        """Return index of first URL matching given path if any.
+
+        Supply request to match route resources and names as well.
+        """
+        found = self._find(path)
+        if request is None or not (self._resources or self._names):
+            return found
+
+        index = self.find_resource(request)
+        if index is not None and (found is None or index < found):
+            return index
+        return found
+
+    def find_resource(self, request: web.Request) -> Union[int, None]:
+        """Return index of first URL matching route resource of request."""
+        match_info = request.match_info
+        if self._names:
+            routers = self._routers
+            for app in match_info.apps:
+                if id(app.router) not in routers:
+                    self.resolve(app.router)
+
+        resource = match_info.route.resource
+        if resource is None:
+            return None
+        return self._resources.get(resource)
+
+    def find_uncached(self, path: str) -> Union[int, None]:
+        """Return index of first URL matching given path, avoiding cache."""
+        found = self._exact.get(path)
+        if found is not None and found < self._patterns_start:
+            return found
+
+        for pattern, groups in self._patterns:
+            matched = pattern.match(path)
+            if matched is not None and matched.lastgroup is not None:
+                index = groups[matched.lastgroup]
+                if found is None or index < found:
+                    found = index
+
+        for index, item in self._fallback:
+            if found is not None and index > found:
+                break
+            if match_path(item, path):
+                return index
+
+        return found
+
+    def match(
+        self, method: str, path: str, request: Union[web.Request, None] = None
+    ) -> bool:
+        """Check whether request method and path matches compiled URLs."""
+        index = self.find(path, request)
+        if index is None:
+            return False
+
+        methods = self._methods
+        if methods is None:
+            return True
+        return method.lower() in methods[index]
+
+    def match_path(
+        self, path: str, request: Union[web.Request, None] = None
+    ) -> bool:
+        """Check whether path matches any of compiled URLs."""
+        return self.find(path, request) is not None
+
+    def resolve(self, router: web.UrlDispatcher) -> None:
+        """Resolve route names into resources of given router.
+
+        Route names, which are missed in router, are skipped.
+        """
+        self._routers.add(id(router))
+        named_resources = router.named_resources()
+        resources = self._resources
+        for name, index in self._names.items():
+            resource = named_resources.get(name)
+            if not isinstance(resource, web.AbstractResource):
+                continue
+            current = resources.get(resource)
+            if current is None or index < current:
+                resources[resource] = index
+
+
+def combine_patterns(
+    flags: int, items: List[Tuple[int, Pattern[str]]]
+) -> Union[Tuple[Pattern[str], Dict[str, int]], None]:
+    """Combine regexps into one alternation regex with named groups.
+
+    Return ``None`` if combined regex cannot be compiled.
+    """
+    groups = {f"_url{index}": index for index, _ in items}
+    source = "|".join(
+        f"(?P<_url{index}>{item.pattern})" for index, item in items
+    )
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            return (re.compile(source, flags), groups)
+    except (DeprecationWarning, re.error):
+        return None
+
+
+def compile_urls(
+    urls: Union[Urls, UrlMatcher], *, cache_size: Union[int, None] = None
+) -> UrlMatcher:
+    """Compile URLs collection or dict into :class:`UrlMatcher`.
+
+    Compile URLs once on middleware initialization to avoid walking through
+    whole URLs collection on each request. Already compiled matcher returned
+    as is.
+
+    To memoize matching results for most requested paths, pass
+    ``cache_size`` and supply compiled matcher to the middleware, as:
+
+    .. code-block:: python
+
+        import re
+
+        from aiohttp import web
+        from aiohttp_middlewares import compile_urls, timeout_middleware
+
+        ignore = compile_urls(
+            {re.compile(r"^/api/reports/"): "GET"}, cache_size=4096
+        )
+        app = web.Application(
+            middlewares=[timeout_middleware(14.5, ignore=ignore)]
+        )
+
+        # Later on, check cache statistics
+        ignore.cache_info()
+
+    URLs may refer to aiohttp route names or resources as well. Route names are
+    resolved on first request handled by application, or pass application
+    router to :meth:`UrlMatcher.resolve` to resolve them beforehand:
+
+    .. code-block:: python
+
+        ignore = compile_urls({"reports.export": "POST"})
+        app = web.Application(
+            middlewares=[timeout_middleware(14.5, ignore=ignore)]
+        )
+        app.router.add_post(
+            "/reports/{report_id}/export", export_report, name="reports.export"
+        )
+        ignore.resolve(app.router)
+
+    :param urls: URLs collection or dict to compile.
+    :param cache_size:
+        Max amount of paths to store in LRU cache of lookup results. By
+        default: ``None`` (cache disabled)
+
+    .. versionadded:: 2.5.0
+    """
+    if isinstance(urls, UrlMatcher):
+        return urls
+    return UrlMatcher(urls, cache_size=cache_size)
+
+
+def emit_event(
+    logger: logging.Logger,
+    on_event: Union[EventHook, None],
+    event: str,
+    message: str,
+    method: str,
+    path: str,
+    *extra: Any,
+) -> None:
+    """Pass middleware event to the hook and log it as debug message.
+
+    Hook receives event name and ``(method, path, *extra)`` tuple. Payload
+    tuple and log extra dict are created only when hook supplied or debug
+    logging enabled for given logger, so with debug logging disabled and
+    without hook no objects allocated on each request.
+
+    .. versionadded:: 2.5.0
+    """
+    if on_event is not None:
+        on_event(event, (method, path, *extra))
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            message,
+            extra={
+                "event": event,
+                "method": method,
+                "path": path,
+                "payload": extra,
+            },
+        )
+
+
+def is_combinable_pattern(item: Pattern[Any]) -> bool:
+    """Check whether given regex is safe to combine with other regexps."""
+    return (
+        isinstance(item.pattern, str)
+        and UNSAFE_TO_COMBINE.search(item.pattern) is None
+    )
 
 
 def match_path(item: Url, path: str) -> bool:
@@ -24,24 +396,47 @@ def match_path(item: Url, path: str) -> bool:
     if isinstance(item, str):
         return item == path
 
+    # Route resources require request match info to match against
+    if isinstance(item, web.AbstractResource):
+        return False
+
     try:
         return bool(item.match(path))
     except (AttributeError, TypeError):
         return False
 
 
-def match_request(urls: Urls, method: str, path: str) -> bool:
-    """Check whether request method and path matches given URLs or not."""
-    found = [item for item in urls if match_path(item, path)]
-    if not found:
+def match_request(
+    urls: Union[Urls, UrlMatcher], method: str, path: str
+) -> bool:
+    """Check whether request method and path matches given URLs or not.
+
+    .. versionchanged:: 2.5.0
+
+    Support passing URLs compiled with :func:`compile_urls`.
+    """
+    if isinstance(urls, UrlMatcher):
+        return urls.match(method, path)
+
+    for found in urls:
+        if match_path(found, path):
+            break
+    else:
         return False
 
     if not isinstance(urls, dict):
         return True
 
-    found_item = urls[found[0]]
+    found_item = urls[found]
     method = method.lower()
     if isinstance(found_item, str):
         return found_item.lower() == method
 
     return any(True for item in found_item if item.lower() == method)
+
+
+def to_methods(value: Union[str, Any]) -> FrozenSet[str]:
+    """Convert method or collection of methods into frozenset."""
+    if isinstance(value, str):
+        return frozenset((value.lower(),))
+    return frozenset(item.lower() for item in value)
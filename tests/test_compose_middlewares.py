@@ -0,0 +1,222 @@
+import asyncio
+import re
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import (
+    compose_middlewares,
+    cors_middleware,
+    error_middleware,
+    https_middleware,
+    NON_IDEMPOTENT_METHODS,
+    shield_middleware,
+    timeout_middleware,
+)
+from aiohttp_middlewares.cors import (
+    ACCESS_CONTROL,
+    ACCESS_CONTROL_REQUEST_METHOD,
+)
+from aiohttp_middlewares.timeout import get_remaining_time
+
+
+HALF_A_SECOND = 0.5
+TEST_DENIED_ORIGIN = "https://www.google.com"
+TEST_ORIGIN = "http://localhost:3000"
+
+CONFIG = {
+    "https": {},
+    "cors": {
+        "origins": [TEST_ORIGIN],
+        "urls": [re.compile(r"^\/api")],
+        "allow_credentials": True,
+        "expose_headers": ["X-Total-Count"],
+    },
+    "error": {"ignore_exceptions": web.HTTPConflict},
+    "timeout": {"seconds": HALF_A_SECOND, "ignore": {"/api/slow": "POST"}},
+    "shield": {"methods": NON_IDEMPOTENT_METHODS},
+}
+FACTORIES = (
+    ("https", https_middleware),
+    ("cors", cors_middleware),
+    ("error", error_middleware),
+    ("timeout", timeout_middleware),
+    ("shield", shield_middleware),
+)
+
+
+async def conflict(request):
+    raise web.HTTPConflict(text="Conflict")
+
+
+def create_app(middlewares):
+    app = web.Application(middlewares=middlewares)
+    app.router.add_get("/api/", index)
+    app.router.add_post("/api/", index)
+    app.router.add_get("/api/conflict", conflict)
+    app.router.add_get("/api/error", error)
+    app.router.add_get("/api/slow", slow)
+    app.router.add_post("/api/slow", slow)
+    app.router.add_get("/index", index)
+    return app
+
+
+def create_chain(config):
+    return [
+        factory(**config[key]) for key, factory in FACTORIES if key in config
+    ]
+
+
+async def error(request):
+    raise ValueError("Something went wrong")
+
+
+async def index(request):
+    return web.json_response(
+        {"remaining": get_remaining_time(request), "scheme": request.scheme}
+    )
+
+
+async def slow(request):
+    await asyncio.sleep(HALF_A_SECOND * 2)
+    return web.json_response({"remaining": get_remaining_time(request)})
+
+
+async def fetch(client, method, url, headers):
+    response = await client.request(method, url, headers=headers)
+    data = await response.text()
+    return (
+        response.status,
+        {
+            key: value
+            for key, value in response.headers.items()
+            if key.startswith(ACCESS_CONTROL)
+            or key in {"Content-Type", "Vary"}
+        },
+        re.sub(r'"remaining": [\d.]+', '"remaining": 1', data),
+    )
+
+
+@pytest.mark.parametrize(
+    "config",
+    (
+        CONFIG,
+        {key: value for key, value in CONFIG.items() if key != "cors"},
+        {key: value for key, value in CONFIG.items() if key != "error"},
+        {
+            **CONFIG,
+            "cors": {"allow_all": True, "preflight_status": 204},
+        },
+        {"cors": CONFIG["cors"]},
+        {**CONFIG, "https": {"trusted_proxies": ["127.0.0.0/8"]}},
+        {**CONFIG, "https": {"trusted_proxies": ["10.0.0.0/8"]}},
+        {
+            **CONFIG,
+            "cors": {"origins": [TEST_ORIGIN], "public_urls": ["/api/"]},
+        },
+    ),
+)
+@pytest.mark.parametrize(
+    "method, url, headers",
+    (
+        ("GET", "/api/", {"Origin": TEST_ORIGIN}),
+        ("GET", "/api/", {"Origin": TEST_DENIED_ORIGIN}),
+        ("GET", "/api/", {"X-Forwarded-Proto": "https"}),
+        ("POST", "/api/", {"Origin": TEST_ORIGIN}),
+        (
+            "OPTIONS",
+            "/api/",
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "POST"},
+        ),
+        (
+            "OPTIONS",
+            "/api/",
+            {
+                "Origin": TEST_DENIED_ORIGIN,
+                ACCESS_CONTROL_REQUEST_METHOD: "POST",
+            },
+        ),
+        ("OPTIONS", "/api/", {ACCESS_CONTROL_REQUEST_METHOD: "POST"}),
+        (
+            "OPTIONS",
+            "/api/",
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "TRACE"},
+        ),
+        ("OPTIONS", "/api/", {"Origin": TEST_ORIGIN}),
+        ("GET", "/api/conflict", {"Origin": TEST_ORIGIN}),
+        ("GET", "/api/error", {"Origin": TEST_ORIGIN}),
+        ("GET", "/api/does-not-exist", {"Origin": TEST_ORIGIN}),
+        ("GET", "/api/slow", {"Origin": TEST_ORIGIN}),
+        ("POST", "/api/slow", {"Origin": TEST_ORIGIN}),
+        ("GET", "/index", {"Origin": TEST_ORIGIN}),
+    ),
+)
+async def test_compose_middlewares(
+    aiohttp_client, config, method, url, headers
+):
+    composed = await aiohttp_client(
+        create_app([compose_middlewares(**config)])
+    )
+    chain = await aiohttp_client(create_app(create_chain(config)))
+
+    expected = await fetch(chain, method, url, headers)
+    assert await fetch(composed, method, url, headers) == expected
+
+
+async def test_compose_middlewares_no_config(aiohttp_client):
+    client = await aiohttp_client(create_app([compose_middlewares()]))
+    response = await client.get("/index")
+    assert response.status == 200
+    assert await response.json() == {"remaining": None, "scheme": "http"}
+
+
+@pytest.mark.parametrize(
+    "trusted_proxies, expected",
+    ((["127.0.0.0/8"], "https"), (["10.0.0.0/8"], "http")),
+)
+async def test_compose_middlewares_https_trusted_proxies(
+    aiohttp_client, trusted_proxies, expected
+):
+    client = await aiohttp_client(
+        create_app(
+            [compose_middlewares(https={"trusted_proxies": trusted_proxies})]
+        )
+    )
+    response = await client.get(
+        "/index",
+        headers={"X-Forwarded-For": "1.2.3.4", "X-Forwarded-Proto": "https"},
+    )
+    assert response.status == 200
+    assert (await response.json())["scheme"] == expected
+
+
+@pytest.mark.parametrize(
+    "method, value",
+    [("DELETE", False), ("GET", False), ("POST", True), ("PUT", False)],
+)
+async def test_compose_middlewares_shield(method, value):
+    flag = False
+    client_ready = asyncio.Event()
+    handler_ready = asyncio.Event()
+
+    async def handler(request):
+        handler_ready.set()
+        await client_ready.wait()
+
+        nonlocal flag
+        flag = True
+
+        return web.Response(status=200)
+
+    middleware = compose_middlewares(shield={"methods": frozenset({"POST"})})
+    task = asyncio.create_task(
+        middleware(make_mocked_request(method, "/"), handler)
+    )
+    await handler_ready.wait()
+
+    task.cancel()
+    client_ready.set()
+    await asyncio.wait([task])
+
+    assert flag is value
@@ -0,0 +1,201 @@
+import asyncio
+import re
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import concurrency_middleware
+from aiohttp_middlewares.concurrency import (
+    ConcurrencyLimiter,
+    ConcurrencyLimits,
+    ConcurrencyStats,
+    EVENT_CONCURRENCY_REJECTED,
+    UNMATCHED_ROUTE,
+)
+
+
+def create_app(limits, **kwargs):
+    app = web.Application(
+        middlewares=[concurrency_middleware(limits, **kwargs)]
+    )
+    app["ready"] = asyncio.Event()
+    app.router.add_get("/", handler)
+    app.router.add_get("/slow", slow_handler)
+    app.router.add_get("/api/slow", slow_handler)
+    return app
+
+
+async def handler(request):
+    return web.json_response(True)
+
+
+async def slow_handler(request):
+    await request.app["ready"].wait()
+    return web.json_response(True)
+
+
+async def fetch_concurrently(client, urls, app):
+    tasks = [asyncio.create_task(client.get(url)) for url in urls]
+    await asyncio.sleep(0.05)
+    app["ready"].set()
+    return [response.status for response in await asyncio.gather(*tasks)]
+
+
+@pytest.mark.parametrize(
+    "limit, kwargs",
+    (
+        (0, {}),
+        (1, {"routes": {"/": 0}}),
+        (1, {"queue_size": -1}),
+        (1, {"queue_timeout": 0}),
+    ),
+)
+def test_concurrency_limits_invalid(limit, kwargs):
+    with pytest.raises(ValueError):
+        ConcurrencyLimits(limit, **kwargs)
+
+
+async def test_concurrency_middleware(aiohttp_client):
+    events = []
+    app = create_app(
+        1, on_event=lambda event, payload: events.append((event, payload))
+    )
+    client = await aiohttp_client(app)
+
+    statuses = await fetch_concurrently(client, ["/slow", "/slow", "/"], app)
+    assert statuses == [200, 503, 200]
+    assert events == [(EVENT_CONCURRENCY_REJECTED, ("GET", "/slow"))]
+
+    response = await client.get("/slow")
+    assert response.status == 200
+
+
+async def test_concurrency_middleware_ignore(aiohttp_client):
+    app = create_app(1, ignore={"/slow": "GET"})
+    client = await aiohttp_client(app)
+    statuses = await fetch_concurrently(client, ["/slow", "/slow"], app)
+    assert statuses == [200, 200]
+
+
+async def test_concurrency_middleware_queue(aiohttp_client):
+    limits = ConcurrencyLimits(
+        routes={re.compile(r"^/api"): 1}, queue_size=1, queue_timeout=1
+    )
+    app = create_app(limits)
+    client = await aiohttp_client(app)
+
+    statuses = await fetch_concurrently(
+        client, ["/api/slow", "/api/slow", "/api/slow", "/slow", "/slow"], app
+    )
+    assert statuses == [200, 200, 503, 200, 200]
+    assert limits.stats() == {
+        "^/api": ConcurrencyStats(
+            in_flight=0, queued=0, admitted=2, rejected=1, timed_out=0
+        )
+    }
+
+
+async def test_concurrency_middleware_queue_timeout(aiohttp_client):
+    limits = ConcurrencyLimits(2, queue_size=1, queue_timeout=0.01)
+    app = create_app(limits)
+    client = await aiohttp_client(app)
+
+    statuses = await fetch_concurrently(
+        client, ["/slow", "/slow", "/slow", "/", "/does-not-exist"], app
+    )
+    assert statuses == [200, 200, 503, 200, 404]
+    assert limits.stats() == {
+        "/slow": ConcurrencyStats(
+            in_flight=0, queued=0, admitted=2, rejected=0, timed_out=1
+        ),
+        "/": ConcurrencyStats(
+            in_flight=0, queued=0, admitted=1, rejected=0, timed_out=0
+        ),
+        UNMATCHED_ROUTE: ConcurrencyStats(
+            in_flight=0, queued=0, admitted=1, rejected=0, timed_out=0
+        ),
+    }
+
+
+async def test_concurrency_limiter_cancelled_waiter():
+    limiter = ConcurrencyLimiter(1, queue_size=2)
+    assert await limiter.acquire() is True
+
+    first = asyncio.create_task(limiter.acquire())
+    second = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats().queued == 2
+
+    # Slot passed to the first waiter, which cancelled before it woke up
+    limiter.release()
+    first.cancel()
+    await asyncio.wait([first])
+    assert await second is True
+    assert limiter.stats() == ConcurrencyStats(
+        in_flight=1, queued=0, admitted=2, rejected=0, timed_out=0
+    )
+
+    limiter.release()
+    assert limiter.stats().in_flight == 0
+
+
+async def test_concurrency_limiter_cancelled_queued():
+    limiter = ConcurrencyLimiter(1, queue_size=1)
+    assert await limiter.acquire() is True
+
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait([task])
+    assert limiter.stats().queued == 0
+
+    limiter.release()
+    assert limiter.stats().in_flight == 0
+
+
+def test_concurrency_limits_route_names():
+    app = web.Application()
+    resource = app.router.add_resource("/documents/{document_id}")
+    limits = ConcurrencyLimits(routes={resource: 1, "/": 2})
+
+    request = make_mocked_request("GET", "/", app=app)
+    assert limits.get_limiter("/", request).limit == 2
+    assert limits.get_limiter("/does-not-exist", request) is None
+    assert list(limits.stats()) == ["/"]
+
+
+async def test_concurrency_limiter_released_before_timeout():
+    limiter = ConcurrencyLimiter(1, queue_size=1, queue_timeout=0.01)
+    assert await limiter.acquire() is True
+
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # Block the loop, so the slot is passed to the waiter and the queue
+    # timeout expires in the same loop iteration, before waiter wakes up
+    time.sleep(0.02)
+    asyncio.get_running_loop().call_soon(limiter.release)
+    assert await task is False
+    assert limiter.stats() == ConcurrencyStats(
+        in_flight=0, queued=0, admitted=1, rejected=0, timed_out=1
+    )
+
+
+async def test_concurrency_limiter_cancelled_before_release():
+    limiter = ConcurrencyLimiter(1, queue_size=1)
+    assert await limiter.acquire() is True
+
+    task = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    # Client disconnected while queued, and the slot is released before
+    # cancelled waiter wakes up
+    task.cancel()
+    limiter.release()
+    await asyncio.wait([task])
+    assert task.cancelled()
+    assert limiter.stats() == ConcurrencyStats(
+        in_flight=0, queued=0, admitted=1, rejected=0, timed_out=0
+    )
@@ -4,9 +4,11 @@ import re
 import attr
 import pytest
 from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from multidict import CIMultiDict
 from yarl import URL
 
-from aiohttp_middlewares import cors_middleware
+from aiohttp_middlewares import compile_urls, cors_middleware
 from aiohttp_middlewares.cors import (
     ACCESS_CONTROL,
     ACCESS_CONTROL_ALLOW_HEADERS,
@@ -14,9 +16,23 @@ from aiohttp_middlewares.cors import (
     ACCESS_CONTROL_ALLOW_ORIGIN,
     ACCESS_CONTROL_EXPOSE_HEADERS,
     ACCESS_CONTROL_MAX_AGE,
+    ACCESS_CONTROL_REQUEST_HEADERS,
     ACCESS_CONTROL_REQUEST_METHOD,
+    add_vary_header,
+    CorsPolicy,
     DEFAULT_ALLOW_HEADERS,
     DEFAULT_ALLOW_METHODS,
+    DEFAULT_MAX_AGE,
+    EVENT_CORS_ALLOWED,
+    EVENT_CORS_NO_ORIGIN,
+    EVENT_CORS_NOT_ALLOWED,
+    EVENT_CORS_PREFLIGHT,
+    EVENT_CORS_PREFLIGHT_REJECTED,
+    EVENT_CORS_SKIPPED,
+    match_items,
+    normalize_request_headers,
+    setup_cors,
+    VARY,
 )
 
 
@@ -284,3 +300,608 @@ async def test_url_whitelisted(aiohttp_client):
         allow_headers=None,
         allow_methods=None,
     )
+
+
+@pytest.mark.parametrize("preflight_status", (42, 404))
+def test_invalid_preflight_status(preflight_status):
+    with pytest.raises(ValueError):
+        cors_middleware(allow_all=True, preflight_status=preflight_status)
+
+
+@pytest.mark.parametrize(
+    "config, headers, expected_origin",
+    (
+        ({"allow_all": True}, {"Origin": TEST_ORIGIN}, "*"),
+        (
+            {"allow_all": True, "allow_credentials": True},
+            {"Origin": TEST_ORIGIN},
+            TEST_ORIGIN,
+        ),
+        (
+            {"origins": [TEST_ORIGIN_REGEX]},
+            {"Origin": TEST_ORIGIN},
+            TEST_ORIGIN,
+        ),
+        ({"origins": [TEST_DENIED_ORIGIN]}, {"Origin": TEST_ORIGIN}, None),
+        ({"allow_all": True}, {}, None),
+    ),
+)
+@pytest.mark.parametrize("preflight_status", (200, 204))
+async def test_preflight_status(
+    aiohttp_client, config, headers, expected_origin, preflight_status
+):
+    outer_responses = []
+
+    @web.middleware
+    async def outer_middleware(request, handler):
+        response = await handler(request)
+        outer_responses.append(response.status)
+        return response
+
+    app = web.Application(
+        middlewares=[
+            outer_middleware,
+            cors_middleware(preflight_status=preflight_status, **config),
+        ]
+    )
+    client = await aiohttp_client(app)
+
+    for _ in range(2):
+        response = await client.options(
+            "/", headers={ACCESS_CONTROL_REQUEST_METHOD: "GET", **headers}
+        )
+        assert response.status == preflight_status
+        assert await response.text() == ""
+
+        if expected_origin is None:
+            check_deny_origin(response)
+        else:
+            check_allow_origin(response, expected_origin)
+
+    assert outer_responses == [preflight_status, preflight_status]
+
+
+async def test_origins_cache(aiohttp_client):
+    origins = compile_urls(
+        [TEST_DENIED_ORIGIN, TEST_ORIGIN_REGEX], cache_size=8
+    )
+    client = await aiohttp_client(create_app(origins=origins))
+
+    for _ in range(3):
+        check_allow_origin(
+            await client.get("/", headers={"Origin": TEST_ORIGIN}),
+            TEST_ORIGIN,
+            allow_headers=None,
+            allow_methods=None,
+        )
+    check_deny_origin(
+        await client.get("/", headers={"Origin": "https://localhost"})
+    )
+
+    assert origins.cache_info() == (2, 2, 8, 2)
+
+
+@pytest.mark.parametrize(
+    "config, method, url, headers, expected",
+    (
+        ({"origins": [TEST_ORIGIN]}, "GET", "/", {}, EVENT_CORS_NO_ORIGIN),
+        (
+            {"origins": [TEST_ORIGIN]},
+            "GET",
+            "/",
+            {"Origin": TEST_DENIED_ORIGIN},
+            EVENT_CORS_NOT_ALLOWED,
+        ),
+        (
+            {"origins": [TEST_ORIGIN]},
+            "GET",
+            "/",
+            {"Origin": TEST_ORIGIN},
+            EVENT_CORS_ALLOWED,
+        ),
+        (
+            {"origins": [TEST_ORIGIN]},
+            "OPTIONS",
+            "/",
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+            EVENT_CORS_PREFLIGHT,
+        ),
+        (
+            {"origins": [TEST_ORIGIN], "preflight_status": 204},
+            "OPTIONS",
+            "/",
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+            EVENT_CORS_PREFLIGHT,
+        ),
+        (
+            {"allow_all": True, "urls": [API_REGEX]},
+            "GET",
+            "/",
+            {"Origin": TEST_ORIGIN},
+            EVENT_CORS_SKIPPED,
+        ),
+    ),
+)
+async def test_on_event(
+    aiohttp_client, config, method, url, headers, expected
+):
+    events = []
+    client = await aiohttp_client(
+        create_app(
+            on_event=lambda event, payload: events.append((event, payload)),
+            **config,
+        )
+    )
+    await client.request(method, url, headers=headers)
+    assert events == [(expected, (method, url))]
+
+
+@pytest.mark.parametrize(
+    "items, value, expected",
+    (
+        ([TEST_ORIGIN], TEST_ORIGIN, True),
+        ([TEST_ORIGIN_URL], TEST_ORIGIN, True),
+        ([TEST_ORIGIN_REGEX], TEST_ORIGIN, True),
+        ([TEST_ORIGIN_REGEX], TEST_DENIED_ORIGIN, False),
+    ),
+)
+def test_match_items(items, value, expected):
+    assert match_items(items, value) is expected
+
+
+async def test_url_route_names(aiohttp_client):
+    app = create_app(allow_all=True, urls=["api.index"])
+    app.router.add_get("/api/", index, name="api.index")
+    client = await aiohttp_client(app)
+
+    check_allow_origin(
+        await client.get("/api/", headers={"Origin": TEST_ORIGIN}),
+        "*",
+        allow_headers=None,
+        allow_methods=None,
+    )
+    check_deny_origin(await client.get("/", headers={"Origin": TEST_ORIGIN}))
+    check_deny_origin(
+        await client.get("/does-not-exist", headers={"Origin": TEST_ORIGIN})
+    )
+
+
+@pytest.mark.parametrize(
+    "current, expected",
+    (
+        (None, "Origin"),
+        ("", "Origin"),
+        ("Accept-Encoding", "Accept-Encoding, Origin"),
+        ("accept-encoding, origin", "accept-encoding, origin"),
+        ("*", "*"),
+    ),
+)
+def test_add_vary_header(current, expected):
+    headers = CIMultiDict({VARY: current} if current is not None else {})
+    add_vary_header(headers, "Origin")
+    assert headers[VARY] == expected
+
+
+async def vary_index(request):
+    return web.json_response({}, headers={VARY: "Accept-Encoding"})
+
+
+@pytest.mark.parametrize(
+    "origin, expected",
+    ((TEST_ORIGIN, TEST_ORIGIN), (TEST_DENIED_ORIGIN, None), (None, None)),
+)
+async def test_vary_origin(aiohttp_client, origin, expected):
+    app = create_app(origins=[TEST_ORIGIN])
+    app.router.add_get("/vary", vary_index)
+    client = await aiohttp_client(app)
+
+    headers = {"Origin": origin} if origin else {}
+    response = await client.get("/vary", headers=headers)
+    assert response.headers.get(ACCESS_CONTROL_ALLOW_ORIGIN) == expected
+    assert response.headers[VARY] == "Accept-Encoding, Origin"
+
+    response = await client.options(
+        "/", headers={**headers, ACCESS_CONTROL_REQUEST_METHOD: "GET"}
+    )
+    assert response.headers[VARY] == "Origin"
+
+
+@pytest.mark.parametrize("preflight_status", (None, 204))
+async def test_vary_origin_allow_all(aiohttp_client, preflight_status):
+    client = await aiohttp_client(
+        create_app(allow_all=True, preflight_status=preflight_status)
+    )
+    for method in ("GET", "OPTIONS"):
+        response = await client.request(
+            method,
+            "/",
+            headers={
+                "Origin": TEST_ORIGIN,
+                ACCESS_CONTROL_REQUEST_METHOD: "GET",
+            },
+        )
+        assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == "*"
+        assert VARY not in response.headers
+
+
+def test_public_urls_allow_credentials():
+    with pytest.raises(ValueError):
+        cors_middleware(
+            origins=[TEST_ORIGIN],
+            allow_credentials=True,
+            public_urls=[API_REGEX],
+        )
+
+
+@pytest.mark.parametrize("preflight_status", (None, 204))
+@pytest.mark.parametrize("origin", (TEST_ORIGIN, TEST_DENIED_ORIGIN))
+async def test_public_urls(aiohttp_client, origin, preflight_status):
+    events = []
+    app = create_app(
+        origins=[TEST_ORIGIN],
+        public_urls=[API_REGEX],
+        expose_headers=["X-Total"],
+        max_age=600,
+        preflight_status=preflight_status,
+        on_event=lambda event, payload: events.append(event),
+    )
+    app.router.add_get("/api/", index)
+    client = await aiohttp_client(app)
+
+    response = await client.get("/api/", headers={"Origin": origin})
+    assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == "*"
+    assert response.headers[ACCESS_CONTROL_EXPOSE_HEADERS] == "X-Total"
+    assert ACCESS_CONTROL_ALLOW_METHODS not in response.headers
+    assert VARY not in response.headers
+
+    response = await client.options(
+        "/api/",
+        headers={"Origin": origin, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+    )
+    check_allow_origin(response, "*")
+    assert response.headers[ACCESS_CONTROL_MAX_AGE] == "600"
+    assert VARY not in response.headers
+    assert events == [EVENT_CORS_ALLOWED, EVENT_CORS_PREFLIGHT]
+
+    # Not public URLs still echo allowed origin
+    response = await client.get("/", headers={"Origin": origin})
+    assert response.headers.get(ACCESS_CONTROL_ALLOW_ORIGIN) == (
+        origin if origin == TEST_ORIGIN else None
+    )
+    assert response.headers[VARY] == "Origin"
+
+
+async def test_public_urls_no_origin(aiohttp_client):
+    events = []
+    app = create_app(
+        origins=[TEST_ORIGIN],
+        public_urls=["/"],
+        on_event=lambda event, payload: events.append(event),
+    )
+    client = await aiohttp_client(app)
+
+    response = await client.get("/")
+    assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == "*"
+    assert events == [EVENT_CORS_NO_ORIGIN]
+
+
+def test_default_max_age():
+    policy = CorsPolicy.create(allow_all=True)
+    assert policy.options_headers[ACCESS_CONTROL_MAX_AGE] == str(
+        DEFAULT_MAX_AGE
+    )
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        (None, ()),
+        ("", ()),
+        ("X-Requested-With", ("x-requested-with",)),
+        (
+            " content-type ,Authorization,, content-type",
+            ("authorization", "content-type"),
+        ),
+    ),
+)
+def test_normalize_request_headers(value, expected):
+    assert normalize_request_headers(value) == expected
+
+
+@pytest.mark.parametrize("preflight_status", (None, 204))
+@pytest.mark.parametrize(
+    "config, method, request_headers, expected",
+    (
+        ({}, "PUT", "Content-Type, Authorization", True),
+        ({}, "HEAD", None, True),
+        ({}, "TRACE", None, False),
+        ({}, "GET", "X-Client-UID", False),
+        ({"allow_methods": ("PATCH",)}, "POST", None, True),
+        ({"allow_methods": ("PATCH",)}, "DELETE", None, False),
+        ({"allow_methods": ("get", "post", "patch")}, "PATCH", None, True),
+        ({"allow_methods": ("PATCH",)}, "patch", None, True),
+        ({"allow_methods": ("*",)}, "TRACE", None, True),
+        (
+            {"allow_headers": DEFAULT_ALLOW_HEADERS + ("X-Client-UID",)},
+            "GET",
+            "x-client-uid, content-type",
+            True,
+        ),
+        ({"allow_headers": ("*",)}, "GET", "X-Client-UID", True),
+    ),
+)
+async def test_preflight_validation(
+    aiohttp_client,
+    config,
+    method,
+    request_headers,
+    expected,
+    preflight_status,
+):
+    events = []
+    client = await aiohttp_client(
+        create_app(
+            origins=[TEST_ORIGIN],
+            preflight_status=preflight_status,
+            on_event=lambda event, payload: events.append(event),
+            **config,
+        )
+    )
+
+    headers = {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: method}
+    if request_headers is not None:
+        headers[ACCESS_CONTROL_REQUEST_HEADERS] = request_headers
+    response = await client.options("/", headers=headers)
+    assert response.headers[VARY] == "Origin"
+    assert await response.text() == ""
+
+    if expected:
+        assert response.status == (preflight_status or 200)
+        assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == TEST_ORIGIN
+        assert events == [EVENT_CORS_PREFLIGHT]
+    else:
+        assert response.status == 403
+        check_deny_origin(response)
+        assert events == [EVENT_CORS_PREFLIGHT_REJECTED]
+
+
+@pytest.mark.parametrize(
+    "origin, expected_status, expected_event",
+    (
+        (TEST_DENIED_ORIGIN, 200, EVENT_CORS_NOT_ALLOWED),
+        (None, 200, EVENT_CORS_NO_ORIGIN),
+    ),
+)
+async def test_preflight_validation_not_allowed_origin(
+    aiohttp_client, origin, expected_status, expected_event
+):
+    events = []
+    client = await aiohttp_client(
+        create_app(
+            origins=[TEST_ORIGIN],
+            on_event=lambda event, payload: events.append(event),
+        )
+    )
+
+    headers = {ACCESS_CONTROL_REQUEST_METHOD: "TRACE"}
+    if origin:
+        headers["Origin"] = origin
+    response = await client.options("/", headers=headers)
+    assert response.status == expected_status
+    check_deny_origin(response)
+    assert events == [expected_event]
+
+
+async def test_preflight_validation_public_urls(aiohttp_client):
+    client = await aiohttp_client(
+        create_app(origins=[TEST_ORIGIN], public_urls=["/"])
+    )
+    response = await client.options(
+        "/",
+        headers={
+            "Origin": TEST_DENIED_ORIGIN,
+            ACCESS_CONTROL_REQUEST_METHOD: "GET",
+            ACCESS_CONTROL_REQUEST_HEADERS: "X-Client-UID",
+        },
+    )
+    assert response.status == 403
+    check_deny_origin(response)
+
+
+def test_preflight_cache():
+    policy = CorsPolicy.create(origins=[TEST_ORIGIN], preflight_status=204)
+
+    request_headers = ("Content-Type", "content-type", "content-type, Accept")
+    for value in request_headers * 2:
+        request = make_mocked_request(
+            "OPTIONS",
+            "/",
+            headers={
+                "Origin": TEST_ORIGIN,
+                ACCESS_CONTROL_REQUEST_METHOD: "POST",
+                ACCESS_CONTROL_REQUEST_HEADERS: value,
+            },
+        )
+        response = policy.respond_to_preflight(request)
+        assert response.status == 204
+        check_allow_origin(response, TEST_ORIGIN)
+
+    cache_info = policy.get_preflight_headers.cache_info()
+    assert cache_info.hits == 4
+    assert cache_info.misses == 2
+
+
+async def stream(request):
+    response = web.StreamResponse()
+    await response.prepare(request)
+    await response.write(b"data")
+    return response
+
+
+def create_signal_app(*, middlewares=(), **kwargs):
+    app = web.Application(middlewares=middlewares)
+    app.router.add_get("/", index)
+    app.router.add_get("/stream", stream)
+    app.router.add_post("/http-exceptions", create_http_exception)
+    app.router.add_route("OPTIONS", "/options", index)
+    app.router.add_get("/skip", index)
+    setup_cors(app, urls=[re.compile(r"^\/(?!skip)")], **kwargs)
+    return app
+
+
+@pytest.mark.parametrize(
+    "method, url, expected_status",
+    (
+        ("GET", "/", 200),
+        ("GET", "/stream", 200),
+        ("POST", "/http-exceptions", 503),
+        ("GET", "/does-not-exist", 404),
+        ("OPTIONS", "/options", 200),
+    ),
+)
+async def test_setup_cors(aiohttp_client, method, url, expected_status):
+    events = []
+    client = await aiohttp_client(
+        create_signal_app(
+            origins=[TEST_ORIGIN],
+            on_event=lambda event, payload: events.append((event, payload)),
+        )
+    )
+
+    response = await client.request(
+        method, url, headers={"Origin": TEST_ORIGIN}
+    )
+    assert response.status == expected_status
+    assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == TEST_ORIGIN
+    assert response.headers[VARY] == "Origin"
+
+    response = await client.request(
+        method, url, headers={"Origin": TEST_DENIED_ORIGIN}
+    )
+    assert response.status == expected_status
+    check_deny_origin(response)
+
+    response = await client.request(method, url)
+    check_deny_origin(response)
+
+    assert events == [
+        (EVENT_CORS_ALLOWED, (method, url)),
+        (EVENT_CORS_NOT_ALLOWED, (method, url)),
+        (EVENT_CORS_NO_ORIGIN, (method, url)),
+    ]
+
+
+async def test_setup_cors_outer_middleware(aiohttp_client):
+    @web.middleware
+    async def outer_middleware(request, handler):
+        raise web.HTTPForbidden(text="Forbidden")
+
+    client = await aiohttp_client(
+        create_signal_app(allow_all=True, middlewares=[outer_middleware])
+    )
+    response = await client.get("/", headers={"Origin": TEST_ORIGIN})
+    assert response.status == 403
+    assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == "*"
+
+
+async def test_setup_cors_skip(aiohttp_client):
+    events = []
+    client = await aiohttp_client(
+        create_signal_app(
+            allow_all=True,
+            on_event=lambda event, payload: events.append(event),
+        )
+    )
+
+    response = await client.get("/skip", headers={"Origin": TEST_ORIGIN})
+    assert response.status == 200
+    check_deny_origin(response)
+
+    response = await client.options(
+        "/skip",
+        headers={"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+    )
+    assert response.status == 405
+    assert response.headers["Allow"] == "GET,HEAD"
+    check_deny_origin(response)
+    assert events == [EVENT_CORS_SKIPPED]
+
+
+@pytest.mark.parametrize(
+    "config, headers, expected_status, expected_origin, expected_event",
+    (
+        (
+            {},
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+            200,
+            TEST_ORIGIN,
+            EVENT_CORS_PREFLIGHT,
+        ),
+        (
+            {"preflight_status": 204},
+            {"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+            204,
+            TEST_ORIGIN,
+            EVENT_CORS_PREFLIGHT,
+        ),
+        (
+            {},
+            {
+                "Origin": TEST_ORIGIN,
+                ACCESS_CONTROL_REQUEST_METHOD: "GET",
+                ACCESS_CONTROL_REQUEST_HEADERS: "X-Client-UID",
+            },
+            403,
+            None,
+            EVENT_CORS_PREFLIGHT_REJECTED,
+        ),
+        (
+            {},
+            {
+                "Origin": TEST_DENIED_ORIGIN,
+                ACCESS_CONTROL_REQUEST_METHOD: "GET",
+            },
+            200,
+            None,
+            EVENT_CORS_NOT_ALLOWED,
+        ),
+        ({}, {"Origin": TEST_ORIGIN}, 405, None, None),
+    ),
+)
+async def test_setup_cors_preflight(
+    aiohttp_client,
+    config,
+    headers,
+    expected_status,
+    expected_origin,
+    expected_event,
+):
+    events = []
+    client = await aiohttp_client(
+        create_signal_app(
+            origins=[TEST_ORIGIN],
+            on_event=lambda event, payload: events.append(event),
+            **config,
+        )
+    )
+
+    for url in ("/", "/http-exceptions"):
+        response = await client.options(url, headers=headers)
+        assert response.status == expected_status
+        assert response.headers.get(ACCESS_CONTROL_ALLOW_ORIGIN) == (
+            expected_origin
+        )
+        if expected_origin is not None:
+            check_allow_origin(response, expected_origin)
+
+    assert events == ([expected_event] * 2 if expected_event else [])
+
+
+async def test_setup_cors_preflight_not_found(aiohttp_client):
+    client = await aiohttp_client(create_signal_app(allow_all=True))
+    response = await client.options(
+        "/does-not-exist",
+        headers={"Origin": TEST_ORIGIN, ACCESS_CONTROL_REQUEST_METHOD: "GET"},
+    )
+    assert response.status == 404
+    assert response.headers[ACCESS_CONTROL_ALLOW_ORIGIN] == "*"
@@ -1,13 +1,31 @@
+import asyncio
+import json
+import logging
 import re
 
 import pytest
 from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
 
 from aiohttp_middlewares import (
+    create_error_handler,
+    create_static_error_handler,
     error_context,
     error_middleware,
     get_error_response,
 )
+from aiohttp_middlewares.error import (
+    CompiledConfig,
+    create_json_error_renderer,
+    default_error_handler,
+    ErrorContext,
+    ErrorPolicy,
+    EVENT_ERROR_HANDLED,
+    get_error_handler,
+    get_error_key,
+    render_json,
+    TracebackSampler,
+)
 
 
 class LegalException(Exception):
@@ -22,7 +40,13 @@ async def custom_error_middleware(request, handler):
     try:
         return await handler(request)
     except Exception as err:
-        return await get_error_response(request, err, default_handler=error)
+        return await get_error_response(
+            request,
+            err,
+            default_handler=error,
+            config={re.compile(r"^/api"): api_error},
+            ignore_exceptions=web.HTTPMethodNotAllowed,
+        )
 
 
 async def api_error(request):
@@ -47,14 +71,36 @@ async def no_error_context(request):
     return web.Response(text="Server Error", status=500)
 
 
-async def test_custom_middleware(aiohttp_client):
+@pytest.mark.parametrize(
+    "method, path, expected_status, expected_content_type, expected_text",
+    (
+        ("GET", "/does-not-exist.exe", 404, "text/plain", "Not Found"),
+        (
+            "GET",
+            "/api/does-not-exist",
+            404,
+            "application/json",
+            '{"detail": "Not Found"}',
+        ),
+        ("POST", "/legal/", 405, "text/plain", "405: Method Not Allowed"),
+    ),
+)
+async def test_custom_middleware(
+    aiohttp_client,
+    method,
+    path,
+    expected_status,
+    expected_content_type,
+    expected_text,
+):
     app = web.Application(middlewares=[custom_error_middleware])
+    app.router.add_get("/legal/", legal)
     client = await aiohttp_client(app)
 
-    response = await client.get("/does-not-exist.exe")
-    assert response.content_type == "text/plain"
-    assert response.status == 404
-    assert await response.text() == "Not Found"
+    response = await client.request(method, path)
+    assert response.content_type == expected_content_type
+    assert response.status == expected_status
+    assert await response.text() == expected_text
 
 
 async def test_default_handler(aiohttp_client):
@@ -67,6 +113,35 @@ async def test_default_handler(aiohttp_client):
     assert await response.json() == {"detail": "Not Found"}
 
 
+async def test_error_middleware_on_event(aiohttp_client):
+    events = []
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                config={"/api/": api_error},
+                ignore_exceptions=web.HTTPMethodNotAllowed,
+                on_event=lambda event, payload: events.append(
+                    (event, payload)
+                ),
+            )
+        ]
+    )
+    app.router.add_get("/", legal)
+    app.router.add_get("/api/", legal)
+    client = await aiohttp_client(app)
+
+    await client.get("/api/")
+    await client.get("/does-not-exist")
+    await client.post("/")
+    assert events == [
+        (EVENT_ERROR_HANDLED, ("GET", "/api/", api_error)),
+        (
+            EVENT_ERROR_HANDLED,
+            ("GET", "/does-not-exist", default_error_handler),
+        ),
+    ]
+
+
 @pytest.mark.parametrize(
     "ignore_exceptions",
     (web.HTTPNotFound, (web.HTTPNotFound,), (ValueError, web.HTTPNotFound)),
@@ -77,12 +152,14 @@ async def test_ignore_exceptions(aiohttp_client, ignore_exceptions):
     )
     client = await aiohttp_client(app)
 
-    response = await client.get("/does-not-exist.exe")
-    assert response.content_type == "text/plain"
-    assert response.status == 404
-    assert await response.text() == "404: Not Found"
+    for _ in range(2):
+        response = await client.get("/does-not-exist.exe")
+        assert response.content_type == "text/plain"
+        assert response.status == 404
+        assert await response.text() == "404: Not Found"
 
 
+@pytest.mark.parametrize("compile_config", (False, True))
 @pytest.mark.parametrize(
     "path, expected_status, expected_content_type, expected_text",
     (
@@ -99,18 +176,22 @@ async def test_ignore_exceptions(aiohttp_client, ignore_exceptions):
     ),
 )
 async def test_multiple_handlers(
-    aiohttp_client, path, expected_status, expected_content_type, expected_text
+    aiohttp_client,
+    compile_config,
+    path,
+    expected_status,
+    expected_content_type,
+    expected_text,
 ):
+    config = {
+        "/no-error-context/": no_error_context,
+        re.compile(r"^/api"): api_error,
+    }
+    if compile_config:
+        config = CompiledConfig.from_config(config)
+
     app = web.Application(
-        middlewares=[
-            error_middleware(
-                default_handler=error,
-                config={
-                    "/no-error-context/": no_error_context,
-                    re.compile(r"^/api"): api_error,
-                },
-            )
-        ]
+        middlewares=[error_middleware(default_handler=error, config=config)]
     )
     app.router.add_get("/legal/", legal)
     app.router.add_get("/api/legal/", legal)
@@ -132,3 +213,335 @@ async def test_single_handler(aiohttp_client):
     assert response.content_type == "text/plain"
     assert response.status == 404
     assert await response.text() == "Not Found"
+
+
+def compact_dumps(data):
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def failing_dumps(data):
+    raise TypeError("Unable to dump data")
+
+
+@pytest.mark.parametrize(
+    "kwargs, path, expected_status, expected_text",
+    (
+        ({}, "/", 404, '{"detail": "Not Found"}'),
+        ({"dumps": compact_dumps}, "/", 404, '{"detail":"Not Found"}'),
+        (
+            {"dumps": compact_dumps, "cache_size": None},
+            "/legal/",
+            451,
+            '{"paid":false,"pay_at":"https://payment.url/"}',
+        ),
+        ({"dumps": failing_dumps}, "/", 404, '{"detail": "Not Found"}'),
+    ),
+)
+async def test_create_error_handler(
+    aiohttp_client, kwargs, path, expected_status, expected_text
+):
+    app = web.Application(
+        middlewares=[
+            error_middleware(default_handler=create_error_handler(**kwargs))
+        ]
+    )
+    app.router.add_get("/legal/", legal)
+    client = await aiohttp_client(app)
+
+    for _ in range(2):
+        response = await client.get(path)
+        assert response.status == expected_status
+        assert response.content_type == "application/json"
+        assert response.charset == "utf-8"
+        assert await response.text() == expected_text
+
+
+def test_create_json_error_renderer_same_message():
+    render_error = create_json_error_renderer(dumps=compact_dumps)
+    for status in (502, 504):
+        err = Exception("Upstream failed")
+        response = render_error(
+            ErrorContext(
+                err=err,
+                message=str(err),
+                status=status,
+                data={"detail": str(err)},
+            )
+        )
+        assert response.status == status
+        assert response.body == b'{"detail":"Upstream failed"}'
+
+
+def test_render_json_error():
+    with pytest.raises(TypeError):
+        render_json({"detail": object()})
+
+
+@pytest.mark.parametrize(
+    "path, expected_content_type",
+    (
+        ("/api/legal/", "application/json"),
+        ("/legal/", "text/plain"),
+        ("/does-not-exist", "text/plain"),
+    ),
+)
+async def test_route_names(aiohttp_client, path, expected_content_type):
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                default_handler=error, config={"api.legal": api_error}
+            )
+        ]
+    )
+    app.router.add_get("/legal/", legal)
+    app.router.add_get("/api/legal/", legal, name="api.legal")
+
+    client = await aiohttp_client(app)
+    response = await client.get(path)
+    assert response.content_type == expected_content_type
+
+
+@pytest.mark.parametrize(
+    "config, path, expected",
+    (
+        (None, "/api/", None),
+        ({re.compile(r"^/api"): api_error}, "/api/", api_error),
+        ({re.compile(r"^/api"): api_error}, "/", None),
+        (CompiledConfig.from_config({"/api/": api_error}), "/api/", api_error),
+    ),
+)
+def test_get_error_handler(config, path, expected):
+    request = make_mocked_request("GET", path)
+    assert get_error_handler(request, config) is expected
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def raise_value_error(message):
+    raise ValueError(message)
+
+
+def capture_error(func, *args):
+    try:
+        func(*args)
+    except Exception as err:
+        return err
+
+
+async def test_create_error_handler_sampler(aiohttp_client, caplog):
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                default_handler=create_error_handler(
+                    sampler=TracebackSampler(limit=2)
+                )
+            )
+        ]
+    )
+    app.router.add_get("/legal/", legal)
+    client = await aiohttp_client(app)
+
+    for _ in range(5):
+        response = await client.get("/legal/")
+        assert response.status == 451
+        assert (await response.json())["paid"] is False
+
+    records = [
+        record
+        for record in caplog.records
+        if record.name == "aiohttp_middlewares.error"
+    ]
+    assert len(records) == 2
+    assert all(record.exc_info for record in records)
+
+
+@pytest.mark.parametrize("kwargs", ({"limit": 0}, {"window": 0}))
+def test_traceback_sampler_invalid(kwargs):
+    with pytest.raises(ValueError):
+        TracebackSampler(**kwargs)
+
+
+def test_traceback_sampler(caplog):
+    clock = FakeClock()
+    logger = logging.getLogger("tests")
+    sampler = TracebackSampler(limit=2, window=10, clock=clock)
+
+    first = [capture_error(raise_value_error, str(idx)) for idx in range(4)]
+    assert [sampler.log(logger, err, "Error") for err in first] == [
+        True,
+        True,
+        False,
+        False,
+    ]
+
+    # Same class, but different raising frame
+    other = capture_error(int, "not a number")
+    assert sampler.log(logger, other, "Error") is True
+    assert len(sampler) == 2
+
+    # New window logs summary of suppressed errors first
+    clock.now = 10
+    assert sampler.log(logger, first[0], "Error") is True
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert len(messages) == 5
+    assert messages[-2].startswith("Suppressed 2 tracebacks of ValueError")
+    assert caplog.records[-2].exc_info is None
+
+    sampler.log(logger, first[0], "Error")
+    sampler.log(logger, first[0], "Error")
+    assert sampler.flush(logger) == 1
+    assert len(sampler) == 0
+
+
+def test_traceback_sampler_max_keys(caplog):
+    logger = logging.getLogger("tests")
+    sampler = TracebackSampler(limit=1, max_keys=1)
+
+    err = capture_error(raise_value_error, "first")
+    sampler.log(logger, err, "Error")
+    sampler.log(logger, err, "Error")
+    sampler.log(logger, ValueError("no traceback"), "Error")
+    assert len(sampler) == 1
+    assert "Suppressed 1 tracebacks" in caplog.text
+
+
+def test_traceback_sampler_max_keys_oldest_window():
+    clock = FakeClock()
+    logger = logging.getLogger("tests")
+    sampler = TracebackSampler(limit=1, window=10, max_keys=2, clock=clock)
+
+    hot = capture_error(raise_value_error, "hot")
+    other = capture_error(int, "not a number")
+    assert sampler.log(logger, hot, "Error") is True
+    clock.now = 5
+    assert sampler.log(logger, other, "Error") is True
+
+    # New window of hot group started after window of other group
+    clock.now = 10
+    assert sampler.log(logger, hot, "Error") is True
+
+    # So other group is evicted, while hot group is still sampled
+    assert sampler.log(logger, ValueError("new"), "Error") is True
+    assert sampler.log(logger, hot, "Error") is False
+    assert sampler.log(logger, other, "Error") is True
+
+
+def test_traceback_sampler_flush_expired(caplog):
+    clock = FakeClock()
+    logger = logging.getLogger("tests")
+    sampler = TracebackSampler(limit=1, window=10, clock=clock)
+
+    first = capture_error(raise_value_error, "first")
+    for _ in range(3):
+        sampler.log(logger, first, "Error")
+    clock.now = 5
+    sampler.log(logger, capture_error(int, "not a number"), "Error")
+
+    # Error of other group logs summary of the expired window
+    clock.now = 12
+    other = capture_error(int, "not a number")
+    assert sampler.log(logger, other, "Error") is False
+    assert (
+        caplog.records[-1]
+        .getMessage()
+        .startswith("Suppressed 2 tracebacks of ValueError")
+    )
+    assert len(sampler) == 1
+
+    clock.now = 20
+    assert sampler.flush_expired(logger) == 1
+    assert len(sampler) == 0
+
+
+async def test_traceback_sampler_on_shutdown(aiohttp_client, caplog):
+    sampler = TracebackSampler(limit=1)
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                default_handler=create_error_handler(sampler=sampler)
+            )
+        ]
+    )
+    app.on_shutdown.append(sampler.on_shutdown)
+    app.router.add_get("/legal/", legal)
+    client = await aiohttp_client(app)
+
+    for _ in range(3):
+        await client.get("/legal/")
+    await client.close()
+
+    assert len(sampler) == 0
+    assert "Suppressed 2 tracebacks of LegalException" in (caplog.text)
+
+
+def test_get_error_key():
+    assert get_error_key(ValueError()) == (ValueError, None, None)
+
+    err_class, filename, lineno = get_error_key(
+        capture_error(raise_value_error, "error")
+    )
+    assert err_class is ValueError
+    assert filename == __file__
+    assert lineno == raise_value_error.__code__.co_firstlineno + 1
+
+
+async def timeout(request):
+    raise asyncio.TimeoutError()
+
+
+@pytest.mark.parametrize(
+    "path, expected_status, expected_text",
+    (
+        ("/timeout", 504, '{"detail": "Gateway Timeout"}'),
+        ("/api/timeout", 504, '{"detail": "Gateway Timeout"}'),
+        ("/does-not-exist", 404, '{"detail": "Nothing here"}'),
+        (
+            "/api/legal",
+            451,
+            '{"paid": false, "pay_at": "https://payment.url/"}',
+        ),
+        ("/legal", 451, "Not available for legal reasons"),
+    ),
+)
+async def test_exception_handlers(
+    aiohttp_client, path, expected_status, expected_text
+):
+    app = web.Application(
+        middlewares=[
+            error_middleware(
+                default_handler=error,
+                config={re.compile(r"^/api"): api_error},
+                exception_handlers={
+                    asyncio.TimeoutError: create_static_error_handler(504),
+                    web.HTTPClientError: create_static_error_handler(
+                        404, "Nothing here"
+                    ),
+                },
+            )
+        ]
+    )
+    for prefix in ("", "/api"):
+        app.router.add_get(f"{prefix}/legal", legal)
+        app.router.add_get(f"{prefix}/timeout", timeout)
+    client = await aiohttp_client(app)
+
+    response = await client.get(path)
+    assert response.status == expected_status
+    assert await response.text() == expected_text
+
+
+def test_error_policy_exception_handler():
+    static_error = create_static_error_handler(500)
+    policy = ErrorPolicy.create(exception_handlers={LookupError: static_error})
+
+    assert policy.get_exception_handler(KeyError) is static_error
+    assert policy.get_exception_handler(ValueError) is None
+    assert policy.handler_classes == {KeyError: static_error, ValueError: None}
+    assert policy.get_exception_handler(KeyError) is static_error
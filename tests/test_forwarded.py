@@ -0,0 +1,250 @@
+import pytest
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares.forwarded import (
+    compile_forwarded_headers,
+    compile_trusted_networks,
+    ForwardedElement,
+    get_forwarded,
+    get_node_address,
+    has_forwarded_headers,
+    parse_forwarded,
+    parse_x_forwarded,
+    TrustedNetworks,
+)
+
+
+PROXY = "10.0.0.1"
+TRUSTED = ["10.0.0.0/8", "::1"]
+FORWARDED = compile_forwarded_headers(["forwarded"])
+X_FORWARDED = compile_forwarded_headers(
+    ["X-Forwarded-For", "X-Forwarded-Proto", "X-Forwarded-Host"]
+)
+
+
+def create_request(headers, remote=PROXY):
+    return make_mocked_request("GET", "/", headers=headers).clone(
+        remote=remote
+    )
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        ("", ()),
+        (
+            "for=192.0.2.60;proto=http;by=203.0.113.43",
+            (
+                ForwardedElement(
+                    by="203.0.113.43", for_="192.0.2.60", proto="http"
+                ),
+            ),
+        ),
+        (
+            'For="[2001:db8:cafe::17]:4711";Proto=HTTPS',
+            (
+                ForwardedElement(
+                    for_="[2001:db8:cafe::17]:4711", proto="https"
+                ),
+            ),
+        ),
+        (
+            "for=192.0.2.43, for=198.51.100.17;host=example.com",
+            (
+                ForwardedElement(for_="192.0.2.43"),
+                ForwardedElement(for_="198.51.100.17", host="example.com"),
+            ),
+        ),
+        (
+            'for=unknown;host="quoted\\"host", for=1.1.1.1;for=2.2.2.2',
+            (
+                ForwardedElement(for_="unknown", host='quoted"host'),
+                ForwardedElement(for_="1.1.1.1"),
+            ),
+        ),
+        (
+            "malformed;for=1.1.1.1, =broken, proto=https",
+            (
+                ForwardedElement(for_="1.1.1.1"),
+                ForwardedElement(proto="https"),
+            ),
+        ),
+    ),
+)
+def test_parse_forwarded(value, expected):
+    assert parse_forwarded(value) == expected
+
+
+@pytest.mark.parametrize(
+    "forwarded_for, forwarded_proto, forwarded_host, expected",
+    (
+        (None, None, None, ()),
+        (None, "HTTPS", None, (ForwardedElement(proto="https"),)),
+        (
+            "1.1.1.1, 10.0.0.2",
+            "https",
+            "example.com",
+            (
+                ForwardedElement(
+                    for_="1.1.1.1", host="example.com", proto="https"
+                ),
+                ForwardedElement(
+                    for_="10.0.0.2", host="example.com", proto="https"
+                ),
+            ),
+        ),
+        (
+            "1.1.1.1, 10.0.0.2, 10.0.0.3",
+            "https, http",
+            None,
+            (
+                ForwardedElement(for_="1.1.1.1"),
+                ForwardedElement(for_="10.0.0.2", proto="https"),
+                ForwardedElement(for_="10.0.0.3", proto="http"),
+            ),
+        ),
+    ),
+)
+def test_parse_x_forwarded(
+    forwarded_for, forwarded_proto, forwarded_host, expected
+):
+    assert (
+        parse_x_forwarded(forwarded_for, forwarded_proto, forwarded_host)
+        == expected
+    )
+
+
+@pytest.mark.parametrize(
+    "node, expected",
+    (
+        (None, None),
+        ("unknown", None),
+        ("_hidden", None),
+        ("192.0.2.43", "192.0.2.43"),
+        ("192.0.2.43:4711", "192.0.2.43"),
+        ("[2001:db8:cafe::17]:4711", "2001:db8:cafe::17"),
+        ("[]", None),
+        ("2001:db8:cafe::17", "2001:db8:cafe::17"),
+    ),
+)
+def test_get_node_address(node, expected):
+    assert get_node_address(node) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, remote, expected",
+    (
+        ({}, PROXY, None),
+        ({"Forwarded": ""}, PROXY, None),
+        ({"Forwarded": "for=1.1.1.1;proto=https"}, "1.2.3.4", None),
+        (
+            {"Forwarded": "for=1.1.1.1;proto=https"},
+            PROXY,
+            ForwardedElement(for_="1.1.1.1", proto="https"),
+        ),
+        # Client is not able to spoof hops behind trusted proxies
+        (
+            {
+                "Forwarded": (
+                    "for=6.6.6.6;proto=http, for=1.1.1.1;proto=https, "
+                    "for=10.0.0.2;proto=http"
+                )
+            },
+            PROXY,
+            ForwardedElement(for_="1.1.1.1", proto="https"),
+        ),
+        (
+            {"Forwarded": "for=10.0.0.3;proto=https, for=10.0.0.2"},
+            PROXY,
+            ForwardedElement(for_="10.0.0.3", proto="https"),
+        ),
+        # X-Forwarded-* headers are not managed by proxy
+        (
+            {"X-Forwarded-For": "1.1.1.1", "X-Forwarded-Proto": "https"},
+            PROXY,
+            None,
+        ),
+    ),
+)
+def test_get_forwarded(headers, remote, expected):
+    networks = compile_trusted_networks(TRUSTED)
+    request = create_request(headers, remote)
+    assert get_forwarded(request, networks, FORWARDED) == expected
+
+
+@pytest.mark.parametrize(
+    "headers, trusted_headers, expected",
+    (
+        (
+            {"X-Forwarded-For": "1.1.1.1", "X-Forwarded-Proto": "https"},
+            X_FORWARDED,
+            ForwardedElement(for_="1.1.1.1", proto="https"),
+        ),
+        (
+            {
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "example.com",
+                "X-Forwarded-Proto": "https",
+            },
+            compile_forwarded_headers(["X-Forwarded-Proto"]),
+            ForwardedElement(proto="https"),
+        ),
+        # Client is not able to spoof headers, which are not managed by proxy
+        (
+            {
+                "Forwarded": "for=8.8.8.8;proto=https;host=evil.example",
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "evil.example",
+                "X-Forwarded-Proto": "http",
+            },
+            None,
+            ForwardedElement(for_="1.1.1.1", proto="http"),
+        ),
+        (
+            {
+                "Forwarded": "for=8.8.8.8;proto=https;host=evil.example",
+                "X-Forwarded-Host": "evil.example",
+            },
+            None,
+            None,
+        ),
+    ),
+)
+def test_get_forwarded_x_forwarded(headers, trusted_headers, expected):
+    networks = compile_trusted_networks(TRUSTED)
+    request = create_request(headers, "::1")
+    if trusted_headers is None:
+        forwarded = get_forwarded(request, networks)
+    else:
+        forwarded = get_forwarded(request, networks, trusted_headers)
+    assert forwarded == expected
+
+
+@pytest.mark.parametrize(
+    "headers",
+    (
+        [],
+        ["X-Forwarded-Port"],
+        ["Forwarded", "X-Forwarded-For"],
+    ),
+)
+def test_compile_forwarded_headers_invalid(headers):
+    with pytest.raises(ValueError):
+        compile_forwarded_headers(headers)
+
+
+def test_has_forwarded_headers():
+    assert has_forwarded_headers(create_request({})) is False
+    assert has_forwarded_headers(create_request({"X-Forwarded-Host": "a"}))
+
+
+def test_trusted_networks():
+    networks = TrustedNetworks(TRUSTED, cache_size=2)
+    assert compile_trusted_networks(networks) is networks
+
+    assert PROXY in networks
+    assert "::1" in networks
+    assert "not an address" not in networks
+    assert None not in networks
+    assert "1.1.1.1" not in networks
+    assert networks.networks[0].prefixlen == 8
@@ -1,11 +1,15 @@
 import pytest
 from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
 
 from aiohttp_middlewares import https_middleware
+from aiohttp_middlewares.https import EVENT_HTTPS
 
 
-def create_app(match_headers):
-    app = web.Application(middlewares=[https_middleware(match_headers)])
+def create_app(match_headers, **kwargs):
+    app = web.Application(
+        middlewares=[https_middleware(match_headers, **kwargs)]
+    )
     app.router.add_route("GET", "/", handler)
     return app
 
@@ -35,3 +39,70 @@ async def test_https_middleware(
     client = await aiohttp_client(create_app(match_headers))
     response = await client.get("/", headers=request_headers)
     assert await response.json() == expected
+
+
+@pytest.mark.parametrize(
+    "request_headers, expected",
+    [
+        (None, []),
+        ({"X-Forwarded-Proto": "https"}, [(EVENT_HTTPS, ("GET", "/"))]),
+    ],
+)
+async def test_https_middleware_on_event(
+    aiohttp_client, request_headers, expected
+):
+    events = []
+    client = await aiohttp_client(
+        create_app(
+            None,
+            on_event=lambda event, payload: events.append((event, payload)),
+        )
+    )
+    await client.get("/", headers=request_headers)
+    assert events == expected
+
+
+@pytest.mark.parametrize(
+    "remote, request_headers, forwarded_headers, expected",
+    [
+        ("10.0.0.1", None, None, "http"),
+        ("10.0.0.1", {"X-Forwarded-Proto": "https"}, None, "https"),
+        # Forwarded header is not managed by proxy, so it is ignored
+        ("10.0.0.1", {"Forwarded": "for=1.1.1.1;proto=https"}, None, "http"),
+        (
+            "10.0.0.1",
+            {"Forwarded": "for=1.1.1.1;proto=https"},
+            ["Forwarded"],
+            "https",
+        ),
+        (
+            "10.0.0.1",
+            {"Forwarded": "for=1.1.1.1;proto=http"},
+            ["Forwarded"],
+            "http",
+        ),
+        (
+            "10.0.0.1",
+            {"X-Forwarded-Proto": "https"},
+            ["Forwarded"],
+            "http",
+        ),
+        ("1.2.3.4", {"X-Forwarded-Proto": "https"}, None, "http"),
+    ],
+)
+async def test_https_middleware_trusted_proxies(
+    remote, request_headers, forwarded_headers, expected
+):
+    middleware = https_middleware(
+        trusted_proxies=["10.0.0.0/8"],
+        **(
+            {"forwarded_headers": forwarded_headers}
+            if forwarded_headers
+            else {}
+        ),
+    )
+    request = make_mocked_request("GET", "/", headers=request_headers).clone(
+        remote=remote
+    )
+    response = await middleware(request, handler)
+    assert response.text == f'"{expected}"'
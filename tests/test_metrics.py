@@ -0,0 +1,117 @@
+from aiohttp import web
+
+from aiohttp_middlewares import (
+    create_error_handler,
+    create_static_error_handler,
+    error_middleware,
+    timeout_middleware,
+)
+from aiohttp_middlewares.error import EVENT_ERROR_HANDLED
+from aiohttp_middlewares.metrics import (
+    escape_label,
+    EVENTS,
+    get_target_name,
+    Metrics,
+    PROMETHEUS_CONTENT_TYPE,
+)
+from aiohttp_middlewares.timeout import EVENT_TIMEOUT_IGNORED
+
+
+async def error(request):
+    raise ValueError("Something went wrong")
+
+
+async def error_handler(request):
+    return web.Response(status=500)
+
+
+def test_metrics():
+    metrics = Metrics()
+    assert metrics.counters() == dict.fromkeys(EVENTS, 0)
+
+    metrics(EVENT_TIMEOUT_IGNORED, ("GET", "/"))
+    metrics(EVENT_TIMEOUT_IGNORED, ("GET", "/"))
+    metrics("custom.event", ("GET", "/"))
+
+    counters = metrics.counters()
+    assert counters[EVENT_TIMEOUT_IGNORED] == 2
+    assert counters["custom.event"] == 1
+
+
+def test_metrics_render():
+    metrics = Metrics(("timeout.ignored",), prefix="app")
+    metrics("timeout.ignored", ("GET", "/"))
+    metrics(EVENT_ERROR_HANDLED, ("GET", "/", error_handler))
+    metrics(EVENT_ERROR_HANDLED, ("GET", "/", 'handler "quoted"'))
+
+    assert metrics.render() == (
+        "# HELP app_events_total Total amount of middleware events.\n"
+        "# TYPE app_events_total counter\n"
+        'app_events_total{event="timeout.ignored"} 1\n'
+        'app_events_total{event="error.handled"} 2\n'
+        "# HELP app_event_targets_total Total amount of middleware events "
+        "per target.\n"
+        "# TYPE app_event_targets_total counter\n"
+        'app_event_targets_total{event="error.handled",'
+        'target="tests.test_metrics.error_handler"} 1\n'
+        'app_event_targets_total{event="error.handled",'
+        'target="handler \\"quoted\\""} 1\n'
+    )
+
+
+async def test_metrics_handler(aiohttp_client):
+    metrics = Metrics()
+    app = web.Application(
+        middlewares=[
+            error_middleware(default_handler=error_handler, on_event=metrics),
+            timeout_middleware(1, ignore=["/metrics"], on_event=metrics),
+        ]
+    )
+    app.router.add_get("/error", error)
+    app.router.add_get("/metrics", metrics.handler)
+    client = await aiohttp_client(app)
+
+    await client.get("/error")
+    response = await client.get("/metrics")
+    assert response.headers["Content-Type"] == PROMETHEUS_CONTENT_TYPE
+
+    text = await response.text()
+    assert 'aiohttp_middlewares_events_total{event="error.handled"} 1' in text
+    assert (
+        'aiohttp_middlewares_events_total{event="timeout.ignored"} 1' in text
+    )
+
+
+def test_escape_label():
+    assert escape_label('a\\b"c\nd') == 'a\\\\b\\"c\\nd'
+
+
+def test_get_target_name():
+    assert get_target_name("handler") == "handler"
+    assert get_target_name(error) == "tests.test_metrics.error"
+    assert get_target_name(42) == "42"
+
+
+def test_metrics_render_same_target_names():
+    metrics = Metrics(())
+    not_found = create_static_error_handler(404)
+    for handler in (
+        not_found,
+        not_found,
+        create_static_error_handler(504),
+        create_error_handler(),
+        create_error_handler(),
+    ):
+        metrics(EVENT_ERROR_HANDLED, ("GET", "/", handler))
+
+    prefix = (
+        'aiohttp_middlewares_event_targets_total{event="error.handled",'
+        'target="'
+    )
+    lines = metrics.render().splitlines()
+    assert lines[-3:] == [
+        f'{prefix}StaticErrorHandler(status=404)"}} 2',
+        f'{prefix}StaticErrorHandler(status=504)"}} 1',
+        f"{prefix}aiohttp_middlewares.error.create_error_handler.<locals>."
+        'error_handler"} 2',
+    ]
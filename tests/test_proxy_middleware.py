@@ -0,0 +1,155 @@
+from unittest import mock
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from aiohttp_middlewares import proxy_fix_middleware
+from aiohttp_middlewares.proxy import EVENT_PROXY_FIXED
+
+
+PROXY = "10.0.0.1"
+
+
+async def handler(request):
+    return web.json_response(
+        {
+            "cloned": request.get("original") is not request,
+            "host": request.host,
+            "remote": request.remote,
+            "scheme": request.scheme,
+        }
+    )
+
+
+def create_request(headers, remote=PROXY):
+    transport = mock.Mock()
+    transport.get_extra_info.return_value = (remote, 12345)
+    request = make_mocked_request(
+        "GET",
+        "/",
+        headers={"Host": "localhost", **headers},
+        transport=transport,
+    )
+    request["original"] = request
+    return request
+
+
+@pytest.mark.parametrize(
+    "kwargs, headers, remote, expected",
+    (
+        ({}, {}, PROXY, (False, "localhost", PROXY, "http")),
+        (
+            {},
+            {"X-Forwarded-Proto": "https"},
+            "1.2.3.4",
+            (False, "localhost", "1.2.3.4", "http"),
+        ),
+        (
+            {},
+            {"Forwarded": "for=10.0.0.1;proto=http;host=localhost"},
+            PROXY,
+            (False, "localhost", PROXY, "http"),
+        ),
+        (
+            {"forwarded_headers": ["Forwarded"]},
+            {"Forwarded": "for=10.0.0.1;proto=http;host=localhost"},
+            PROXY,
+            (False, "localhost", PROXY, "http"),
+        ),
+        (
+            {"forwarded_headers": ["Forwarded"]},
+            {"Forwarded": 'for="1.1.1.1:4711";proto=https;host=example.com'},
+            PROXY,
+            (True, "example.com", "1.1.1.1", "https"),
+        ),
+        # Client sent headers, which are not set by trusted proxy
+        (
+            {},
+            {"Forwarded": 'for="1.1.1.1:4711";proto=https;host=example.com'},
+            PROXY,
+            (False, "localhost", PROXY, "http"),
+        ),
+        (
+            {},
+            {
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "evil.example",
+                "X-Forwarded-Proto": "https",
+            },
+            PROXY,
+            (True, "localhost", "1.1.1.1", "https"),
+        ),
+        (
+            {"forwarded_headers": ["X-Forwarded-For", "X-Forwarded-Host"]},
+            {
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "example.com",
+                "X-Forwarded-Proto": "https",
+            },
+            PROXY,
+            (True, "example.com", "1.1.1.1", "http"),
+        ),
+        (
+            {"forwarded_headers": ["Forwarded"]},
+            {
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "evil.example",
+            },
+            PROXY,
+            (False, "localhost", PROXY, "http"),
+        ),
+        (
+            {
+                "forwarded_headers": [
+                    "X-Forwarded-For",
+                    "X-Forwarded-Host",
+                    "X-Forwarded-Proto",
+                ],
+                "host": False,
+                "remote": False,
+            },
+            {
+                "X-Forwarded-For": "1.1.1.1",
+                "X-Forwarded-Host": "example.com",
+                "X-Forwarded-Proto": "https",
+            },
+            PROXY,
+            (True, "localhost", PROXY, "https"),
+        ),
+        (
+            {"scheme": False},
+            {"X-Forwarded-For": "1.1.1.1", "X-Forwarded-Proto": "https"},
+            PROXY,
+            (True, "localhost", "1.1.1.1", "http"),
+        ),
+        (
+            {"forwarded_headers": ["Forwarded"]},
+            {"Forwarded": "for=unknown"},
+            PROXY,
+            (False, "localhost", PROXY, "http"),
+        ),
+    ),
+)
+async def test_proxy_fix_middleware(kwargs, headers, remote, expected):
+    events = []
+    middleware = proxy_fix_middleware(
+        ["10.0.0.0/8"],
+        on_event=lambda event, payload: events.append((event, payload)),
+        **kwargs,
+    )
+    response = await middleware(create_request(headers, remote), handler)
+
+    cloned, host, remote, scheme = expected
+    assert (
+        response.text
+        == web.json_response(
+            {
+                "cloned": cloned,
+                "host": host,
+                "remote": remote,
+                "scheme": scheme,
+            }
+        ).text
+    )
+    assert events == ([(EVENT_PROXY_FIXED, ("GET", "/"))] if cloned else [])
@@ -6,12 +6,23 @@ from aiohttp import web
 from aiohttp.test_utils import make_mocked_request
 
 from aiohttp_middlewares import NON_IDEMPOTENT_METHODS, shield_middleware
+from aiohttp_middlewares.shield import (
+    EVENT_SHIELD_IGNORED,
+    EVENT_SHIELD_METHOD,
+    EVENT_SHIELD_PATH,
+    OVERFLOW_UNSHIELDED,
+    ShieldPolicy,
+    ShieldRegistry,
+    ShieldStats,
+)
 
 
-def create_app(*, methods=None, urls=None, ignore=None):
+def create_app(*, methods=None, urls=None, ignore=None, on_event=None):
     app = web.Application(
         middlewares=[
-            shield_middleware(methods=methods, urls=urls, ignore=ignore)
+            shield_middleware(
+                methods=methods, urls=urls, ignore=ignore, on_event=on_event
+            )
         ]
     )
 
@@ -83,6 +94,119 @@ async def test_shield_request_by_url(aiohttp_client, url, method):
     assert await response.json() is True
 
 
+@pytest.mark.parametrize(
+    "config, method, url, expected",
+    [
+        ({"methods": NON_IDEMPOTENT_METHODS}, "GET", "/one", []),
+        (
+            {"methods": NON_IDEMPOTENT_METHODS},
+            "POST",
+            "/one",
+            [(EVENT_SHIELD_METHOD, ("POST", "/one"))],
+        ),
+        (
+            {"methods": NON_IDEMPOTENT_METHODS, "ignore": ["/three"]},
+            "PATCH",
+            "/three",
+            [(EVENT_SHIELD_IGNORED, ("PATCH", "/three"))],
+        ),
+        (
+            {"urls": {"/two": "POST"}},
+            "POST",
+            "/two",
+            [(EVENT_SHIELD_PATH, ("POST", "/two"))],
+        ),
+    ],
+)
+async def test_shield_middleware_on_event(
+    aiohttp_client, config, method, url, expected
+):
+    events = []
+    app = create_app(
+        on_event=lambda event, payload: events.append((event, payload)),
+        **config,
+    )
+    client = await aiohttp_client(app)
+
+    response = await client.request(method, url)
+    assert response.status == 200
+    assert events == expected
+
+
+@pytest.mark.parametrize(
+    "per_route, expected",
+    [
+        (
+            False,
+            [
+                (EVENT_SHIELD_PATH, ("POST", "/documents/1")),
+                (EVENT_SHIELD_PATH, ("POST", "/unknown/1")),
+            ],
+        ),
+        (
+            True,
+            [
+                (EVENT_SHIELD_PATH, ("POST", "/documents/1")),
+                (EVENT_SHIELD_PATH, ("POST", "/documents/2")),
+                (EVENT_SHIELD_PATH, ("POST", "/unknown/1")),
+            ],
+        ),
+    ],
+)
+async def test_shield_middleware_per_route(
+    aiohttp_client, per_route, expected
+):
+    events = []
+    app = web.Application(
+        middlewares=[
+            shield_middleware(
+                urls={"/documents/1": "POST", "/unknown/1": "POST"},
+                on_event=lambda event, payload: events.append(
+                    (event, payload)
+                ),
+                per_route=per_route,
+            )
+        ]
+    )
+    app.router.add_post("/documents/{document_id}", handler)
+    client = await aiohttp_client(app)
+
+    for url in ("/documents/1", "/documents/2", "/unknown/1", "/unknown/2"):
+        await client.post(url)
+    assert events == expected
+
+
+async def test_shield_middleware_route_cache_size(aiohttp_client):
+    events = []
+    app = web.Application(
+        middlewares=[
+            shield_middleware(
+                urls={"/documents/1": "POST"},
+                on_event=lambda event, payload: events.append(
+                    (event, payload)
+                ),
+                per_route=True,
+                route_cache_size=0,
+            )
+        ]
+    )
+    app.router.add_post("/documents/{document_id}", handler)
+    client = await aiohttp_client(app)
+
+    for url in ("/documents/1", "/documents/2"):
+        await client.post(url)
+    assert events == [(EVENT_SHIELD_PATH, ("POST", "/documents/1"))]
+
+
+def test_shield_policy_route_cache_size():
+    policy = ShieldPolicy.create(
+        methods=NON_IDEMPOTENT_METHODS, per_route=True, route_cache_size=1
+    )
+    assert policy.match("POST", "/", make_mocked_request("POST", "/")) is True
+    assert policy.match("GET", "/", make_mocked_request("GET", "/")) is False
+    assert list(policy.route_decisions.values()) == [EVENT_SHIELD_METHOD]
+
+
 @pytest.mark.parametrize(
     "method, value",
     [("DELETE", False), ("GET", False), ("POST", True), ("PUT", False)],
@@ -118,3 +242,153 @@ async def test_shield_middleware_funcitonal(event_loop, method, value):
     await asyncio.wait([task])
 
     assert flag is value
+
+
+async def test_shield_middleware_route_names(aiohttp_client):
+    events = []
+    app = web.Application()
+    resource = app.router.add_resource("/documents/{document_id}")
+    resource.add_route("POST", handler)
+    app.router.add_post("/comments/{comment_id}", handler, name="comments")
+    app.middlewares.append(
+        shield_middleware(
+            urls={resource: "POST", "comments": "POST"},
+            on_event=lambda event, payload: events.append((event, payload)),
+        )
+    )
+    client = await aiohttp_client(app)
+
+    for url in ("/documents/1", "/comments/2", "/does-not-exist"):
+        await client.post(url)
+    assert events == [
+        (EVENT_SHIELD_PATH, ("POST", "/documents/1")),
+        (EVENT_SHIELD_PATH, ("POST", "/comments/2")),
+    ]
+
+
+async def blocking_handler(request):
+    await request.app["ready"].wait()
+    if request.app.get("fail"):
+        raise ValueError("Something went wrong")
+    return web.Response(status=200)
+
+
+def create_registry_app():
+    app = web.Application()
+    app["ready"] = asyncio.Event()
+    return app
+
+
+async def call_shielded(middleware, app):
+    request = make_mocked_request("POST", "/", app=app)
+    return await middleware(request, blocking_handler)
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    ({"limit": 0}, {"limit": -1}, {"overflow": "does-not-exist"}),
+)
+def test_shield_registry_invalid(kwargs):
+    with pytest.raises(ValueError):
+        ShieldRegistry(**kwargs)
+
+
+async def test_shield_registry_orphaned():
+    registry = ShieldRegistry()
+    app = create_registry_app()
+    middleware = shield_middleware(methods={"POST"}, registry=registry)
+
+    task = asyncio.create_task(call_shielded(middleware, app))
+    await asyncio.sleep(0)
+    assert len(registry) == 1
+
+    task.cancel()
+    await asyncio.wait([task])
+    assert registry.stats() == ShieldStats(
+        in_flight=1,
+        shielded=1,
+        orphaned=1,
+        completed=0,
+        rejected=0,
+        unshielded=0,
+    )
+
+    app["ready"].set()
+    assert await registry.drain() == 0
+    assert registry.stats().in_flight == 0
+    assert registry.stats().completed == 1
+
+
+async def test_shield_registry_orphaned_failure(caplog):
+    registry = ShieldRegistry()
+    app = create_registry_app()
+    app["fail"] = True
+    middleware = shield_middleware(methods={"POST"}, registry=registry)
+
+    task = asyncio.create_task(call_shielded(middleware, app))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait([task])
+
+    app["ready"].set()
+    await registry.drain()
+    await asyncio.sleep(0)
+    assert "Orphaned shielded task failed" in caplog.text
+
+
+async def test_shield_registry_limit_reject():
+    registry = ShieldRegistry(limit=1)
+    app = create_registry_app()
+    middleware = shield_middleware(methods={"POST"}, registry=registry)
+
+    task = asyncio.create_task(call_shielded(middleware, app))
+    await asyncio.sleep(0)
+
+    with pytest.raises(web.HTTPServiceUnavailable):
+        await call_shielded(middleware, app)
+
+    app["ready"].set()
+    response = await task
+    assert response.status == 200
+    assert registry.stats() == ShieldStats(
+        in_flight=0,
+        shielded=1,
+        orphaned=0,
+        completed=1,
+        rejected=1,
+        unshielded=0,
+    )
+
+
+async def test_shield_registry_limit_unshielded():
+    registry = ShieldRegistry(limit=1, overflow=OVERFLOW_UNSHIELDED)
+    app = create_registry_app()
+    middleware = shield_middleware(methods={"POST"}, registry=registry)
+
+    tasks = [
+        asyncio.create_task(call_shielded(middleware, app)) for _ in range(2)
+    ]
+    await asyncio.sleep(0)
+    app["ready"].set()
+
+    responses = await asyncio.gather(*tasks)
+    assert [response.status for response in responses] == [200, 200]
+    assert registry.stats().shielded == 1
+    assert registry.stats().unshielded == 1
+
+
+async def test_shield_registry_on_shutdown(caplog):
+    registry = ShieldRegistry(shutdown_timeout=0.01)
+    app = create_registry_app()
+    middleware = shield_middleware(methods={"POST"}, registry=registry)
+
+    task = asyncio.create_task(call_shielded(middleware, app))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait([task])
+
+    await registry.on_shutdown(app)
+    await asyncio.sleep(0.01)
+    assert len(registry) == 0
+    assert registry.stats().orphaned == 1
+    assert "Cancel shielded tasks" in caplog.text
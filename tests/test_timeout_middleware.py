@@ -1,24 +1,49 @@
 import asyncio
+import re
 
 import pytest
 from aiohttp import web
 
-from aiohttp_middlewares import timeout_middleware
+from aiohttp_middlewares import compile_urls, timeout_middleware
+from aiohttp_middlewares.timeout import (
+    AdaptiveTimeouts,
+    BACKENDS,
+    create_timeout_factory,
+    EVENT_TIMEOUT_EXCEEDED,
+    EVENT_TIMEOUT_IGNORED,
+    get_deadline,
+    get_remaining_time,
+    HISTOGRAM_BOUNDS,
+    LatencyHistogram,
+    TimeoutBudgets,
+    TimerWheel,
+)
 
 
 HALF_A_SECOND = 0.5
 SECOND = 1
 
 
-def create_app(seconds, ignore=None):
+def create_app(seconds, ignore=None, **kwargs):
     app = web.Application(
-        middlewares=[timeout_middleware(seconds, ignore=ignore)]
+        middlewares=[timeout_middleware(seconds, ignore=ignore, **kwargs)]
     )
     app.router.add_route("GET", "/", handler)
     app.router.add_route("GET", "/slow", slow_handler)
+    app.router.add_route("POST", "/slow", slow_handler)
+    app.router.add_route("GET", "/remaining", remaining_handler)
     return app
 
 
+async def remaining_handler(request):
+    return web.json_response(
+        {
+            "has_deadline": get_deadline(request) is not None,
+            "remaining": get_remaining_time(request),
+        }
+    )
+
+
 async def handler(request):
     return web.json_response()
 
@@ -37,11 +62,287 @@ async def slow_handler(request):
         (SECOND + HALF_A_SECOND, None, "/slow", 200),
         (SECOND - HALF_A_SECOND, ["/slow"], "/", 200),
         (SECOND - HALF_A_SECOND, ["/slow"], "/slow", 200),
+        (
+            SECOND - HALF_A_SECOND,
+            compile_urls(["/slow"], cache_size=8),
+            "/slow",
+            200,
+        ),
     ],
 )
+@pytest.mark.parametrize("backend", BACKENDS)
 async def test_timeout_middleware(
-    aiohttp_client, seconds, ignore, url, expected
+    aiohttp_client, backend, seconds, ignore, url, expected
 ):
-    client = await aiohttp_client(create_app(seconds, ignore))
+    client = await aiohttp_client(create_app(seconds, ignore, backend=backend))
     response = await client.get(url)
     assert response.status == expected
+
+
+def test_timeout_middleware_invalid_backend():
+    with pytest.raises(ValueError):
+        timeout_middleware(SECOND, backend="does-not-exist")
+
+
+@pytest.mark.parametrize("resolution", (0, -HALF_A_SECOND))
+def test_timeout_middleware_invalid_resolution(resolution):
+    with pytest.raises(ValueError):
+        timeout_middleware(SECOND, backend="wheel", resolution=resolution)
+
+
+async def test_timer_wheel():
+    loop = asyncio.get_running_loop()
+    wheel = TimerWheel(loop, resolution=SECOND * 1000)
+
+    async def sleep(seconds):
+        async with wheel.timeout(seconds) as context:
+            await asyncio.sleep(seconds)
+        return context
+
+    tasks = [
+        loop.create_task(sleep(seconds))
+        for seconds in (0, 0.01, 0.02, SECOND * 5000)
+    ]
+    await asyncio.sleep(0)
+    assert len(wheel) == 2
+
+    done, pending = await asyncio.wait(tasks, timeout=HALF_A_SECOND)
+    assert {task.result().expired for task in done} == {False}
+    assert len(pending) == 1
+
+    wheel.expire(max(wheel._buckets))
+    with pytest.raises(asyncio.TimeoutError):
+        await pending.pop()
+
+    wheel.cancel(wheel.timeout(SECOND), 42)
+    wheel.timeout(SECOND).expire()
+
+
+async def test_wheel_timeout_factory_new_loop():
+    create_timeout = create_timeout_factory("wheel")
+    first = create_timeout(SECOND)
+    assert create_timeout(SECOND)._wheel is first._wheel
+
+    def create_in_new_loop():
+        async def create():
+            return create_timeout(SECOND)
+
+        return asyncio.run(create())
+
+    other = await asyncio.get_running_loop().run_in_executor(
+        None, create_in_new_loop
+    )
+    assert other._wheel is not first._wheel
+
+
+@pytest.mark.parametrize(
+    "budgets, method, url, expected",
+    [
+        ({"/slow": SECOND + HALF_A_SECOND}, "GET", "/slow", 200),
+        ({re.compile(r"^/sl"): SECOND + HALF_A_SECOND}, "GET", "/slow", 200),
+        ({"/": SECOND + HALF_A_SECOND}, "GET", "/slow", 504),
+        ({"/slow": {"post": SECOND + HALF_A_SECOND}}, "GET", "/slow", 504),
+        ({"/slow": {"POST": SECOND + HALF_A_SECOND}}, "POST", "/slow", 200),
+        (
+            TimeoutBudgets.from_dict({"/slow": SECOND + HALF_A_SECOND}),
+            "GET",
+            "/slow",
+            200,
+        ),
+    ],
+)
+async def test_timeout_middleware_budgets(
+    aiohttp_client, budgets, method, url, expected
+):
+    client = await aiohttp_client(
+        create_app(SECOND - HALF_A_SECOND, budgets=budgets)
+    )
+    response = await client.request(method, url)
+    assert response.status == expected
+
+
+@pytest.mark.parametrize(
+    "ignore, budgets, expected_has_deadline, expected_max_remaining",
+    [
+        (None, None, True, SECOND),
+        (None, {"/remaining": SECOND * 60}, True, SECOND * 60),
+        (["/remaining"], None, False, None),
+    ],
+)
+async def test_timeout_middleware_remaining_time(
+    aiohttp_client,
+    ignore,
+    budgets,
+    expected_has_deadline,
+    expected_max_remaining,
+):
+    client = await aiohttp_client(
+        create_app(SECOND, ignore=ignore, budgets=budgets)
+    )
+    response = await client.get("/remaining")
+    data = await response.json()
+    assert data["has_deadline"] is expected_has_deadline
+    if expected_max_remaining is None:
+        assert data["remaining"] is None
+    else:
+        assert 0 < data["remaining"] <= expected_max_remaining
+
+
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("/", []),
+        ("/slow", [(EVENT_TIMEOUT_IGNORED, ("GET", "/slow"))]),
+        ("/remaining", []),
+        ("/timed-out", [(EVENT_TIMEOUT_EXCEEDED, ("GET", "/timed-out"))]),
+    ],
+)
+async def test_timeout_middleware_on_event(aiohttp_client, url, expected):
+    events = []
+    app = create_app(
+        HALF_A_SECOND,
+        ignore=["/slow"],
+        on_event=lambda event, payload: events.append((event, payload)),
+    )
+    app.router.add_get("/timed-out", slow_handler)
+    client = await aiohttp_client(app)
+    await client.get(url)
+    assert events == expected
+
+
+async def upstream_timeout_handler(request):
+    raise asyncio.TimeoutError
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("adaptive", (False, True))
+@pytest.mark.parametrize(
+    "url, expected",
+    [
+        ("/timed-out", [(EVENT_TIMEOUT_EXCEEDED, ("GET", "/timed-out"))]),
+        ("/upstream-timeout", []),
+    ],
+)
+async def test_timeout_middleware_on_event_exceeded(
+    aiohttp_client, backend, adaptive, url, expected
+):
+    events = []
+    app = create_app(
+        0.05,
+        backend=backend,
+        resolution=0.01,
+        adaptive=AdaptiveTimeouts() if adaptive else None,
+        on_event=lambda event, payload: events.append((event, payload)),
+    )
+    app.router.add_get("/timed-out", slow_handler)
+    app.router.add_get("/upstream-timeout", upstream_timeout_handler)
+    client = await aiohttp_client(app)
+
+    response = await client.get(url)
+    assert response.status == 504
+    assert events == expected
+
+
+@pytest.mark.parametrize(
+    "method, url, expected",
+    [
+        ("GET", "/reports/1/export", 504),
+        ("POST", "/reports/1/export", 200),
+        ("POST", "/reports/2/export", 200),
+        ("GET", "/does-not-exist", 404),
+    ],
+)
+async def test_timeout_middleware_route_names(
+    aiohttp_client, method, url, expected
+):
+    app = web.Application(
+        middlewares=[
+            timeout_middleware(
+                SECOND - HALF_A_SECOND, ignore={"reports.export": "POST"}
+            )
+        ]
+    )
+    resource = app.router.add_resource(
+        "/reports/{report_id}/export", name="reports.export"
+    )
+    resource.add_route("GET", slow_handler)
+    resource.add_route("POST", slow_handler)
+
+    client = await aiohttp_client(app)
+    response = await client.request(method, url)
+    assert response.status == expected
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    (
+        {"percentile": 0},
+        {"percentile": 1.5},
+        {"multiplier": 0},
+        {"floor": -1},
+        {"min_samples": 0},
+        {"min_samples": 10, "window": 10},
+    ),
+)
+def test_adaptive_timeouts_invalid(kwargs):
+    with pytest.raises(ValueError):
+        AdaptiveTimeouts(**kwargs)
+
+
+async def test_adaptive_timeouts(aiohttp_client):
+    adaptive = AdaptiveTimeouts(
+        percentile=0.9, multiplier=2, floor=0.1, min_samples=5
+    )
+    client = await aiohttp_client(
+        create_app(SECOND, budgets={"/slow": 0.5}, adaptive=adaptive)
+    )
+
+    response = await client.get("/remaining")
+    assert (await response.json())["remaining"] > HALF_A_SECOND
+    assert adaptive.budgets() == {}
+
+    for _ in range(5):
+        await client.get("/remaining")
+
+    # Fast route clamped by the floor
+    assert adaptive.budgets() == {("GET", "/remaining"): 0.1}
+    response = await client.get("/remaining")
+    assert (await response.json())["remaining"] <= 0.1
+
+    # Requests, which do not match any route, are not observed
+    await client.get("/does-not-exist")
+    assert list(adaptive.budgets()) == [("GET", "/remaining")]
+
+
+def test_adaptive_timeouts_ceiling():
+    adaptive = AdaptiveTimeouts(min_samples=1, multiplier=10, floor=0)
+    key = ("GET", web.PlainResource("/"))
+    assert adaptive.get_seconds(key, 5) == 5
+
+    adaptive.observe(key, 1)
+    assert adaptive.get_seconds(key, 5) == 5
+    assert adaptive.get_seconds(key, 30) == pytest.approx(11.1, rel=0.25)
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(window=100)
+    assert histogram.percentile(0.5) is None
+
+    for seconds in (0, 0.0005, 0.01, 0.1, 1, 10_000):
+        histogram.observe(seconds)
+
+    assert len(histogram) == 6
+    assert histogram.percentile(0.1) == HISTOGRAM_BOUNDS[0]
+    assert histogram.percentile(0.5) == pytest.approx(0.01, rel=0.25)
+    assert histogram.percentile(1) == HISTOGRAM_BOUNDS[-1]
+
+
+def test_latency_histogram_window():
+    histogram = LatencyHistogram(window=10)
+    for _ in range(9):
+        histogram.observe(1)
+    assert len(histogram) == 9
+
+    histogram.observe(0.01)
+    assert len(histogram) == 4
+    assert histogram.percentile(1) == pytest.approx(1, rel=0.25)
@@ -1,10 +1,12 @@
+import logging
 import re
 
 import pytest
+from aiohttp import web
 from yarl import URL
 
-from aiohttp_middlewares import match_path
-from aiohttp_middlewares.utils import match_request
+from aiohttp_middlewares import compile_urls, match_path
+from aiohttp_middlewares.utils import emit_event, match_request, UrlMatcher
 
 
 URLS_COLLECTION = {
@@ -64,3 +66,201 @@ def test_match_path(url, path, expected):
 )
 def test_match_request(urls, request_method, request_path, expected):
     assert match_request(urls, request_method, request_path) is expected
+    assert (
+        match_request(compile_urls(urls), request_method, request_path)
+        is expected
+    )
+
+
+def test_compile_urls_compiled():
+    matcher = compile_urls(URLS_DICT)
+    assert isinstance(matcher, UrlMatcher)
+    assert compile_urls(matcher) is matcher
+    assert len(matcher) == 3
+    assert not compile_urls(())
+
+
+@pytest.mark.parametrize(
+    "urls, path, expected",
+    (
+        (
+            {re.compile("^/slow"): "GET", "/slow-url": "POST"},
+            "/slow-url",
+            0,
+        ),
+        (
+            {"/slow-url": "POST", re.compile("^/slow"): "GET"},
+            "/slow-url",
+            0,
+        ),
+        (
+            {
+                re.compile("^/fast"): "GET",
+                re.compile("^/slow", re.I): "PUT",
+                "/slow-url": "POST",
+                re.compile("^/slow"): "GET",
+            },
+            "/slow-url",
+            1,
+        ),
+        (
+            [re.compile(r"^/(slow)/\1"), "/slow/slow", re.compile("^/")],
+            "/slow/slow",
+            0,
+        ),
+        ([re.compile("(?i)^/SLOW"), "/slow"], "/slow", 0),
+        ([re.compile(b"^/slow"), 42, "/slow"], "/slow", 2),
+        ([re.compile("^/slow"), 42], "/slow", 0),
+        (
+            [re.compile("^/(?P<name>slow)"), re.compile("^/(?P<name>.*)")],
+            "/",
+            1,
+        ),
+        ([re.compile("^/slow"), re.compile("^/slow-url")], "/fast", None),
+        ({URL("/slow-url"): "POST"}, "/slow-url", 0),
+    ),
+)
+def test_url_matcher_find(urls, path, expected):
+    assert compile_urls(urls).find(path) == expected
+
+
+@pytest.mark.parametrize(
+    "urls, path, expected",
+    ((URLS_COLLECTION, "/slow-url", True), (URLS_DICT, "/fast-url", False)),
+)
+def test_url_matcher_match_path(urls, path, expected):
+    assert compile_urls(urls).match_path(path) is expected
+
+
+def test_url_matcher_cache():
+    matcher = compile_urls(URLS_DICT, cache_size=2)
+    assert matcher.cache_info() == (0, 0, 2, 0)
+
+    assert matcher.match("POST", "/slow-url") is True
+    assert matcher.match("GET", "/slow-url") is False
+    assert matcher.match("GET", "/very-very-slow-url") is True
+    assert matcher.match("GET", "/") is False
+    assert matcher.cache_info() == (1, 3, 2, 2)
+
+    matcher.cache_clear()
+    assert matcher.cache_info() == (0, 0, 2, 0)
+
+
+def test_url_matcher_cache_disabled():
+    matcher = compile_urls(URLS_DICT)
+    matcher.cache_clear()
+    assert matcher.cache_info() is None
+
+
+@pytest.mark.parametrize("cache_size", (0, -1))
+def test_url_matcher_cache_invalid_size(cache_size):
+    with pytest.raises(ValueError):
+        compile_urls(URLS_DICT, cache_size=cache_size)
+
+
+@pytest.mark.parametrize("level", (logging.DEBUG, logging.INFO))
+def test_emit_event(caplog, level):
+    events = []
+    logger = logging.getLogger("aiohttp_middlewares.tests")
+    caplog.set_level(level, logger=logger.name)
+
+    emit_event(logger, None, "test.event", "Test event", "GET", "/")
+    emit_event(
+        logger,
+        lambda event, payload: events.append((event, payload)),
+        "test.event",
+        "Test event",
+        "POST",
+        "/api",
+    )
+
+    assert events == [("test.event", ("POST", "/api"))]
+    if level == logging.DEBUG:
+        assert [
+            (record.event, record.method, record.path)
+            for record in caplog.records
+        ] == [("test.event", "GET", "/"), ("test.event", "POST", "/api")]
+    else:
+        assert caplog.records == []
+
+
+@pytest.mark.parametrize("resolve", (False, True))
+@pytest.mark.parametrize(
+    "urls, method, path, expected, expected_without_request",
+    (
+        (
+            ["reports.export", re.compile(r"^/reports/"), "missing"],
+            "POST",
+            "/reports/1/export",
+            0,
+            1,
+        ),
+        (
+            ["reports.export", re.compile(r"^/reports/"), "missing"],
+            "GET",
+            "/reports/1",
+            1,
+            1,
+        ),
+        (
+            [re.compile(r"^/reports/"), "reports.export"],
+            "POST",
+            "/reports/1/export",
+            0,
+            0,
+        ),
+        (["/index", "reports.export"], "POST", "/reports/2/export", 1, None),
+        (["reports.export"], "GET", "/does-not-exist", None, None),
+        (["missing"], "GET", "/reports/1", None, None),
+    ),
+)
+async def test_url_matcher_route_names(
+    aiohttp_client,
+    resolve,
+    urls,
+    method,
+    path,
+    expected,
+    expected_without_request,
+):
+    matcher = compile_urls(urls)
+
+    async def handler(request):
+        return web.json_response(matcher.find(request.rel_url.path, request))
+
+    app = web.Application()
+    app.router.add_post(
+        "/reports/{report_id}/export", handler, name="reports.export"
+    )
+    app.router.add_get("/reports/{report_id}", handler)
+    app.router.add_get("/does-not-exist", handler)
+    if resolve:
+        matcher.resolve(app.router)
+
+    client = await aiohttp_client(app)
+    response = await client.request(method, path)
+    assert await response.json() == expected
+
+    # Route names are considered only by lookups, which receive the request
+    assert matcher.find(path) == expected_without_request
+
+
+async def test_url_matcher_resources(aiohttp_client):
+    app = web.Application()
+    resource = app.router.add_resource("/documents/{document_id}")
+    matcher = compile_urls({resource: "DELETE", re.compile(r".*"): "GET"})
+
+    async def handler(request):
+        return web.json_response(
+            matcher.match(request.method, request.rel_url.path, request)
+        )
+
+    resource.add_route("GET", handler)
+    resource.add_route("DELETE", handler)
+    resource.add_route("PUT", handler)
+
+    client = await aiohttp_client(app)
+    for method, expected in (("GET", False), ("DELETE", True), ("PUT", False)):
+        response = await client.request(method, "/documents/1")
+        assert await response.json() is expected
+    assert matcher.match("DELETE", "/documents/1") is False